@@ -0,0 +1,8 @@
+"""
+Benchmark suites for Cytonic. Every suite is a module that is run from the `cytonic-python` directory, e.g. with
+`PYTHONPATH=src python -m benchmarks.runtime`, and prints its results next to the baseline in
+`benchmarks/baselines/<suite>.json` with the relative change. Pass `--save` to store the results as the new
+baseline, e.g. on the main branch before reviewing a change, and `--fail-on-regression` to exit with a non-zero
+status if a metric got worse by more than the `--threshold`. Run `--help` for the options of a suite. Baselines
+depend on the machine, so only compare results from the same machine.
+"""
@@ -0,0 +1,124 @@
+"""
+Shared helpers of the benchmark suites. A suite is a mapping of benchmark names to functions that return the
+metrics of the benchmark, which #main() runs, reports and compares to the stored baseline.
+"""
+
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import json
+import math
+import sys
+import time
+import typing as t
+from pathlib import Path
+
+BASELINES_DIRECTORY = Path(__file__).parent / 'baselines'
+
+#: Suffix of the names of metrics that measure a rate, for which a higher value is better.
+HIGHER_IS_BETTER = '_per_sec'
+
+#: Units, as the last part of the names of metrics, for which a lower value is better. For all other metrics,
+#: higher is better.
+LOWER_IS_BETTER = ('ms', 's', 'kib', 'mib', 'bytes')
+
+Metrics = dict[str, float]
+Benchmark = t.Callable[[argparse.Namespace], Metrics]
+
+
+def percentile(values: t.Sequence[float], p: float) -> float:
+  """ Returns the *p*-th percentile (0 to 100) of the *values* with the nearest-rank method. """
+
+  ordered = sorted(values)
+  return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def repeat(func: t.Callable[[], t.Any], min_time: float) -> float:
+  """ Calls *func* repeatedly for at least *min_time* seconds and returns the number of calls per second. """
+
+  count, batch = 0, 1
+  start = time.perf_counter()
+  while True:
+    for _ in range(batch):
+      func()
+    count += batch
+    elapsed = time.perf_counter() - start
+    if elapsed >= min_time:
+      return count / elapsed
+    batch *= 2
+
+
+def is_lower_better(metric: str) -> bool:
+  """ Returns `True` if a lower value of the *metric* is better, based on its unit, e.g. `p50_ms`. """
+
+  return not metric.endswith(HIGHER_IS_BETTER) and metric.rpartition('_')[2] in LOWER_IS_BETTER
+
+
+def load_baseline(suite: str) -> dict[str, Metrics]:
+  path = BASELINES_DIRECTORY / f'{suite}.json'
+  return t.cast(dict[str, Metrics], json.loads(path.read_text())) if path.exists() else {}
+
+
+def save_baseline(suite: str, results: dict[str, Metrics]) -> Path:
+  path = BASELINES_DIRECTORY / f'{suite}.json'
+  baseline = {**load_baseline(suite), **results}
+  path.parent.mkdir(exist_ok=True)
+  path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + '\n')
+  return path
+
+
+def compare(results: dict[str, Metrics], baseline: dict[str, Metrics], threshold: float) -> tuple[str, list[str]]:
+  """
+  Returns a report of the *results* next to the *baseline* and the names of the metrics that got worse by more
+  than the *threshold*, as a fraction of the baseline.
+  """
+
+  lines = [f'{"benchmark":<32} {"metric":<20} {"value":>14} {"baseline":>14} {"change":>9}']
+  regressions = []
+  for name, metrics in results.items():
+    for metric, value in metrics.items():
+      base = baseline.get(name, {}).get(metric)
+      change, marker = '', ''
+      if base:
+        delta = (value - base) / base
+        change = f'{delta:+.1%}'
+        worse = delta > threshold if is_lower_better(metric) else delta < -threshold
+        if worse:
+          marker = '  REGRESSION'
+          regressions.append(f'{name}.{metric}')
+      base_str = f'{base:14.3f}' if base is not None else f'{"-":>14}'
+      lines.append(f'{name:<32} {metric:<20} {value:14.3f} {base_str} {change:>9}{marker}')
+  return '\n'.join(lines), regressions
+
+
+def main(
+  suite: str,
+  benchmarks: t.Mapping[str, Benchmark],
+  add_arguments: t.Callable[[argparse.ArgumentParser], None] | None = None,
+  argv: t.Sequence[str] | None = None,
+) -> None:
+  parser = argparse.ArgumentParser(prog=f'python -m benchmarks.{suite}')
+  parser.add_argument('-k', dest='filter', help='only run the benchmarks whose name matches this glob pattern')
+  parser.add_argument('--save', action='store_true', help='store the results as the new baseline')
+  parser.add_argument('--threshold', type=float, default=0.1, help='relative change that counts as a regression')
+  parser.add_argument('--fail-on-regression', action='store_true', help='exit with status 1 on a regression')
+  if add_arguments is not None:
+    add_arguments(parser)
+  args = parser.parse_args(argv)
+
+  results: dict[str, Metrics] = {}
+  for name, benchmark in benchmarks.items():
+    if args.filter and not fnmatch.fnmatchcase(name, args.filter):
+      continue
+    print(f'running {name} ...', file=sys.stderr)
+    results[name] = benchmark(args)
+
+  report, regressions = compare(results, load_baseline(suite), args.threshold)
+  print(report)
+  if args.save:
+    print(f'saved baseline to {save_baseline(suite, results)}', file=sys.stderr)
+  if regressions:
+    print(f'{len(regressions)} regression(s): {", ".join(regressions)}', file=sys.stderr)
+    if args.fail_on_regression:
+      sys.exit(1)
@@ -0,0 +1,141 @@
+"""
+Benchmarks of the code generators on synthetic projects of 10, 100 and 1000 modules. Every module defines structs,
+an enum, a union and an error, and refers to the types of the previous module, such that the generators have to
+resolve types across modules. Loading the project with #Project.from_files(), generating Python code with the
+#CodeGenerator and generating TypeScript code with the #TypescriptGenerator are measured separately, first for the
+wall time and then for the peak memory with #tracemalloc, which slows the code down.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import os
+import tempfile
+import time
+import tracemalloc
+import typing as t
+from pathlib import Path
+
+import yaml
+
+from cytonic.codegen.python import CodeGenerator
+from cytonic.codegen.typescript import TypescriptGenerator
+from cytonic.model import Project
+
+from ._harness import Metrics, main
+
+SCALES = (10, 100, 1000)
+
+
+def get_module(index: int) -> dict[str, t.Any]:
+  """ Returns the YAML data of the module with the given *index*. """
+
+  n = index
+  ref = f'optional[Thing{n - 1}]' if n > 0 else 'optional[string]'
+  return {
+    'name': f'Module{n}',
+    'docs': f'Synthetic module {n}.',
+    'auth': {'type': 'oauth2_bearer'},
+    'endpoints': {
+      f'get_thing{n}': {
+        'http': f'GET /m{n}/things/{{thing_id}}',
+        'args': {'thing_id': {'type': 'string'}},
+        'return': f'Thing{n}',
+      },
+      f'get_things{n}': {
+        'http': f'GET /m{n}/things',
+        'args': {'kind': {'type': f'Kind{n}', 'kind': 'query'}},
+        'return': f'list[Thing{n}]',
+      },
+      f'set_thing{n}': {
+        'http': f'POST /m{n}/things/{{thing_id}}',
+        'args': {'thing_id': {'type': 'string'}, 'thing': {'type': f'Thing{n}'}},
+      },
+    },
+    'types': {
+      f'Thing{n}': {
+        'docs': f'A thing of module {n}.',
+        'fields': {
+          'id': 'string',
+          'kind': f'Kind{n}',
+          'shape': f'Shape{n}',
+          'previous': ref,
+          'items': f'list[Item{n}]',
+          'attributes': 'map[string, integer]',
+          'created_at': 'datetime',
+        },
+      },
+      f'Item{n}': {'fields': {'name': 'string', 'count': 'integer', 'price': 'double'}},
+      f'Kind{n}': {'values': [{'name': 'A'}, {'name': 'B'}, {'name': 'C'}]},
+      f'Circle{n}': {'fields': {'radius': 'double'}},
+      f'Square{n}': {'fields': {'side': 'double'}},
+      f'Shape{n}': {'union': {'circle': f'Circle{n}', 'square': f'Square{n}'}},
+    },
+    'errors': {
+      f'Thing{n}NotFound': {'error_code': 'NOT_FOUND', 'fields': {'id': 'string'}},
+    },
+  }
+
+
+def write_project(directory: Path, modules: int) -> list[Path]:
+  """ Writes a synthetic project with the given number of *modules* to the *directory*. """
+
+  directory.mkdir(parents=True, exist_ok=True)
+  files = []
+  for index in range(modules):
+    filename = directory / f'module{index}.yml'
+    filename.write_text(yaml.safe_dump(get_module(index), sort_keys=False))
+    files.append(filename)
+  return files
+
+
+def _run_phases(files: list[Path], output: Path) -> t.Iterator[tuple[str, t.Callable[[], t.Any]]]:
+  """ Yields the name and a function for every phase. The functions must be called in order. """
+
+  project = Project()
+  yield 'load', lambda: project.modules.update(Project.from_files(list(files)).modules)
+
+  def _python() -> None:
+    codegen = CodeGenerator(output / 'python', project, 'synthetic')
+    codegen.modules = {f'synthetic.{k}': [m] for k, m in project.modules.items()}
+    codegen.write()
+
+  yield 'python', _python
+  yield 'typescript', lambda: TypescriptGenerator(project, output / 'typescript', False).write()
+
+
+def _measure(modules: int, args: argparse.Namespace) -> Metrics:
+  metrics: Metrics = {}
+  with tempfile.TemporaryDirectory() as tmp, open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+    files = write_project(Path(tmp) / 'spec', modules)
+
+    for _ in range(args.repeat):
+      for phase, func in _run_phases(files, Path(tmp) / 'out'):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        metrics[f'{phase}_s'] = min(metrics.get(f'{phase}_s', elapsed), elapsed)
+
+    tracemalloc.start()
+    try:
+      for phase, func in _run_phases(files, Path(tmp) / 'out'):
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        func()
+        metrics[f'{phase}_peak_mib'] = (tracemalloc.get_traced_memory()[1] - current) / 1024 / 1024
+    finally:
+      tracemalloc.stop()
+
+  return metrics
+
+
+def _add_arguments(parser: argparse.ArgumentParser) -> None:
+  parser.add_argument('--repeat', type=int, default=3, help='report the best wall time of this many runs')
+
+
+BENCHMARKS = {f'modules_{n}': (lambda n: lambda args: _measure(n, args))(n) for n in SCALES}
+
+
+if __name__ == '__main__':
+  main('codegen', BENCHMARKS, _add_arguments)
@@ -0,0 +1,229 @@
+"""
+Benchmarks of the dispatch path of the #CytonicServiceRouter. Every benchmark serves a service in-process over ASGI
+and sends requests with `httpx` from a number of concurrent workers, measuring the requests per second, the
+latency percentiles and the peak memory allocated per request. The numbers include the overhead of `httpx` and
+FastAPI, so they are only meaningful relative to the baseline.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import dataclasses
+import datetime
+import sys
+import time
+import tracemalloc
+import typing as t
+from pathlib import Path
+
+import databind.core.annotations
+import httpx
+from fastapi import FastAPI
+from nr.util.safearg import Safe
+
+from cytonic.contrib.fastapi import CytonicServiceRouter
+from cytonic.description import authentication, endpoint, service
+from cytonic.model import OAuth2Bearer
+from cytonic.runtime import Credentials, NotFoundError, PrincipalResolver, UnauthorizedError, get_principal
+
+from ._harness import Benchmark, Metrics, main, percentile
+
+TODOLIST_DIRECTORY = Path(__file__).parent.parent.parent / 'examples' / 'todolist' / 'src' / 'python'
+
+
+@dataclasses.dataclass
+class Request:
+  method: str
+  url: str
+  status_code: int = 200
+  headers: dict[str, str] = dataclasses.field(default_factory=dict)
+  json: t.Any = None
+
+
+@dataclasses.dataclass
+class LineItem:
+  sku: str
+  quantity: int
+  price: float
+  tags: list[str]
+
+
+@dataclasses.dataclass
+class Order:
+  id: str
+  created_at: datetime.datetime
+  items: list[LineItem]
+  notes: list[list[str]]
+
+
+@dataclasses.dataclass
+class Circle:
+  radius: float
+
+
+@dataclasses.dataclass
+class Rectangle:
+  width: float
+  height: float
+
+
+Shape = t.Annotated[Circle | Rectangle, databind.core.annotations.union({'circle': Circle, 'rectangle': Rectangle})]
+
+ORDERS = [
+  Order(
+    id=str(i),
+    created_at=datetime.datetime(2022, 1, 1),
+    items=[LineItem(f'sku-{j}', j, 9.99, ['a', 'b', 'c']) for j in range(10)],
+    notes=[['x'] * 5 for _ in range(5)],
+  )
+  for i in range(20)
+]
+
+SHAPES: list[Shape] = [Circle(i) if i % 2 else Rectangle(i, i) for i in range(100)]
+
+
+@service('Shapes')
+class ShapesService:
+
+  @endpoint('GET /orders')
+  async def get_orders(self) -> list[Order]:
+    return ORDERS
+
+  @endpoint('POST /orders')
+  async def set_orders(self, orders: list[Order]) -> int:
+    return len(orders)
+
+  @endpoint('GET /shapes')
+  async def get_shapes(self) -> list[Shape]:
+    return SHAPES
+
+  @endpoint('GET /missing/{id}')
+  async def get_missing(self, id: str) -> str:
+    raise NotFoundError(Safe('not found'), id=Safe(id))
+
+
+@service('Auth')
+@authentication(OAuth2Bearer())
+class AuthService:
+
+  @endpoint('GET /whoami')
+  async def whoami(self, auth: Credentials) -> str:
+    return t.cast(str, get_principal())
+
+
+async def _resolve_token(credentials: Credentials) -> str:
+  token = credentials.get_bearer_token()
+  if not token.startswith('user-'):
+    raise UnauthorizedError(Safe('invalid token'))
+  return token[5:]
+
+
+def _shapes_app() -> FastAPI:
+  app = FastAPI()
+  app.include_router(CytonicServiceRouter(ShapesService()))
+  return app
+
+
+def _auth_app() -> FastAPI:
+  app = FastAPI()
+  app.include_router(CytonicServiceRouter(AuthService(), principal_resolver=PrincipalResolver(_resolve_token)))
+  return app
+
+
+def _todolist_app() -> FastAPI:
+  sys.path.insert(0, str(TODOLIST_DIRECTORY))
+  from todolist.app import app  # type: ignore[import]
+  return t.cast(FastAPI, app)
+
+
+async def _measure(app: FastAPI, requests: list[Request], args: argparse.Namespace) -> Metrics:
+  transport = httpx.ASGITransport(app=app)  # type: ignore[arg-type]
+  async with httpx.AsyncClient(transport=transport, base_url='http://benchmark') as client:
+
+    async def _send(index: int) -> float:
+      request = requests[index % len(requests)]
+      start = time.perf_counter()
+      response = await client.request(request.method, request.url, headers=request.headers, json=request.json)
+      latency = time.perf_counter() - start
+      if response.status_code != request.status_code:
+        raise RuntimeError(f'{request.method} {request.url} returned {response.status_code}: {response.text}')
+      return latency
+
+    for index in range(args.warmup):
+      await _send(index)
+
+    # Measure the memory of single requests, such that it is not mixed up with concurrent requests.
+    peaks = []
+    tracemalloc.start()
+    try:
+      for index in range(args.memory_samples):
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        await _send(index)
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    finally:
+      tracemalloc.stop()
+
+    latencies: list[float] = []
+    counter = iter(range(args.requests))
+
+    async def _worker() -> None:
+      for index in counter:
+        latencies.append(await _send(index))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(_worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+  return {
+    'requests_per_sec': len(latencies) / elapsed,
+    'p50_ms': percentile(latencies, 50) * 1000,
+    'p99_ms': percentile(latencies, 99) * 1000,
+    'peak_per_request_kib': sum(peaks) / len(peaks) / 1024,
+  }
+
+
+def _benchmark(app_factory: t.Callable[[], FastAPI], requests: list[Request]) -> Benchmark:
+  return lambda args: asyncio.run(_measure(app_factory(), requests, args))
+
+
+TOKEN = {'Authorization': 'Bearer eY123.123'}
+
+BENCHMARKS = {
+  'todolist': _benchmark(_todolist_app, [
+    Request('GET', '/lists', headers=TOKEN),
+    Request('GET', '/lists/0/items', headers=TOKEN),
+    Request('GET', '/users/me', headers=TOKEN),
+    Request('GET', '/lists/unknown/items', 404, headers=TOKEN),
+  ]),
+  'nested_lists_encode': _benchmark(_shapes_app, [Request('GET', '/orders')]),
+  'nested_lists_decode': _benchmark(_shapes_app, [Request('POST', '/orders', json=[
+    {
+      'id': str(i),
+      'created_at': '2022-01-01T00:00:00',
+      'items': [{'sku': f'sku-{j}', 'quantity': j, 'price': 9.99, 'tags': ['a', 'b', 'c']} for j in range(10)],
+      'notes': [['x'] * 5 for _ in range(5)],
+    }
+    for i in range(20)
+  ])]),
+  'unions': _benchmark(_shapes_app, [Request('GET', '/shapes')]),
+  'errors': _benchmark(_shapes_app, [Request('GET', '/missing/1', 404)]),
+  'auth': _benchmark(_auth_app, [
+    Request('GET', '/whoami', headers={'Authorization': f'Bearer user-{i}'}) for i in range(10)
+  ] + [
+    Request('GET', '/whoami', 403, headers={'Authorization': 'Bearer invalid'}),
+    Request('GET', '/whoami', 403),
+  ]),
+}
+
+
+def _add_arguments(parser: argparse.ArgumentParser) -> None:
+  parser.add_argument('--requests', type=int, default=500, help='number of measured requests per benchmark')
+  parser.add_argument('--concurrency', type=int, default=8, help='number of concurrent requests')
+  parser.add_argument('--warmup', type=int, default=20, help='number of requests before measuring')
+  parser.add_argument('--memory-samples', type=int, default=20, help='number of requests to measure memory for')
+
+
+if __name__ == '__main__':
+  main('runtime', BENCHMARKS, _add_arguments)
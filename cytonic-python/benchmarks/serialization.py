@@ -0,0 +1,147 @@
+"""
+Microbenchmarks of the serialization paths of the runtime: every #Encoding that can be constructed with the
+installed packages, for a value of every builtin type of the YAML specification and for composite shapes. Each
+benchmark reports how many values per second are encoded to bytes (`dump()`) and decoded from bytes (`load()`),
+and the number of bytes produced.
+
+The encodings cover both serialization paths of the runtime: the JSON, MessagePack and CBOR encodings convert
+values with `databind`, while the #CompactEncoding compiles a codec per struct type that bypasses `databind`.
+
+The `stream` and `binary` types are skipped because they are not serialized as values: streams are serialized per
+element and binary bodies are sent as they are.
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import datetime
+import decimal
+import sys
+import typing as t
+
+import databind.core.annotations
+
+from cytonic.codegen._util import DefaultTypeConverter
+from cytonic.runtime import DoubleArray, IntegerArray, Page, Ref
+from cytonic.runtime.compact import CompactEncoding
+from cytonic.runtime.encoding import CborEncoding, Encoding, JsonEncoding, MsgpackEncoding
+
+from ._harness import Benchmark, Metrics, main, repeat
+
+ENCODINGS: dict[str, t.Callable[[], Encoding]] = {
+  'json': JsonEncoding,
+  'msgpack': MsgpackEncoding,
+  'cbor': CborEncoding,
+  'compact': CompactEncoding,
+}
+
+NOT_VALUES = {'stream', 'binary'}
+
+
+@dataclasses.dataclass
+class User:
+  id: str
+  email: str
+
+
+@dataclasses.dataclass
+class Node:
+  name: str
+  value: int
+  child: t.Optional[Node] = None
+
+
+Wide = dataclasses.make_dataclass('Wide', [(f'field_{i}', int) for i in range(50)])
+
+
+@dataclasses.dataclass
+class Circle:
+  radius: float
+
+
+@dataclasses.dataclass
+class Rectangle:
+  width: float
+  height: float
+
+
+Shape = t.Annotated[Circle | Rectangle, databind.core.annotations.union({'circle': Circle, 'rectangle': Rectangle})]
+
+
+def _nested(depth: int) -> Node:
+  node = Node('leaf', 0)
+  for i in range(depth):
+    node = Node(f'node-{i}', i, node)
+  return node
+
+
+#: A type and a value of the type for every builtin type of the YAML specification.
+BUILTIN_VALUES: dict[str, tuple[t.Any, t.Any]] = {
+  'any': (t.Any, {'name': 'value', 'values': [1, 2, 3]}),
+  'string': (str, 'The quick brown fox jumps over the lazy dog'),
+  'integer': (int, 1234567890),
+  'double': (float, 3.141592653589793),
+  'boolean': (bool, True),
+  'datetime': (datetime.datetime, datetime.datetime(2022, 1, 1, 12, 30, 15)),
+  'decimal': (decimal.Decimal, decimal.Decimal('12345.6789')),
+  'list': (t.List[int], list(range(100))),
+  'set': (t.Set[str], {f'item-{i}' for i in range(100)}),
+  'map': (t.Dict[str, int], {f'key-{i}': i for i in range(100)}),
+  'optional': (t.Optional[str], 'value'),
+  'ref': (Ref[User], Ref('user-1')),
+  'page': (Page[User], Page([User(str(i), f'user{i}@example.org') for i in range(20)], 'cursor')),
+  'bytes': (bytes, bytes(range(256)) * 4),
+  'array[double]': (DoubleArray, DoubleArray(float(i) for i in range(1000))),
+  'array[integer]': (IntegerArray, IntegerArray(range(1000))),
+}
+
+#: Composite shapes of values.
+COMPOSITE_VALUES: dict[str, tuple[t.Any, t.Any]] = {
+  'deep_nesting': (Node, _nested(50)),
+  'wide_struct': (Wide, Wide(*range(50))),
+  'unions': (t.List[Shape], [Circle(i) if i % 2 else Rectangle(i, i) for i in range(100)]),  # type: ignore[misc]
+  'map_of_lists': (t.Dict[str, t.List[int]], {f'key-{i}': list(range(20)) for i in range(20)}),
+  'list_of_structs': (t.List[User], [User(str(i), f'user{i}@example.org') for i in range(100)]),
+}
+
+
+def _get_encodings() -> dict[str, Encoding]:
+  encodings = {}
+  for name, factory in ENCODINGS.items():
+    try:
+      encodings[name] = factory()
+    except ImportError as exc:
+      print(f'skipping encoding {name}: {exc}', file=sys.stderr)
+  return encodings
+
+
+def _benchmark(encoding: Encoding, type_: t.Any, value: t.Any) -> Benchmark:
+  def _run(args: argparse.Namespace) -> Metrics:
+    data = encoding.dump(value, type_)
+    if encoding.load(data, type_) != value:
+      raise RuntimeError(f'{type(encoding).__name__} does not round-trip {value!r}')
+    return {
+      'encode_ops_per_sec': repeat(lambda: encoding.dump(value, type_), args.min_time),
+      'decode_ops_per_sec': repeat(lambda: encoding.load(data, type_), args.min_time),
+      'size_bytes': len(data),
+    }
+  return _run
+
+
+def get_benchmarks() -> dict[str, Benchmark]:
+  missing = set(DefaultTypeConverter.BUILTIN_TYPES) - NOT_VALUES - BUILTIN_VALUES.keys()
+  assert not missing, f'no benchmark value for builtin types {missing}'
+  benchmarks = {}
+  for encoding_name, encoding in _get_encodings().items():
+    for shape, (type_, value) in {**BUILTIN_VALUES, **COMPOSITE_VALUES}.items():
+      benchmarks[f'{shape}/{encoding_name}'] = _benchmark(encoding, type_, value)
+  return benchmarks
+
+
+def _add_arguments(parser: argparse.ArgumentParser) -> None:
+  parser.add_argument('--min-time', type=float, default=0.1, help='seconds to measure encoding or decoding for')
+
+
+if __name__ == '__main__':
+  main('serialization', get_benchmarks(), _add_arguments)
@@ -19,6 +19,18 @@ extras_require = {}
 extras_require['fastapi'] = [
   'fastapi >=0.70.1,<1.0.0',
 ]
+extras_require['msgpack'] = [
+  'msgpack >=1.0.0,<2.0.0',
+]
+extras_require['cbor'] = [
+  'cbor2 >=5.4.0,<6.0.0',
+]
+extras_require['bench'] = [
+  'httpx >=0.23.0',
+]
+extras_require['mock'] = [
+  'uvicorn >=0.16.0',
+]
 extras_require['test'] = test_requirements
 
 setuptools.setup(
@@ -43,6 +55,8 @@ setuptools.setup(
     'console_scripts': [
       'cytonic-codegen-python = cytonic.codegen.python:main',
       'cytonic-codegen-typescript = cytonic.codegen.typescript:main',
+      'cytonic-bench = cytonic.tools.bench:main',
+      'cytonic-mock = cytonic.tools.mock:main',
     ]
   },
   cmdclass = {},
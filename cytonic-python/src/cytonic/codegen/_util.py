@@ -3,13 +3,12 @@ from __future__ import annotations
 import abc
 import contextlib
 import dataclasses
-import re
 import sys
 import typing as t
 from pathlib import Path
 
 from nr.util.generic import T
-from cytonic.model import Project
+from cytonic.model import Datatype, Project, TypeLocator
 
 
 @dataclasses.dataclass
@@ -49,18 +48,12 @@ class TypeConverter(t.Generic[T]):
   """
 
   def convert_type_string(self, type_string: str) -> T:
-    match = re.match(r'(\w+)(?:\[(.+)\])?', type_string)
-    if not match:
-      raise ValueError(f'what\'s dis? {type_string!r}')
-
-    type_name, parameters_string = match.groups()
-    assert isinstance(type_name, str) and isinstance(parameters_string, str)
-    parameters = None if parameters_string is None else [x.strip() for x in parameters_string.split(',')]
-
-    return self.create_type(type_name, parameters)
+    datatype = Datatype.parse(type_string)
+    parameters = None if datatype.parameters is None else [str(x) for x in datatype.parameters]
+    return self.create_type(datatype.name, parameters)
 
   @abc.abstractmethod
-  def create_type(self, type_name: str, parameters: list[str]) -> T:
+  def create_type(self, type_name: str, parameters: list[str] | None) -> T:
     ...
 
 
@@ -88,6 +81,13 @@ class DefaultTypeConverter(TypeConverter[str]):
     'set',
     'map',
     'optional',
+    'ref',
+    'page',
+    'stream',
+    'bytes',
+    'binary',
+    'array[double]',
+    'array[integer]',
   ]
 
   def __init_subclass__(cls) -> None:
@@ -99,6 +99,13 @@ class DefaultTypeConverter(TypeConverter[str]):
     self.imported_types: set[str] = set()
 
   def create_type(self, type_name: str, parameters: list[str] | None) -> str:
+    if type_name == 'ref' and parameters:
+      self.validate_ref_target(parameters[0])
+    if type_name == 'array':
+      # Typed arrays have a dedicated template per item type.
+      if parameters not in (['double'], ['integer']):
+        raise ValueError(f'array[{", ".join(parameters or [])}] is not supported, use array[double] or array[integer]')
+      type_name, parameters = f'array[{parameters[0]}]', None
     if type_name in self.TYPE_TEMPLATES:
       type_template = self.TYPE_TEMPLATES[type_name]
       num_parameters = type_template.count('?')
@@ -117,5 +124,15 @@ class DefaultTypeConverter(TypeConverter[str]):
 
     raise ValueError(f'type {type_name} does not exist')
 
-  def visit_type(self, rendered_type: str, type_locator: Project.TypeLocator | None) -> str:
+  def validate_ref_target(self, type_string: str) -> None:
+    """ Ensures that the type referenced by a `ref[T]` is a struct with an `id` field. """
+
+    type_locator = self.project.find_type(type_string)
+    if type_locator is None:
+      raise ValueError(f'ref[{type_string}] must reference a custom type')
+    type_ = type_locator.module.types[type_locator.type_name]
+    if not type_.fields or 'id' not in type_.fields:
+      raise ValueError(f'ref[{type_string}] must reference a struct with an `id` field')
+
+  def visit_type(self, rendered_type: str, type_locator: TypeLocator | None) -> str:
     return rendered_type
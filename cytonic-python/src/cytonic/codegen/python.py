@@ -20,7 +20,9 @@ from pathlib import Path
 from nr.util.singleton import NotSet
 
 from cytonic import __version__
-from cytonic.model import AuthenticationConfig, EndpointConfig, ErrorConfig, ModuleConfig, Project, TypeConfig
+from cytonic.model import AuthenticationConfig, EndpointConfig, ErrorConfig, FieldConfig, ModuleConfig, Project, \
+  RateLimitConfig, TypeConfig, TypeLocator
+from cytonic.runtime.compact import FIELD_NUMBER_METADATA_KEY
 from ._util import FileOpener, DefaultTypeConverter
 
 
@@ -184,6 +186,13 @@ class PythonTypeConverter(DefaultTypeConverter):
     'set': 'typing.Set[?]',
     'map': 'typing.Dict[?, ?]',
     'optional': 'typing.Optional[?]',
+    'ref': 'cytonic.runtime.Ref[?]',
+    'page': 'cytonic.runtime.Page[?]',
+    'stream': 'typing.AsyncIterator[?]',
+    'bytes': 'bytes',
+    'binary': 'cytonic.runtime.Binary',
+    'array[double]': 'cytonic.runtime.DoubleArray',
+    'array[integer]': 'cytonic.runtime.IntegerArray',
   }
 
   def __post_init__(self) -> None:
@@ -192,7 +201,7 @@ class PythonTypeConverter(DefaultTypeConverter):
     assert self.current_module is not None
     assert self.modules is not None
 
-  def visit_type(self, rendered_type: str, type_locator: Project.TypeLocator) -> str:
+  def visit_type(self, rendered_type: str, type_locator: TypeLocator | None) -> str:
     if type_locator:
       for key, value in self.modules.items():
         if type_locator.module in value:
@@ -202,8 +211,8 @@ class PythonTypeConverter(DefaultTypeConverter):
         raise ValueError(type_locator)
       if module_id != self.current_module:
         self.python_module.member_imports.add(module_id + '.' + type_locator.type_name)
-    elif '.' in rendered_type:
-      self.python_module.module_imports.add(rendered_type.rpartition('.')[0])
+    elif '.' in (generic_type := rendered_type.partition('[')[0]):
+      self.python_module.module_imports.add(generic_type.rpartition('.')[0])
     return rendered_type
 
 
@@ -265,10 +274,23 @@ class CodeGenerator:
       docs=config.docs,
       decorators=['@dataclasses.dataclass'],
       fields=[
-        _PythonClassField(k, self.get_field_type(f.type), repr(f.default) if f.default is not NotSet.Value else None, f.docs) for k, f in config.fields.items()
+        _PythonClassField(k, self.get_field_type(f.type), self.get_field_value(k, f, config), f.docs) for k, f in config.fields.items()
       ] if config.fields else []
     )
 
+  def get_field_value(self, name: str, field: FieldConfig, config: ErrorConfig | TypeConfig) -> str | None:
+    """
+    Returns the code for the value assigned to a field in a generated dataclass. If any field of a struct has an
+    explicit number, the numbers of all its fields are stored in the dataclass field metadata.
+    """
+
+    default = repr(field.default) if field.default is not NotSet.Value else None
+    if not isinstance(config, TypeConfig) or not config.fields \
+        or all(f.number is None for f in config.fields.values()):
+      return default
+    metadata = f'metadata={{{FIELD_NUMBER_METADATA_KEY!r}: {config.field_numbers()[name]}}}'
+    return f'dataclasses.field(default={default}, {metadata})' if default else f'dataclasses.field({metadata})'
+
   def add_error_type(self, name: str, error: ErrorConfig, module: _PythonModule) -> None:
     class_ = self._make_python_class(name + 'Error', error, module)
     class_.members.append(_PythonFunction('__post_init__', ['self'], body=['super().__init__()']))
@@ -317,7 +339,9 @@ class CodeGenerator:
       name=f'{module.name}ServiceAsync' if async_ else f'{module.name}ServiceBlocking',
       docs=module.docs,
       bases=['abc.ABC'],
-      decorators=[f'@service({module.name!r})'] + self.get_auth_decorators(module.auth, python_module),
+      decorators=[f'@service({module.name!r})'] + self.get_auth_decorators(module.auth, python_module) + (
+        [self.get_rate_limit_decorator(module.rate_limit, python_module)] if module.rate_limit else []
+      ),
       members=[self.get_endpoint_definition(k, e, module.auth, python_module, async_) for k, e in module.endpoints.items()]
     ))
 
@@ -334,6 +358,9 @@ class CodeGenerator:
     elif error_code == 'ILLEGAL_ARGUMENT':
       module.member_imports.add('cytonic.runtime.IllegalArgumentError')
       return 'IllegalArgumentError'
+    elif error_code == 'TOO_MANY_REQUESTS':
+      module.member_imports.add('cytonic.runtime.TooManyRequestsError')
+      return 'TooManyRequestsError'
     else:
       raise ValueError(f'unknown error_code: {error_code}')
 
@@ -355,9 +382,29 @@ class CodeGenerator:
     method = repr(auth)
     return [f'@authentication({method})']
 
+  def get_rate_limit_decorator(self, config: RateLimitConfig, module: _PythonModule) -> str:
+    module.member_imports.add('cytonic.description.rate_limit')
+    module.member_imports.add('cytonic.model.RateLimitKey')
+    return f'@rate_limit({config.rate!r}, {config.burst!r}, RateLimitKey.{config.key.name})'
+
   def get_endpoint_definition(self, name: str, endpoint: EndpointConfig, auth: AuthenticationConfig | None, module: _PythonModule, async_: bool) -> _PythonFunction:
     module.member_imports.add('cytonic.description.endpoint')
     decorators = [f'@endpoint("{endpoint.http}")'] + self.get_auth_decorators(endpoint.auth, module)
+    if endpoint.paginate is not None:
+      module.member_imports.add('cytonic.description.paginate')
+      decorators.append(f'@paginate({endpoint.paginate.default_limit}, {endpoint.paginate.max_limit})')
+    if endpoint.stream is not None:
+      module.member_imports.add('cytonic.description.stream')
+      decorators.append(f'@stream({endpoint.stream.heartbeat!r}, {endpoint.stream.websocket!r})')
+    if endpoint.compress is not None:
+      module.member_imports.add('cytonic.description.compress')
+      config = endpoint.compress
+      decorators.append(f'@compress({config.enabled!r}, {config.min_size!r}, {config.algorithms!r})')
+    if endpoint.idempotent is not None:
+      module.member_imports.add('cytonic.description.idempotent')
+      decorators.append(f'@idempotent({endpoint.idempotent.ttl!r})')
+    if endpoint.rate_limit is not None:
+      decorators.append(self.get_rate_limit_decorator(endpoint.rate_limit, module))
     args = ['self']
     for arg_name, arg in (endpoint.args or {}).items():
       arg_code = f'{arg_name}: {self.get_field_type(arg.type)}'
@@ -377,10 +424,37 @@ class CodeGenerator:
       if arg_name in self.BUILTIN_NAMES:
         raise ValueError(f'argument name {arg_name!r} on endpoint {name!r} collides with built-in')
 
+    return_type = self.get_field_type(endpoint.return_) if endpoint.return_ else 'None'
+    if endpoint.stream is not None:
+      # Streaming endpoints are implemented as (async) generators, thus the stubs are not coroutines.
+      module.module_imports.add('typing')
+      return_type = f'typing.{"AsyncIterator" if async_ else "Iterator"}[{return_type}]'
+      async_ = False
+
+    if endpoint.bulk_of is not None:
+      # The default implementation calls the single-item endpoint for every key.
+      (keys_name, _), = (endpoint.args or {}).items()
+      fetch = f'lambda key: self.{endpoint.bulk_of}({"auth, " if auth or endpoint.auth else ""}key)'
+      if async_:
+        module.member_imports.add('cytonic.runtime.fetch_bulk')
+        body = f'return await fetch_bulk({keys_name}, {fetch})'
+      else:
+        module.member_imports.add('cytonic.runtime.fetch_bulk_blocking')
+        body = f'return fetch_bulk_blocking({keys_name}, {fetch})'
+      return _PythonFunction(
+        name=name,
+        args=args,
+        return_type=return_type,
+        docs=endpoint.docs,
+        decorators=decorators,
+        body=[body],
+        async_=async_,
+      )
+
     return _PythonFunction(
       name=name,
       args=args,
-      return_type=self.get_field_type(endpoint.return_) if endpoint.return_ else 'None',
+      return_type=return_type,
       docs=endpoint.docs,
       decorators=decorators + ['@abc.abstractmethod'],
       body=['pass'],
@@ -10,7 +10,7 @@ from pathlib import Path
 import databind.json
 from nr.util.generic import T
 
-from cytonic.model import ErrorConfig, ModuleConfig, Project, TypeConfig, AuthenticationConfig
+from cytonic.model import ErrorConfig, ModuleConfig, Project, TypeConfig, TypeLocator, AuthenticationConfig
 from .core._codewriter import CodeWriter
 from ._util import FileOpener, DefaultTypeConverter
 
@@ -40,18 +40,25 @@ class TypeScriptTypeConverter(DefaultTypeConverter):
     'set': 'Set<?>',
     'map': 'Map<?, ?>',
     'optional': '? | undefined',
+    'ref': 'Cytonic.Ref<?>',
+    'page': 'Cytonic.Page<?>',
+    'stream': 'Iterable<?>',
+    'bytes': 'Uint8Array',
+    'binary': 'Uint8Array',
+    'array[double]': 'Float64Array',
+    'array[integer]': 'Float64Array',
   }
 
   def __post_init__(self) -> None:
     super().__post_init__()
     self.imports = set[TypeScriptImport]()
 
-  def visit_type(self, rendered_type: str, type_locator: Project.TypeLocator | None) -> str:
+  def visit_type(self, rendered_type: str, type_locator: TypeLocator | None) -> str:
     if type_locator:
       self.imports.add(TypeScriptImport('./' + type_locator.module_name, type_locator.type_name))
     elif rendered_type.startswith('Cytonic.'):
-      rendered_type = rendered_type.rpartition('.')[-1]
-      self.imports.add(TypeScriptImport('@cytonic/runtime', rendered_type))
+      rendered_type = rendered_type[len('Cytonic.'):]
+      self.imports.add(TypeScriptImport('@cytonic/runtime', rendered_type.partition('<')[0]))
     return rendered_type
 
 
@@ -70,15 +77,22 @@ class TypeScriptTypeToDescriptorConverter(DefaultTypeConverter):
     'decimal': 'new DecimalType()',
     'list': 'new ListType(?)',
     'set': 'new SetType(?)',
-    'map': 'new MapType(?)',
+    'map': 'new MapType(?, ?)',
     'optional': 'new OptionalType(?)',
+    'ref': 'new RefType(?)',
+    'page': 'new PageType(?)',
+    'stream': 'new StreamType(?)',
+    'bytes': 'new BytesType()',
+    'binary': 'new BinaryType()',
+    'array[double]': 'new DoubleArrayType()',
+    'array[integer]': 'new IntegerArrayType()',
   }
 
-  def visit_type(self, rendered_type: str, type_locator: Project.TypeLocator | None) -> str:
+  def visit_type(self, rendered_type: str, type_locator: TypeLocator | None) -> str:
     if type_locator:
       # Make sure that type descriptor for the custom type is imported.
       type_name = f'{rendered_type}_TYPE'
-      self.type_converter.visit_type(type_name, Project.TypeLocator(type_locator.module_name, type_locator.module, type_name))
+      self.type_converter.visit_type(type_name, TypeLocator(type_locator.module_name, type_locator.module, type_name))
       return type_name
     if rendered_type.startswith('new'):
       # Make sure that the type descriptor is imported.
@@ -194,7 +208,9 @@ class TypescriptGenerator:
           line = line[:-2]
         line += '): '
         return_type = self._get_field_type(endpoint.return_) if endpoint.return_ else None
-        if async_:
+        if endpoint.stream is not None:
+          return_type = f'AsyncIterableIterator<{return_type}>' if async_ else f'Iterable<{return_type}>'
+        elif async_:
           return_type = f'Promise<{return_type}>' if return_type else 'Promise<void>'
         line += (return_type or 'null') + ';'
         self._writer.writeline(line)
@@ -227,6 +243,8 @@ class TypescriptGenerator:
             self._write_auth(endpoint.auth)
             if endpoint.return_ is not None:
               self._writer.writeline(f'return: {self._type_descriptor.convert_type_string(endpoint.return_)},')
+            if endpoint.stream is not None:
+              self._writer.writeline('stream: true,')
             if endpoint.args is not None:
               self._writer.writeline('args: {')
               with self._writer.indented():
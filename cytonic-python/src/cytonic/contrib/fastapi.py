@@ -2,20 +2,48 @@
 """ Mount Cytonic service implementations in a FastAPI app. """
 
 import base64
+import contextlib
+import functools
+import hashlib
+import inspect
 import logging
+import math
 import textwrap
+import time
 import typing as t
 
-import databind.json
+import databind.core
 import fastapi
 from nr.util.safearg import Safe
 from nr.util.singleton import NotSet
-from starlette.requests import Request
-from starlette.responses import JSONResponse, Response
-
-from cytonic.description import EndpointDescription, ServiceDescription
-from cytonic.model import ParamKind, AuthenticationConfig, OAuth2Bearer, BasicAuth, NoAuth
-from cytonic.runtime import Credentials, ServiceException, UnauthorizedError
+from starlette.requests import HTTPConnection, Request
+from starlette.responses import FileResponse, Response, StreamingResponse
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from cytonic.description import ArgumentDescription, EndpointDescription, ServiceDescription
+from cytonic.model import ParamKind, AuthenticationConfig, OAuth2Bearer, BasicAuth, NoAuth, PaginationConfig, \
+  CompressionConfig, IdempotencyConfig
+from cytonic.runtime import Binary, ConflictError, Credentials, IllegalArgumentError, NotFoundError, ServiceException, \
+  TooManyRequestsError, UnauthorizedError
+from cytonic.runtime.accesslog import AccessLog, AccessLogRecord, get_credentials_type
+from cytonic.runtime.binary import OCTET_STREAM
+from cytonic.runtime.compression import Compressor, default_compressors, negotiate_compression
+from cytonic.runtime.encoding import Encoding, JsonEncoding, default_encodings, find_encoding, negotiate_encoding, \
+  parse_media_type
+from cytonic.runtime.exceptions import STATUS_CODES
+from cytonic.runtime.idempotency import IdempotencyStore, InflightRequests, MemoryIdempotencyStore, StoredResponse
+from cytonic.runtime.loader import loader_scope
+from cytonic.runtime.loopmonitor import LoopMonitor
+from cytonic.runtime.memory import MemoryTracker, PhaseMemory, RequestMemory
+from cytonic.runtime.metrics import MetricsSink, NoopMetricsSink
+from cytonic.runtime.principal import PrincipalResolver, get_credentials_key, set_principal
+from cytonic.runtime.profiling import RequestProfiler
+from cytonic.runtime.projection import Projection
+from cytonic.runtime.ratelimit import MemoryRateLimiter, RateLimiter, get_rate_limit_key
+from cytonic.runtime.ref import get_ref_targets, ref_context
+from cytonic.runtime.streaming import HEARTBEAT, SSE_MEDIA_TYPE, JsonArraySplitter, NdjsonSplitter, aiter_values, \
+  get_stream_item_type, is_stream_type, with_heartbeat
+from cytonic.runtime.tracing import NoopTracer, Tracer
 
 logger = logging.getLogger(__name__)
 
@@ -24,7 +52,7 @@ logger = logging.getLogger(__name__)
 #   ensure that a consistent error format is returned to clients.
 
 
-async def _get_oauth2_credentials(request: Request, config: OAuth2Bearer) -> Credentials:
+async def _get_oauth2_credentials(request: HTTPConnection, config: OAuth2Bearer) -> Credentials:
   header_value: str | None = request.headers.get(config.header_name or 'Authorization')
   if not header_value:
     raise UnauthorizedError(Safe('missing Authorization header'))
@@ -34,7 +62,7 @@ async def _get_oauth2_credentials(request: Request, config: OAuth2Bearer) -> Cre
   return Credentials.of_bearer_token(config, header_value)
 
 
-async def _get_basic_auth_credentials(request: Request, config: BasicAuth) -> Credentials:
+async def _get_basic_auth_credentials(request: HTTPConnection, config: BasicAuth) -> Credentials:
   header_value: str | None = request.headers.get("Authorization")
   if not header_value:
     raise UnauthorizedError(Safe('missing Authorization header'))
@@ -53,7 +81,7 @@ async def _get_basic_auth_credentials(request: Request, config: BasicAuth) -> Cr
 
 async def _get_credentials(
   authentication_methods: t.Sequence[AuthenticationConfig],
-  request: Request,
+  request: HTTPConnection,
 ) -> Credentials:
   """ Helper function to extract the first matching of a list of authentication methods."""
 
@@ -80,80 +108,857 @@ async def _get_credentials(
   )
 
 
-class CytonicServiceRouter(fastapi.APIRouter):
-  """ Router for service implementations defined with the Skye runtime API. """
+#: The key in the ASGI scope of a request for the time at which the #ReceiveTimeMiddleware received it.
+RECEIVED_AT_SCOPE_KEY = 'cytonic.received_at'
+
+
+class ReceiveTimeMiddleware:
+  """
+  ASGI middleware that records the time at which the server passed a request to the app, such that the router can
+  measure how long the request waited for the event loop before it was dispatched. Add it as the outermost
+  middleware with `app.add_middleware(ReceiveTimeMiddleware)`.
+  """
+
+  def __init__(self, app: t.Any) -> None:
+    self.app = app
+
+  async def __call__(self, scope: t.MutableMapping[str, t.Any], receive: t.Any, send: t.Any) -> None:
+    scope[RECEIVED_AT_SCOPE_KEY] = time.perf_counter()
+    await self.app(scope, receive, send)
+
+
+def _no_phase(name: str) -> t.ContextManager[None]:
+  """ Helper function in place of #_measure_phase() for requests that are neither measured nor logged. """
+
+  return contextlib.nullcontext()
+
+
+@contextlib.contextmanager
+def _measure_phase(name: str, memory: RequestMemory | None, record: AccessLogRecord | None) -> t.Iterator[None]:
+  """ Helper function to measure a phase of a request for the #MemoryTracker and the #AccessLog. """
+
+  start = time.perf_counter()
+  try:
+    with memory.phase(name) if memory is not None else contextlib.nullcontext():
+      yield
+  finally:
+    if record is not None:
+      record.phases[name] = time.perf_counter() - start
+
 
-  def __init__(self, handler: t.Any, service_description: ServiceDescription | None = None, **kwargs: t.Any) -> None:
+def _get_content_length(headers: t.Mapping[str, str]) -> int | None:
+  value = headers.get('content-length')
+  return int(value) if value is not None and value.isdigit() else None
+
+
+class _EventStreamResponse(StreamingResponse):
+  """
+  Internal. The response of a streaming endpoint. The router moves the scopes of the request (the tracing span,
+  the #loader_scope() and the access log record) to #scopes, which are closed once the stream was sent or
+  aborted, in the same context in which the router entered them.
+  """
+
+  scopes: contextlib.ExitStack | None = None
+
+  async def __call__(self, scope: t.MutableMapping[str, t.Any], receive: t.Any, send: t.Any) -> None:
+    try:
+      await super().__call__(scope, receive, send)
+    finally:
+      if self.scopes is not None:
+        self.scopes.close()
+
+
+class CytonicServiceRouter(fastapi.APIRouter):
+  """
+  Router for service implementations defined with the Skye runtime API.
+
+  Request bodies and responses are encoded with one of the *encodings*, negotiated through the `Content-Type`
+  and `Accept` headers. The first encoding is the fallback for clients that do not ask for a specific one and
+  should always be JSON. By default, MessagePack and CBOR are supported in addition if the `msgpack` and `cbor2`
+  packages are installed.
+
+  If a *fields_parameter* is specified, clients can pass a comma separated list of field paths in the query
+  parameter of that name to any endpoint that returns structs (e.g. `?fields=id,name,owner.id`), and only the
+  selected fields are serialized.
+
+  If an *expand_parameter* is specified, clients can pass a comma separated list of type names in the query
+  parameter of that name to expand references (see #Ref) to these types (e.g. `?expand=User`). If the request
+  also has a `Cytonic-Ref-Table` header, expanded objects are serialized only once into a side table and the
+  response is of the form `{"value": ..., "refs": {"User": {"<id>": ...}}}`.
+
+  Streaming endpoints (see #stream()) are served as Server-Sent Events with JSON encoded messages, and as a
+  WebSocket on the same path if enabled, with messages in the encoding negotiated through the `Accept` header of
+  the handshake. Values are pulled from the endpoint only after the previous one was sent.
+
+  Streaming body arguments (`stream[T]`) are parsed incrementally from a JSON array or from newline-delimited JSON
+  (`application/x-ndjson`) as the endpoint consumes them, buffering at most one element, which may not be larger
+  than *max_stream_element_size* bytes. Bodies in other encodings are decoded as a whole.
+
+  Responses are compressed with one of the *compressors* negotiated through the `Accept-Encoding` header if
+  *compression* is enabled for the router or the endpoint (see #compress()) and they are at least as large as its
+  `min_size`. By default, gzip is supported, as well as Brotli and Zstandard if the `brotli` and `zstandard`
+  packages are installed. Streams and #Binary responses are never compressed.
+
+  Idempotent endpoints (see #idempotent()) store the response to a request with an `Idempotency-Key` header in
+  the *idempotency_store*, which keeps responses in memory by default, and return it for repeated requests with
+  the same key and credentials. Concurrent requests with the same key wait for the first one to complete. Reusing
+  a key for a different request is rejected as a conflict. Responses with a 5xx status code are not stored.
+
+  Rate limits of the service and its endpoints (see #rate_limit()) are enforced right after the credentials of a
+  request are extracted, with the token buckets kept by the *rate_limiter* (in memory by default). Requests that
+  exceed a rate limit are rejected with a `TOO_MANY_REQUESTS` error and a `Retry-After` header.
+
+  If a *principal_resolver* is specified, it resolves the credentials of every authenticated request to a principal
+  after the rate limits were checked, which the endpoint can retrieve with #get_principal(). The resolver caches
+  its results, so that the identity backend is not asked on every request.
+
+  Every request is handled in a #loader_scope(), such that #scoped() data loaders are shared by all lookups that
+  an endpoint makes for the request. For streaming endpoints, the scope stays open until the stream ends.
+
+  If a *profiler* is specified, it profiles a sample of the requests to every endpoint (see #RequestProfiler). If a
+  *profiler_path* is specified as well, the number of profiled requests per endpoint is served on that path, and
+  the results for an endpoint on `<profiler_path>/<endpoint>` in a human readable form, or as a file with
+  `?download=true`. Only enable the *profiler_path* if the router is not reachable by the public.
+
+  If a *memory_tracker* is specified, it measures the memory allocated by a sample of the requests to every
+  endpoint in every phase of the request, from extracting the credentials to encoding the response (see
+  #MemoryTracker).
+  If a *memory_tracker_path* is specified as well, the measurements are served on that path and the top allocation
+  sites of an endpoint on `<memory_tracker_path>/<endpoint>`, and `PUT <memory_tracker_path>?sample_every=<n>`
+  changes the sample rate at runtime (`0` disables the tracker). The same caveat as for the *profiler_path* applies.
+
+  Every request is traced with the *tracer* (see #Tracer), with a span for the request that continues the trace of
+  the `traceparent` header, and child spans for extracting the credentials, decoding the request body, calling the
+  endpoint, encoding the response and handling errors. The default #NoopTracer does not record anything.
+
+  The duration of every request is published as `cytonic.request.duration` to the *metrics* sink, tagged with the
+  service, endpoint and status code. If the app has the #ReceiveTimeMiddleware, the time from the server passing
+  the request to the app until the router dispatches it is published as `cytonic.request.queue_delay`. If a
+  *loop_monitor* is specified, it is started on the event loop of the first request and attributes blocks of the
+  event loop to the endpoint that caused them (see #LoopMonitor). Pass it the same *metrics* sink.
+
+  If an *access_log* is specified, a sample of the requests is logged to it with one structured record per request
+  (see #AccessLogRecord), which is written by a background thread.
+  """
+
+  REF_TABLE_HEADER = 'Cytonic-Ref-Table'
+  SSE_MEDIA_TYPE = SSE_MEDIA_TYPE
+  IDEMPOTENCY_KEY_HEADER = 'Idempotency-Key'
+  IDEMPOTENT_REPLAYED_HEADER = 'Idempotent-Replayed'
+  NDJSON_MEDIA_TYPES = ('application/x-ndjson', 'application/jsonl')
+
+  def __init__(
+    self,
+    handler: t.Any,
+    service_description: ServiceDescription | None = None,
+    encodings: t.Sequence[Encoding] | None = None,
+    fields_parameter: str | None = None,
+    expand_parameter: str | None = None,
+    max_stream_element_size: int = 1024 * 1024,
+    compression: CompressionConfig | None = None,
+    compressors: t.Sequence[Compressor] | None = None,
+    idempotency_store: IdempotencyStore | None = None,
+    rate_limiter: RateLimiter | None = None,
+    principal_resolver: PrincipalResolver[t.Any] | None = None,
+    profiler: RequestProfiler | None = None,
+    profiler_path: str | None = None,
+    memory_tracker: MemoryTracker | None = None,
+    memory_tracker_path: str | None = None,
+    tracer: Tracer | None = None,
+    metrics: MetricsSink | None = None,
+    loop_monitor: LoopMonitor | None = None,
+    access_log: AccessLog | None = None,
+    **kwargs: t.Any,
+  ) -> None:
     super().__init__(**kwargs)
     if service_description is None:
       service_description = ServiceDescription.from_class(type(handler), True)
     self._handler = handler
     self._service_description = service_description
+    self._encodings = list(encodings) if encodings is not None else default_encodings()
+    self._fields_parameter = fields_parameter
+    self._expand_parameter = expand_parameter
+    self._json_encoding = JsonEncoding()
+    self._max_stream_element_size = max_stream_element_size
+    self._compression = compression
+    self._compressors = list(compressors) if compressors is not None else default_compressors()
+    self._idempotency_store = idempotency_store if idempotency_store is not None else MemoryIdempotencyStore()
+    self._inflight = InflightRequests()
+    self._rate_limiter = rate_limiter if rate_limiter is not None else MemoryRateLimiter()
+    self._principal_resolver = principal_resolver
+    self._profiler = profiler
+    self._profiler_path = profiler_path
+    self._memory_tracker = memory_tracker
+    self._memory_tracker_path = memory_tracker_path
+    self._tracer = tracer if tracer is not None else NoopTracer()
+    self._metrics = metrics if metrics is not None else NoopMetricsSink()
+    self._loop_monitor = loop_monitor
+    self._access_log = access_log
     self._init_router()
 
-  def _serialize_value(self, value: t.Any, type_: t.Any | None) -> t.Any:
-    """ Internal. Serializes *value* to the specified type using databind. """
+  async def _deserialize_body(self, request: Request, arg: ArgumentDescription) -> t.Any:
+    """
+    Internal. Decodes the request body with the encoding matching its `Content-Type` using databind. A #Binary
+    argument receives the body as it is streamed from the client, and a `bytes` argument receives the raw body if
+    it is sent as `application/octet-stream`.
+    """
+
+    content_type = request.headers.get('Content-Type')
+    if arg.type is Binary:
+      content_length = request.headers.get('Content-Length')
+      size = int(content_length) if content_length and content_length.isdigit() else None
+      return Binary(request.stream(), content_type or OCTET_STREAM, size)
+
+    data = await request.body()
+    if arg.type is bytes and content_type and parse_media_type(content_type)[0] == OCTET_STREAM:
+      return data
+    if not data:
+      if arg.default is not NotSet.Value:
+        return arg.default
+      raise IllegalArgumentError(Safe('missing request body'))
+    encoding = find_encoding(content_type, self._encodings)
+    if encoding is None:
+      raise IllegalArgumentError(Safe('unsupported Content-Type'), content_type=Safe(content_type))
+    try:
+      return encoding.load(data, arg.type)
+    except (ValueError, databind.core.ConversionError) as exc:
+      raise IllegalArgumentError(Safe('bad request body'), details=Safe(str(exc).splitlines()[0]))
+
+  async def _stream_body(self, request: Request, arg: ArgumentDescription) -> t.AsyncIterator[t.Any]:
+    """ Internal. Decodes the elements of a streaming body argument as they are received. """
+
+    item_type = get_stream_item_type(arg.type)
+    media_type = parse_media_type(request.headers.get('Content-Type') or JsonEncoding.media_type)[0]
+    splitter: JsonArraySplitter | NdjsonSplitter
+    if media_type in self.NDJSON_MEDIA_TYPES:
+      splitter = NdjsonSplitter(self._max_stream_element_size)
+    elif self._json_encoding.matches(media_type):
+      splitter = JsonArraySplitter(self._max_stream_element_size)
+    else:
+      list_type = t.cast(t.Any, t.List)[item_type]
+      for value in await self._deserialize_body(request, ArgumentDescription(arg.kind, [], type=list_type)):
+        yield value
+      return
+
+    try:
+      async for chunk in request.stream():
+        for element in splitter.feed(chunk):
+          yield self._json_encoding.load(element, item_type)
+      for element in splitter.close():
+        yield self._json_encoding.load(element, item_type)
+    except (ValueError, databind.core.ConversionError) as exc:
+      raise IllegalArgumentError(Safe('bad request body'), details=Safe(str(exc).splitlines()[0]))
+
+  def _get_projection(self, request: HTTPConnection, endpoint: EndpointDescription) -> Projection | None:
+    """ Internal. Parses and validates the projection for the return type of *endpoint* from the *request*. """
+
+    if not self._fields_parameter or not (value := request.query_params.get(self._fields_parameter)):
+      return None
+    try:
+      projection = Projection.parse(value)
+      projection.validate(endpoint.return_type)
+    except ValueError as exc:
+      raise IllegalArgumentError(Safe(f'bad {self._fields_parameter!r} parameter'), details=Safe(str(exc)))
+    return projection
+
+  def _get_expand(self, request: HTTPConnection, ref_targets: set[str]) -> frozenset[str]:
+    """ Internal. Parses the names of the types to expand references to from the *request*. """
+
+    if not self._expand_parameter or not (value := request.query_params.get(self._expand_parameter)):
+      return frozenset()
+    expand = frozenset(x.strip() for x in value.split(',') if x.strip())
+    if unknown := expand - ref_targets:
+      raise IllegalArgumentError(
+        Safe(f'bad {self._expand_parameter!r} parameter'),
+        details=Safe(f'no references to {", ".join(sorted(unknown))}'),
+      )
+    return expand
+
+  async def _check_rate_limits(
+    self,
+    connection: HTTPConnection,
+    endpoint: EndpointDescription,
+    credentials: Credentials | None,
+  ) -> None:
+    """ Internal. Raises a #TooManyRequestsError if the client exceeds the rate limit of the service or endpoint. """
+
+    client_host = connection.client.host if connection.client else None
+    service_name = self._service_description.name
+    for scope, config in (
+      (service_name, self._service_description.rate_limit),
+      (f'{service_name}.{endpoint.name}', endpoint.rate_limit),
+    ):
+      if config is not None:
+        key = f'{scope}:{get_rate_limit_key(config, credentials, client_host)}'
+        retry_after = await self._rate_limiter.acquire(key, config)
+        if retry_after > 0:
+          raise TooManyRequestsError(retry_after)
+
+  def _get_limit(self, limit: int | None, config: PaginationConfig) -> int:
+    """ Internal. Applies the default and maximum page size to the `limit` argument of a paginated endpoint. """
+
+    if limit is None:
+      return config.default_limit
+    if limit < 1:
+      raise IllegalArgumentError(Safe('bad \'limit\' parameter'), details=Safe('must be at least 1'))
+    return min(limit, config.max_limit)
+
+  def _serialize(
+    self,
+    request: HTTPConnection,
+    encoding: Encoding,
+    value: t.Any,
+    type_: t.Any | None,
+    projection: Projection | None = None,
+    expand: frozenset[str] = frozenset(),
+  ) -> tuple[t.Any, dict[str, str]]:
+    """ Internal. Serializes *value* of type *type_* and returns it with the headers to add to the response. """
+
+    if not expand:
+      return encoding.serialize(value, type_, projection), {}
+
+    table: dict[str, dict[str, t.Any]] | None = {} if request.headers.get(self.REF_TABLE_HEADER) else None
+    with ref_context(expand, table):
+      payload = encoding.serialize(value, type_, projection)
+    if table is None:
+      return payload, {}
+    return {'value': payload, 'refs': table}, {self.REF_TABLE_HEADER: '1'}
+
+  def _encode_response(
+    self,
+    request: HTTPConnection,
+    value: t.Any,
+    type_: t.Any | None,
+    status_code: int = 200,
+    projection: Projection | None = None,
+    expand: frozenset[str] = frozenset(),
+    compression: CompressionConfig | None = None,
+  ) -> Response:
+    """
+    Internal. Serializes *value* of type *type_* with the encoding negotiated for the *request*. A #Binary is sent
+    as a file or streaming response, and `bytes` are sent as they are. The response is compressed according to
+    *compression*, or the router's default.
+    """
+
+    if isinstance(value, Binary):
+      if value.path is not None:
+        return FileResponse(value.path, status_code=status_code, media_type=value.media_type)
+      if value.data is not None:
+        return Response(value.data, status_code=status_code, media_type=value.media_type)
+      headers = {'Content-Length': str(value.size)} if value.size is not None else None
+      return StreamingResponse(value.__aiter__(), status_code=status_code, media_type=value.media_type, headers=headers)
+    if type_ is bytes and isinstance(value, (bytes, memoryview)):
+      content, media_type, headers = bytes(value), OCTET_STREAM, {}
+    else:
+      encoding = negotiate_encoding(request.headers.get('Accept'), self._encodings)
+      media_type = encoding.media_type
+      if not expand:
+        content, headers = encoding.dump(value, type_, projection), {}
+      else:
+        payload, headers = self._serialize(request, encoding, value, type_, projection, expand)
+        content = encoding.encode(payload)
+
+    content = self._compress(request, content, headers, compression or self._compression)
+    return Response(content, status_code=status_code, media_type=media_type, headers=headers)
+
+  def _compress(
+    self,
+    request: HTTPConnection,
+    content: bytes,
+    headers: dict[str, str],
+    config: CompressionConfig | None,
+  ) -> bytes:
+    """
+    Internal. Compresses the *content* of a response with the algorithm negotiated for the *request* if enabled by
+    the *config*, and adds the `Content-Encoding` and `Vary` headers.
+    """
+
+    if config is None or not config.enabled or len(content) < config.min_size:
+      return content
+    compressors = self._compressors
+    if config.algorithms is not None:
+      compressors = [c for name in config.algorithms for c in compressors if c.name == name]
+    headers['Vary'] = 'Accept-Encoding'
+    compressor = negotiate_compression(request.headers.get('Accept-Encoding'), compressors)
+    if compressor is None:
+      return content
+    headers['Content-Encoding'] = compressor.name
+    return compressor.compress(content)
+
+  async def _dispatch_idempotent(
+    self,
+    request: Request,
+    endpoint: EndpointDescription,
+    config: IdempotencyConfig,
+    key: str,
+    credentials: Credentials | None,
+    projection: Projection | None,
+    expand: frozenset[str],
+    streamed_body: bool,
+    dispatch: t.Callable[[t.Callable[[int, t.Any], None]], t.Awaitable[Response]],
+  ) -> Response:
+    """
+    Internal. Returns the stored result for the idempotency *key*, or waits for the request with the same key
+    that is currently being processed, or calls *dispatch* and stores its result. *dispatch* is passed a function
+    that it calls with the status code and the return value of the endpoint or the error. The key is scoped to
+    the endpoint and the *credentials* of the request, which must have been authenticated already. Stored results
+    are encoded with the *projection* and *expand* of the request. A *streamed_body* is not included in the
+    fingerprint of the request.
+    """
+
+    if not key or len(key) > 255:
+      raise IllegalArgumentError(Safe('invalid Idempotency-Key header'))
+
+    scope = get_credentials_key(credentials) if credentials is not None else ''
+    key = f'{endpoint.name}:{scope}:{key}'
+    fingerprint = hashlib.sha256(request.method.encode())
+    fingerprint.update(str(request.url.path).encode() + b'?' + request.url.query.encode())
+    if not streamed_body:
+      fingerprint.update(await request.body())
+
+    while True:
+      stored = await self._idempotency_store.get(key)
+      if stored is None and key in self._inflight:
+        stored = await self._inflight.wait(key)
+        if stored is None:
+          continue
+      if stored is None:
+        break
+      if stored.fingerprint != fingerprint.hexdigest():
+        raise ConflictError(Safe('the Idempotency-Key was already used for a different request'))
+      return self._replay(request, endpoint, stored, projection, expand)
+
+    result: StoredResponse | None = None
+
+    def _capture(status_code: int, value: t.Any) -> None:
+      nonlocal result
+      if status_code >= 500 or status_code == self.STATUS_CODES['TOO_MANY_REQUESTS'] or isinstance(value, Binary):
+        return
+      type_ = endpoint.return_type if status_code < 400 else None
+      # Expand all references, such that the result can be encoded again with any expansion.
+      with ref_context(get_ref_targets(type_)):
+        body = self._json_encoding.dump(value, type_)
+      result = StoredResponse(status_code, body, fingerprint.hexdigest())
+
+    self._inflight.begin(key)
+    try:
+      response = await dispatch(_capture)
+      if result is not None:
+        await self._idempotency_store.put(key, result, config.ttl)
+      return response
+    finally:
+      self._inflight.end(key, result)
+
+  def _replay(
+    self,
+    request: Request,
+    endpoint: EndpointDescription,
+    stored: StoredResponse,
+    projection: Projection | None,
+    expand: frozenset[str],
+  ) -> Response:
+    """ Internal. Encodes the *stored* result with the encoding and compression negotiated for the *request*. """
+
+    if stored.status_code < 400:
+      type_ = endpoint.return_type
+      value = self._json_encoding.load(stored.body, type_) if type_ is not None else None
+      response = self._encode_response(
+        request,
+        value,
+        type_,
+        status_code=stored.status_code,
+        projection=projection,
+        expand=expand,
+        compression=endpoint.compression,
+      )
+    else:
+      value = self._json_encoding.decode(stored.body)
+      response = self._encode_response(request, value, None, status_code=stored.status_code)
+    response.headers[self.IDEMPOTENT_REPLAYED_HEADER] = 'true'
+    return response
+
+  def _stream_response(
+    self,
+    request: Request,
+    values: t.AsyncIterable[t.Any] | t.Iterable[t.Any],
+    endpoint: EndpointDescription,
+    projection: Projection | None,
+    expand: frozenset[str],
+  ) -> Response:
+    """
+    Internal. Sends the *values* of a streaming endpoint as Server-Sent Events. Every value is sent as the JSON
+    encoded data of a `message` event. An exception raised by the endpoint is sent as an `error` event, after
+    which the stream ends. Heartbeats are sent as comments.
+    """
+
+    assert endpoint.stream is not None
+    stream = endpoint.stream
+    item_type = get_stream_item_type(endpoint.return_type)
+
+    async def _events() -> t.AsyncIterator[bytes]:
+      try:
+        async for value in with_heartbeat(aiter_values(values), stream.heartbeat):
+          if value is HEARTBEAT:
+            yield b': heartbeat\n\n'
+            continue
+          payload, _ = self._serialize(request, self._json_encoding, value, item_type, projection, expand)
+          yield b'data: ' + self._json_encoding.encode(payload) + b'\n\n'
+      except Exception as exc:
+        if not isinstance(exc, ServiceException):
+          logger.exception('Uncaught exception in %s', endpoint.name)
+          exc = ServiceException()
+        yield b'event: error\ndata: ' + self._json_encoding.dump(exc.safe_dict(), None) + b'\n\n'
+
+    return _EventStreamResponse(_events(), media_type=self.SSE_MEDIA_TYPE, headers={'Cache-Control': 'no-cache'})
+
+  async def _stream_websocket(
+    self,
+    websocket: WebSocket,
+    values: t.AsyncIterable[t.Any] | t.Iterable[t.Any],
+    endpoint: EndpointDescription,
+    projection: Projection | None,
+    expand: frozenset[str],
+  ) -> None:
+    """
+    Internal. Sends the *values* of a streaming endpoint as WebSocket messages in the encoding negotiated with the
+    `Accept` header of the handshake. Heartbeats are sent as empty messages.
+    """
+
+    assert endpoint.stream is not None
+    encoding = negotiate_encoding(websocket.headers.get('Accept'), self._encodings)
+    item_type = get_stream_item_type(endpoint.return_type)
+    async for value in with_heartbeat(aiter_values(values), endpoint.stream.heartbeat):
+      if value is HEARTBEAT:
+        data = b''
+      else:
+        payload, _ = self._serialize(websocket, encoding, value, item_type, projection, expand)
+        data = encoding.encode(payload)
+      await self._send_websocket(websocket, encoding, data)
+
+  async def _send_websocket(self, websocket: WebSocket, encoding: Encoding, data: bytes) -> None:
+    """ Internal. Sends JSON encoded *data* as a text message and any other encoding as a binary message. """
 
-    if type_ not in (None, type(None)):
-      return databind.json.dump(value, type_)
-    return value
+    if isinstance(encoding, JsonEncoding):
+      await websocket.send_text(data.decode('utf-8'))
+    else:
+      await websocket.send_bytes(data)
 
   def _init_router(self) -> None:
     """ Internal. Initializes the API routes based on the service configuration."""
 
     for endpoint in self._service_description.endpoints:
+      for parameter in (self._fields_parameter, self._expand_parameter):
+        if parameter in endpoint.args:
+          raise ValueError(f'argument {parameter!r} of endpoint {endpoint.name!r} collides with a router parameter')
+      if endpoint.pagination and not {'cursor', 'limit'} <= endpoint.args.keys():
+        raise ValueError(f'paginated endpoint {endpoint.name!r} must accept the `cursor` and `limit` arguments')
+      http_handler, websocket_handler = self._get_endpoint_handlers(endpoint)
       self.add_api_route(
         path=str(endpoint.http.path),
-        endpoint=self._get_endpoint_handler(endpoint),
+        endpoint=http_handler,
         methods=[endpoint.http.method],
         name=endpoint.name,
       )
-
-  def _get_endpoint_handler(self, endpoint: EndpointDescription) -> t.Callable:
-    """ Internal. Constructs a handler for the given endpoint. """
+      if websocket_handler is not None:
+        self.add_api_websocket_route(
+          path=str(endpoint.http.path),
+          endpoint=websocket_handler,
+          name=endpoint.name + '_websocket',
+        )
+
+    if self._profiler is not None and self._profiler_path is not None:
+      self._init_profiler_routes(self._profiler, self._profiler_path)
+    if self._memory_tracker is not None and self._memory_tracker_path is not None:
+      self._init_memory_tracker_routes(self._memory_tracker, self._memory_tracker_path)
+
+  def _init_profiler_routes(self, profiler: RequestProfiler, path: str) -> None:
+    """ Internal. Adds the routes that serve the results of the *profiler*. """
+
+    async def _get_samples() -> dict[str, int]:
+      return profiler.get_samples()
+
+    async def _get_results(endpoint: str, download: bool = False) -> Response:
+      if endpoint not in profiler.get_samples():
+        return Response(f'no profiled requests for endpoint {endpoint!r}', status_code=404, media_type='text/plain')
+      if download:
+        headers = {'Content-Disposition': f'attachment; filename="{endpoint}{profiler.extension}"'}
+        return Response(profiler.export(endpoint), media_type=OCTET_STREAM, headers=headers)
+      return Response(profiler.format(endpoint), media_type='text/plain')
+
+    self.add_api_route(path, _get_samples, methods=['GET'], name='profiler_samples', include_in_schema=False)
+    self.add_api_route(
+      path.rstrip('/') + '/{endpoint}',
+      _get_results,
+      methods=['GET'],
+      name='profiler_results',
+      include_in_schema=False,
+    )
+
+  def _init_memory_tracker_routes(self, tracker: MemoryTracker, path: str) -> None:
+    """ Internal. Adds the routes that serve the measurements of the *tracker* and change its sample rate. """
+
+    async def _get_report() -> dict[str, dict[str, PhaseMemory]]:
+      return tracker.get_report()
+
+    async def _set_sample_every(sample_every: int = fastapi.Query(ge=0)) -> dict[str, int]:
+      tracker.sample_every = sample_every
+      return {'sample_every': sample_every}
+
+    async def _get_top_sites(endpoint: str, limit: int = 10) -> list[tuple[str, int]]:
+      return tracker.get_top_sites(endpoint, limit)
+
+    self.add_api_route(path, _get_report, methods=['GET'], name='memory_report', include_in_schema=False)
+    self.add_api_route(path, _set_sample_every, methods=['PUT'], name='memory_sample_rate', include_in_schema=False)
+    self.add_api_route(
+      path.rstrip('/') + '/{endpoint}',
+      _get_top_sites,
+      methods=['GET'],
+      name='memory_top_sites',
+      include_in_schema=False,
+    )
+
+  def _track_loop(self, endpoint: EndpointDescription) -> t.ContextManager[None]:
+    """ Internal. Starts the loop monitor if necessary and attributes blocks of the loop to the *endpoint*. """
+
+    if self._loop_monitor is None:
+      return contextlib.nullcontext()
+    self._loop_monitor.start()
+    return self._loop_monitor.track(endpoint.name)
+
+  def _profile(self, endpoint: EndpointDescription) -> t.ContextManager[None]:
+    """ Internal. Profiles the request in the context if it is sampled by the profiler. """
+
+    if self._profiler is None or not self._profiler.should_profile(endpoint.name):
+      return contextlib.nullcontext()
+    return self._profiler.profile(endpoint.name)
+
+  def _get_endpoint_handlers(self, endpoint: EndpointDescription) -> tuple[t.Callable, t.Callable | None]:
+    """
+    Internal. Constructs the HTTP handler for the given endpoint, and the WebSocket handler if it is a streaming
+    endpoint that is also served as a WebSocket.
+    """
 
     # TODO (@nrosenstein): De-serialize parameters using databind.json instead of relying on the default?
 
     authentication_methods = self._service_description.authentication_methods + endpoint.authentication_methods
 
+    body_args = {k: a for k, a in endpoint.args.items() if a.kind == ParamKind.body}
+    ref_targets = get_ref_targets(endpoint.return_type)
+
+    async def _prepare(
+      connection: HTTPConnection,
+      kwargs: dict[str, t.Any],
+    ) -> tuple[Projection | None, frozenset[str]]:
+      credentials = None
+      if authentication_methods:
+        kwargs['auth'] = credentials = await _get_credentials(authentication_methods, connection)
+      await self._check_rate_limits(connection, endpoint, credentials)
+      if credentials is not None and self._principal_resolver is not None:
+        with self._tracer.span('principal'):
+          set_principal(await self._principal_resolver(credentials))
+      if endpoint.pagination:
+        kwargs['limit'] = self._get_limit(kwargs.get('limit'), endpoint.pagination)
+      return self._get_projection(connection, endpoint), self._get_expand(connection, ref_targets)
+
+    method = getattr(self._handler, endpoint.name)
+    streamed_body = any(is_stream_type(arg.type) or arg.type is Binary for arg in body_args.values())
+    tracer = self._tracer
+    span_attributes = {
+      'cytonic.service': self._service_description.name,
+      'cytonic.endpoint': endpoint.name,
+      'http.method': endpoint.http.method,
+      'http.route': str(endpoint.http.path),
+    }
+    metric_tags = {'service': self._service_description.name, 'endpoint': endpoint.name}
+
+    def _finish(start: float, record: AccessLogRecord | None, response: Response) -> None:
+      duration = time.perf_counter() - start
+      self._metrics.observe('cytonic.request.duration', duration, {**metric_tags, 'status': str(response.status_code)})
+      if record is not None:
+        assert self._access_log is not None
+        record.status = response.status_code
+        record.duration = duration
+        record.bytes_out = _get_content_length(response.headers)
+        self._access_log.log(record)
+
     async def _dispatcher(request: Request, **kwargs):
+      start = time.perf_counter()
+      received_at = request.scope.get(RECEIVED_AT_SCOPE_KEY)
+      if received_at is not None:
+        self._metrics.observe('cytonic.request.queue_delay', start - received_at, metric_tags)
+      record = None
+      if self._access_log is not None and self._access_log.should_log():
+        record = AccessLogRecord(
+          service=self._service_description.name,
+          endpoint=endpoint.name,
+          method=endpoint.http.method,
+          path=str(endpoint.http.path),
+          timestamp=time.time(),
+          bytes_in=_get_content_length(request.headers),
+        )
+      with contextlib.ExitStack() as stack:
+        span = stack.enter_context(tracer.span(endpoint.name, span_attributes, request.headers))
+        stack.enter_context(loader_scope())
+        # Only the span and the loader scope stay open while a stream is sent, the other scopes sample requests
+        # one at a time and would block other requests from being sampled.
+        with self._track_loop(endpoint), self._profile(endpoint):
+          response = await _dispatch(request, kwargs, record)
+        span.set_attribute('http.status_code', response.status_code)
+        if isinstance(response, _EventStreamResponse):
+          # The endpoint runs while the stream is sent, so the request ends when the stream ends.
+          response.scopes = contextlib.ExitStack()
+          response.scopes.callback(_finish, start, record, response)
+          response.scopes.push(stack.pop_all())
+          return response
+      _finish(start, record, response)
+      return response
+
+    async def _dispatch(request: Request, kwargs: dict[str, t.Any], record: AccessLogRecord | None) -> Response:
+      memory = self._memory_tracker.start_request(endpoint.name) if self._memory_tracker is not None else None
+      if memory is None and record is None:
+        phase = _no_phase
+      else:
+        phase = functools.partial(_measure_phase, memory=memory, record=record)
+      try:
+        with phase('auth'), tracer.span('auth'):
+          projection, expand = await _prepare(request, kwargs)
+          if record is not None:
+            record.credentials = get_credentials_type(kwargs.get('auth'))
+        call = functools.partial(_call, request, kwargs, record, phase, projection, expand)
+        key = request.headers.get(self.IDEMPOTENCY_KEY_HEADER) if endpoint.idempotency else None
+        if key is None:
+          return await call()
+        assert endpoint.idempotency is not None
+        return await self._dispatch_idempotent(
+          request,
+          endpoint,
+          endpoint.idempotency,
+          key,
+          kwargs.get('auth'),
+          projection,
+          expand,
+          streamed_body,
+          call,
+        )
+      except BaseException as exc:
+        return _handle_error(request, record, exc)
+      finally:
+        if memory is not None:
+          memory.close()
+
+    async def _call(
+      request: Request,
+      kwargs: dict[str, t.Any],
+      record: AccessLogRecord | None,
+      phase: t.Callable[[str], t.ContextManager[None]],
+      projection: Projection | None,
+      expand: frozenset[str],
+      capture: t.Callable[[int, t.Any], None] | None = None,
+    ) -> Response:
       try:
-        if authentication_methods:
-          kwargs['auth'] = await _get_credentials(authentication_methods, request)
-        response = getattr(self._handler, endpoint.name)(**kwargs)
-        # TODO (@nrosenstein): Better support for non-async endpoints.
-        if endpoint.async_:
-          response = await response
-        response = self._serialize_value(response, endpoint.return_type)
+        with phase('decode'), tracer.span('decode'):
+          for arg_name, arg in body_args.items():
+            if is_stream_type(arg.type):
+              kwargs[arg_name] = self._stream_body(request, arg)
+            else:
+              kwargs[arg_name] = await self._deserialize_body(request, arg)
+        with phase('handler'), tracer.span('handler'):
+          response = method(**kwargs)
+          # TODO (@nrosenstein): Better support for non-async endpoints.
+          if inspect.isawaitable(response):
+            response = await response
+        if capture is not None:
+          capture(200, response)
+        if endpoint.stream:
+          return self._stream_response(request, response, endpoint, projection, expand)
+        with phase('encode'), tracer.span('encode'):
+          return self._encode_response(
+            request,
+            response,
+            endpoint.return_type,
+            projection=projection,
+            expand=expand,
+            compression=endpoint.compression,
+          )
       except ServiceException as exc:
-        response = self._handle_exception(exc)
+        if capture is not None:
+          capture(self.STATUS_CODES.get(exc.ERROR_CODE, 500), exc.safe_dict())
+        return _handle_error(request, record, exc)
+      except BaseException as exc:
+        return _handle_error(request, record, exc)
+
+    def _handle_error(request: Request, record: AccessLogRecord | None, exc: BaseException) -> Response:
+      if isinstance(exc, ServiceException):
+        error = exc
+      else:
+        logger.exception('Uncaught exception in %s', endpoint.name)
+        error = ServiceException()
+      if record is not None:
+        record.error_code = error.ERROR_CODE
+      with tracer.span('error') as span:
+        span.record_exception(exc)
+        return self._handle_exception(request, error)
+
+    async def _websocket_dispatcher(websocket: WebSocket, **kwargs):
+      await websocket.accept()
+      try:
+        with tracer.span(endpoint.name, span_attributes, websocket.headers), loader_scope():
+          projection, expand = await _prepare(websocket, kwargs)
+          values = getattr(self._handler, endpoint.name)(**kwargs)
+          if inspect.isawaitable(values):
+            values = await values
+          await self._stream_websocket(websocket, values, endpoint, projection, expand)
+      except WebSocketDisconnect:
+        return
+      except ServiceException as exc:
+        await self._close_websocket(websocket, exc)
       except:
         logger.exception('Uncaught exception in %s', endpoint.name)
-        response = self._handle_exception(ServiceException())
-
-      return response
-
-    # Generate code to to tell FastAPI which parameters this endpoint accepts.
-    args = ', '.join(a for a in endpoint.args)
-    kwargs = ', '.join(f'{a}={a}' for a in endpoint.args)
-    scope = {'_dispatcher': _dispatcher}
+        await self._close_websocket(websocket, ServiceException())
+      else:
+        await websocket.close()
+
+    http_handler = self._create_fastapi_handler(endpoint, _dispatcher, [k for k in endpoint.args if k not in body_args])
+    if not endpoint.stream or not endpoint.stream.websocket:
+      return http_handler, None
+    if body_args:
+      raise ValueError(f'endpoint {endpoint.name!r} cannot be served as a WebSocket because it has body arguments')
+    return http_handler, self._create_fastapi_handler(endpoint, _websocket_dispatcher, list(endpoint.args), True)
+
+  def _create_fastapi_handler(
+    self,
+    endpoint: EndpointDescription,
+    dispatcher: t.Callable,
+    fastapi_args: list[str],
+    websocket: bool = False,
+  ) -> t.Callable:
+    """
+    Internal. Generates a function with a signature that tells FastAPI which parameters the endpoint accepts
+    and passes them on to the *dispatcher*. Body arguments are decoded by the dispatcher itself because their
+    encoding depends on the request's `Content-Type`.
+    """
+
+    args = ', '.join(fastapi_args)
+    kwargs = ', '.join(f'{a}={a}' for a in fastapi_args)
+    connection, connection_type = ('websocket', 'WebSocket') if websocket else ('request', 'Request')
+    scope = {'_dispatcher': dispatcher}
 
     exec(textwrap.dedent(f'''
       from starlette.requests import Request
-      async def _handler(request: Request, *, {args}):
-        return await _dispatcher(request=request, {kwargs})
+      from starlette.websockets import WebSocket
+      async def _handler({connection}: {connection_type}, {'*, ' + args if args else ''}):
+        return await _dispatcher({connection}, {kwargs})
     '''), scope)
     _handler = scope['_handler']
-    _handler.__annotations__.update({k: a.type for k, a in endpoint.args.items()})
-    if endpoint.return_type:
+    _handler.__annotations__.update({k: endpoint.args[k].type for k in fastapi_args})
+    if endpoint.return_type and not endpoint.stream and endpoint.return_type is not Binary:
       _handler.__annotations__['return'] = endpoint.return_type
 
     defaults = {}
-    for arg_name, arg in endpoint.args.items():
+    for arg_name in fastapi_args:
+      arg = endpoint.args[arg_name]
       default = ... if arg.default is NotSet.Value else arg.default
-      if arg.kind == ParamKind.body:
-        value = fastapi.Body(default, alias=arg.alias)
-      elif arg.kind == ParamKind.cookie:
+      if arg.kind == ParamKind.cookie:
         value = fastapi.Cookie(default, alias=arg.alias)
       elif arg.kind == ParamKind.query:
         value = fastapi.Query(default, alias=arg.alias)
@@ -168,11 +973,26 @@ class CytonicServiceRouter(fastapi.APIRouter):
 
     return _handler
 
-  def _handle_exception(self, exc: ServiceException) -> Response:
-    status_codes = {
-      'UNAUTHORIZED': 403,
-      'NOT_FOUND': 404,
-      'CONFLICT': 409,
-      'ILLEGAL_ARGUMENT': 400,
-    }
-    return JSONResponse(exc.safe_dict(), status_code=status_codes.get(exc.ERROR_CODE, 500))
+  STATUS_CODES: t.ClassVar[dict[str, int]] = STATUS_CODES
+
+  def _handle_exception(self, request: Request, exc: ServiceException) -> Response:
+    status_code = self.STATUS_CODES.get(exc.ERROR_CODE, 500)
+    response = self._encode_response(request, exc.safe_dict(), None, status_code=status_code)
+    if isinstance(exc, TooManyRequestsError):
+      response.headers['Retry-After'] = str(max(1, math.ceil(exc.retry_after)))
+    return response
+
+  async def _close_websocket(self, websocket: WebSocket, exc: ServiceException) -> None:
+    """
+    Internal. Sends the error as the last message and closes the *websocket* with the code 4000 plus the HTTP
+    status code that corresponds to the error.
+    """
+
+    status_code = self.STATUS_CODES.get(exc.ERROR_CODE, 500)
+    encoding = negotiate_encoding(websocket.headers.get('Accept'), self._encodings)
+    data = encoding.dump(exc.safe_dict(), None)
+    try:
+      await self._send_websocket(websocket, encoding, data)
+      await websocket.close(4000 + status_code)
+    except WebSocketDisconnect:
+      pass
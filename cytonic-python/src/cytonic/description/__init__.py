@@ -1,5 +1,6 @@
 
 """ Defines the functions used in Python code to decorate service classes and endpoint methods. """
 
-from ._decorators import authentication, endpoint, endpoint_args, service
+from ._decorators import authentication, compress, endpoint, endpoint_args, idempotent, paginate, rate_limit, \
+  service, stream
 from ._description import ArgumentDescription, EndpointDescription, ServiceDescription, cookie, header, path, query
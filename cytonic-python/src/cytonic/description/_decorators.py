@@ -5,7 +5,8 @@ import typing as t
 from nr.util.annotations import add_annotation
 from nr.util.generic import T
 
-from cytonic.model import AuthenticationConfig, HttpPath
+from cytonic.model import AuthenticationConfig, CompressionConfig, HttpPath, IdempotencyConfig, PaginationConfig, \
+  RateLimitConfig, RateLimitKey, StreamConfig
 
 if t.TYPE_CHECKING:
   from ._description import ArgumentDescription
@@ -18,6 +19,27 @@ class AuthenticationAnnotation:
   config: AuthenticationConfig
 
 
+@dataclasses.dataclass
+class CompressionAnnotation:
+  """ Holds the compression settings added with the #compress() decorator. """
+
+  config: CompressionConfig
+
+
+@dataclasses.dataclass
+class IdempotencyAnnotation:
+  """ Holds the settings added with the #idempotent() decorator. """
+
+  config: IdempotencyConfig
+
+
+@dataclasses.dataclass
+class RateLimitAnnotation:
+  """ Holds the settings added with the #rate_limit() decorator. """
+
+  config: RateLimitConfig
+
+
 @dataclasses.dataclass
 class EndpointAnnotation:
   """ Holds the endpoint details added with the #endpoint() decorator. """
@@ -33,6 +55,20 @@ class EndpointArgsAnnotation:
   args: dict[str, 'ArgumentDescription']
 
 
+@dataclasses.dataclass
+class PaginationAnnotation:
+  """ Holds the pagination details added with the #paginate() decorator. """
+
+  config: PaginationConfig
+
+
+@dataclasses.dataclass
+class StreamAnnotation:
+  """ Holds the streaming details added with the #stream() decorator. """
+
+  config: StreamConfig
+
+
 @dataclasses.dataclass
 class ServiceAnnotation:
   """ Annotation for service classes. """
@@ -57,6 +93,56 @@ def authentication(config: AuthenticationConfig | type[AuthenticationConfig]) ->
   return _decorator
 
 
+def compress(
+  enabled: bool = True,
+  min_size: int = 1024,
+  algorithms: list[str] | None = None,
+) -> t.Callable[[T], T]:
+  """
+  Decorator for endpoint methods to configure the compression of their responses, overriding the default of the
+  router. See #CompressionConfig.
+  """
+
+  def _decorator(obj: T) -> T:
+    config = CompressionConfig(enabled, min_size, algorithms)
+    add_annotation(obj, CompressionAnnotation, CompressionAnnotation(config), front=True)
+    return obj
+
+  return _decorator
+
+
+def idempotent(ttl: float = 24 * 60 * 60) -> t.Callable[[T], T]:
+  """
+  Decorator for `POST`, `PUT` and `PATCH` endpoint methods that accept an `Idempotency-Key` header. The router
+  stores the response to the first request with a key for *ttl* seconds and returns it for repeated requests with
+  the same key instead of calling the endpoint again.
+  """
+
+  def _decorator(obj: T) -> T:
+    add_annotation(obj, IdempotencyAnnotation, IdempotencyAnnotation(IdempotencyConfig(ttl)), front=True)
+    return obj
+
+  return _decorator
+
+
+def rate_limit(
+  rate: float,
+  burst: int | None = None,
+  key: RateLimitKey = RateLimitKey.credentials,
+) -> t.Callable[[T], T]:
+  """
+  Decorator for service classes and endpoint methods to limit the number of requests that a client can make to
+  *rate* per second, with bursts of up to *burst* requests. A rate limit on a service applies to all of its
+  endpoints together, in addition to the rate limits of the individual endpoints. See #RateLimitConfig.
+  """
+
+  def _decorator(obj: T) -> T:
+    add_annotation(obj, RateLimitAnnotation, RateLimitAnnotation(RateLimitConfig(rate, burst, key)), front=True)
+    return obj
+
+  return _decorator
+
+
 def endpoint(http: str) -> t.Callable[[T], T]:
   """
   Decorator for methods on a service class to mark them as endpoints to be served/accessible via the specified
@@ -80,6 +166,34 @@ def endpoint_args(**args: 'ArgumentDescription') -> t.Callable[[T], T]:
   return _decorator
 
 
+def paginate(default_limit: int = 100, max_limit: int = 1000) -> t.Callable[[T], T]:
+  """
+  Decorator for endpoint methods that accept the `cursor` and `limit` arguments and return a #Page. The router
+  uses the *default_limit* if the client does not specify a limit and caps the limit at *max_limit*.
+  """
+
+  def _decorator(obj: T) -> T:
+    config = PaginationConfig(default_limit, max_limit)
+    add_annotation(obj, PaginationAnnotation, PaginationAnnotation(config), front=True)
+    return obj
+
+  return _decorator
+
+
+def stream(heartbeat: float = 15.0, websocket: bool = False) -> t.Callable[[T], T]:
+  """
+  Decorator for endpoint methods that return an (async) iterator over the values to send to the client. The
+  router serves the endpoint as Server-Sent Events, and additionally as a WebSocket if *websocket* is enabled.
+  A heartbeat is sent if no value was sent for *heartbeat* seconds.
+  """
+
+  def _decorator(obj: T) -> T:
+    add_annotation(obj, StreamAnnotation, StreamAnnotation(StreamConfig(heartbeat, websocket)), front=True)
+    return obj
+
+  return _decorator
+
+
 def service(name: str) -> t.Callable[[T], T]:
   """ Decorator for service classes. """
 
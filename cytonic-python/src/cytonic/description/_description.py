@@ -7,9 +7,12 @@ import typing as t
 from nr.util.annotations import get_annotation, get_annotations
 from nr.util.singleton import NotSet
 
-from cytonic.model import AuthenticationConfig, HttpPath, ParamKind, EndpointConfig, ArgumentConfig
+from cytonic.model import AuthenticationConfig, HttpPath, ParamKind, EndpointConfig, ArgumentConfig, PaginationConfig, \
+  StreamConfig, CompressionConfig, IdempotencyConfig, RateLimitConfig
 from cytonic.runtime import Credentials
-from ._decorators import AuthenticationAnnotation, EndpointAnnotation, EndpointArgsAnnotation, ServiceAnnotation
+from ._decorators import AuthenticationAnnotation, CompressionAnnotation, EndpointAnnotation, \
+  EndpointArgsAnnotation, IdempotencyAnnotation, PaginationAnnotation, RateLimitAnnotation, ServiceAnnotation, \
+  StreamAnnotation
 
 
 @dataclasses.dataclass
@@ -45,6 +48,21 @@ class EndpointDescription:
   authentication_methods: list[AuthenticationConfig]
   async_: bool
 
+  #: Set if the endpoint is paginated, see #paginate().
+  pagination: PaginationConfig | None = None
+
+  #: Set if the endpoint is a streaming endpoint, see #stream(). The #return_type is an iterator type.
+  stream: StreamConfig | None = None
+
+  #: Set if the compression of responses is configured for the endpoint, see #compress().
+  compression: CompressionConfig | None = None
+
+  #: Set if the endpoint accepts an `Idempotency-Key` header, see #idempotent().
+  idempotency: IdempotencyConfig | None = None
+
+  #: Set if the endpoint is rate limited, see #rate_limit().
+  rate_limit: RateLimitConfig | None = None
+
 
 @dataclasses.dataclass
 class ServiceDescription:
@@ -54,6 +72,9 @@ class ServiceDescription:
   authentication_methods: list[AuthenticationConfig]
   endpoints: list[EndpointDescription]
 
+  #: Set if the service is rate limited, see #rate_limit().
+  rate_limit: RateLimitConfig | None = None
+
   def update(self, other: 'ServiceDescription') -> 'ServiceDescription':
     authentication_methods = {
       **{type(a): a for a in self.authentication_methods},
@@ -67,6 +88,7 @@ class ServiceDescription:
       other.name,
       list(authentication_methods.values()),
       list(endpoints.values()),
+      other.rate_limit or self.rate_limit,
     )
 
   @staticmethod
@@ -77,6 +99,9 @@ class ServiceDescription:
     for auth_annotation in get_annotations(cls, AuthenticationAnnotation):
       service.authentication_methods.append(auth_annotation.config)
 
+    if rate_limit := get_annotation(cls, RateLimitAnnotation):
+      service.rate_limit = rate_limit.config
+
     for key in dir(cls):
       value = getattr(cls, key)
       if isinstance(value, types.FunctionType) and (endpoint := get_annotation(value, EndpointAnnotation)):
@@ -88,6 +113,11 @@ class ServiceDescription:
           endpoint_name=f'{cls.__name__}.{key}'
         )
         authentication_methods = [ann.config for ann in get_annotations(value, AuthenticationAnnotation)]
+        pagination = get_annotation(value, PaginationAnnotation)
+        stream = get_annotation(value, StreamAnnotation)
+        compression = get_annotation(value, CompressionAnnotation)
+        idempotency = get_annotation(value, IdempotencyAnnotation)
+        rate_limit = get_annotation(value, RateLimitAnnotation)
         if authentication_methods and 'auth' not in args:
           raise ValueError(f'missing "auth" parameter in endpoint {endpoint.__pretty__()}')
         service.endpoints.append(EndpointDescription(
@@ -97,6 +127,11 @@ class ServiceDescription:
           return_type=return_type,
           authentication_methods=authentication_methods,
           async_=inspect.iscoroutinefunction(value),
+          pagination=pagination.config if pagination else None,
+          stream=stream.config if stream else None,
+          compression=compression.config if compression else None,
+          idempotency=idempotency.config if idempotency else None,
+          rate_limit=rate_limit.config if rate_limit else None,
         ))
 
     if include_bases:
@@ -1,10 +1,12 @@
 
 """ Defines the data model for the YAML configuration. """
 
-from ._endpoint import ParamKind, ArgumentConfig, EndpointConfig
+from ._endpoint import ParamKind, ArgumentConfig, EndpointConfig, PaginationConfig, StreamConfig, CompressionConfig, \
+  IdempotencyConfig
 from ._error import ErrorConfig
 from ._http_path import HttpPath
 from ._module import ModuleConfig
-from ._project import Project
-from ._type import Datatype, TypeConfig, FieldConfig, ValueConfig
+from ._rate_limit import RateLimitConfig, RateLimitKey
+from ._project import Project, TypeLocator
+from ._type import Datatype, TypeConfig, FieldConfig, ValueConfig, assign_field_numbers
 from ._auth import AuthenticationConfig, OAuth2Bearer, BasicAuth, NoAuth
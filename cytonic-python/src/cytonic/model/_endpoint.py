@@ -1,6 +1,7 @@
 
 import enum
 import dataclasses
+import re
 import typing as t
 
 from databind.core import Context
@@ -9,6 +10,7 @@ from databind.json.annotations import with_custom_json_converter
 
 from ._auth import AuthenticationConfig
 from ._http_path import HttpPath
+from ._rate_limit import RateLimitConfig
 
 
 class ParamKind(enum.Enum):
@@ -37,6 +39,101 @@ class ArgumentConfig:
     return NotImplemented
 
 
+@with_custom_json_converter()
+@dataclasses.dataclass
+class PaginationConfig:
+  """ Configures cursor based pagination for an endpoint. Can be specified as `paginate: true` in the YAML. """
+
+  #: The number of items per page if the client does not specify a limit.
+  default_limit: int = 100
+
+  #: The maximum number of items per page. Larger limits requested by the client are reduced to this value.
+  max_limit: int = 1000
+
+  def __post_init__(self) -> None:
+    if not 0 < self.default_limit <= self.max_limit:
+      raise ValueError('`PaginationConfig.default_limit` must be positive and not greater than `max_limit`')
+
+  @classmethod
+  def _convert_json(cls, ctx: 'Context') -> t.Any:
+    if ctx.direction.is_deserialize() and ctx.value is True:
+      return cls()
+    return NotImplemented
+
+
+@with_custom_json_converter()
+@dataclasses.dataclass
+class StreamConfig:
+  """
+  Configures a streaming endpoint, which sends a sequence of values of its return type to the client as they
+  become available. Can be specified as `stream: true` in the YAML.
+  """
+
+  #: The number of seconds after which a heartbeat is sent to the client if no value was sent in the meantime.
+  heartbeat: float = 15.0
+
+  #: Also serve the endpoint as a WebSocket on the same path, in addition to Server-Sent Events.
+  websocket: bool = False
+
+  def __post_init__(self) -> None:
+    if self.heartbeat <= 0:
+      raise ValueError('`StreamConfig.heartbeat` must be positive')
+
+  @classmethod
+  def _convert_json(cls, ctx: 'Context') -> t.Any:
+    if ctx.direction.is_deserialize() and ctx.value is True:
+      return cls()
+    return NotImplemented
+
+
+@with_custom_json_converter()
+@dataclasses.dataclass
+class CompressionConfig:
+  """
+  Configures the compression of the responses of an endpoint. Can be specified as `compress: true` or
+  `compress: false` in the YAML.
+  """
+
+  #: Whether responses are compressed.
+  enabled: bool = True
+
+  #: Responses smaller than this number of bytes are sent uncompressed.
+  min_size: int = 1024
+
+  #: The names of the compression algorithms to use as they appear in the `Content-Encoding` header (`gzip`, `br`
+  #: and `zstd`), in order of preference. Defaults to all algorithms that are available on the server.
+  algorithms: list[str] | None = None
+
+  @classmethod
+  def _convert_json(cls, ctx: 'Context') -> t.Any:
+    if ctx.direction.is_deserialize() and isinstance(ctx.value, bool):
+      return cls(ctx.value)
+    return NotImplemented
+
+
+@with_custom_json_converter()
+@dataclasses.dataclass
+class IdempotencyConfig:
+  """
+  Allows clients to safely retry requests to a non-idempotent endpoint by sending an `Idempotency-Key` header. The
+  response to the first request with a key is stored and returned for repeated requests with the same key. Can be
+  specified as `idempotent: true` in the YAML.
+  """
+
+  #: The number of seconds for which responses are stored.
+  ttl: float = 24 * 60 * 60
+
+  def __post_init__(self) -> None:
+    if self.ttl <= 0:
+      raise ValueError('`IdempotencyConfig.ttl` must be positive')
+
+  @classmethod
+  def _convert_json(cls, ctx: 'Context') -> t.Any:
+    if ctx.direction.is_deserialize() and ctx.value is True:
+      return cls()
+    return NotImplemented
+
+
 @dataclasses.dataclass
 class EndpointConfig:
 
@@ -54,6 +151,102 @@ class EndpointConfig:
 
   docs: str | None = None
 
+  #: Enable cursor based pagination for the endpoint. This adds optional `cursor` and `limit` query arguments
+  #: and turns a `list[T]` return type into `page[T]`.
+  paginate: PaginationConfig | None = None
+
+  #: Make this a streaming endpoint, which sends a sequence of values of the #return_ type.
+  stream: StreamConfig | None = None
+
+  #: Configures the compression of responses. Overrides the default compression settings of the server.
+  compress: CompressionConfig | None = None
+
+  #: Accept an `Idempotency-Key` header for `POST`, `PUT` and `PATCH` endpoints.
+  idempotent: IdempotencyConfig | None = None
+
+  #: Rate limiting for this endpoint, in addition to the rate limit of the service.
+  rate_limit: RateLimitConfig | None = None
+
+  #: Generate a companion endpoint named `<name>_bulk` that fetches multiple items at once, see
+  #: #get_bulk_endpoint(). With `bulk: true`, the list argument of the companion endpoint is named after the key
+  #: with an `s` appended, a string names it explicitly, e.g. `bulk: ids`. The endpoint must have a return type and
+  #: exactly one argument (besides authentication), the key of type `string` or `integer`, which must be the last
+  #: segment of the path if it is a path parameter.
+  bulk: bool | str | None = None
+
+  #: Set on the companion endpoint generated for a #bulk endpoint to the name of that endpoint. Cannot be set in
+  #: the YAML. The generated method calls the single-item endpoint for every key unless a service overrides it.
+  bulk_of: str | None = dataclasses.field(default=None, init=False)
+
+  def __post_init__(self) -> None:
+    if self.bulk is False:
+      self.bulk = None
+    if self.bulk is not None:
+      if self.return_ is None or self.args is None or len(self.args) != 1:
+        raise ValueError(f'bulk endpoint {self.http} must have a return type and exactly one argument')
+      key_name = next(iter(self.args))
+      if self.bulk is True:
+        self.bulk = key_name + 's'
+      if not self.bulk.isidentifier() or self.bulk in self.args:
+        raise ValueError(f'invalid argument name {self.bulk!r} for the bulk companion of endpoint {self.http}')
+      if next(iter(self.args.values())).type not in ('string', 'integer'):
+        raise ValueError(f'the argument of bulk endpoint {self.http} must be of type `string` or `integer`')
+      if key_name in self.http.parameters and not re.search(r'/\{' + key_name + r'(:[^}]*)?\}$', self.http.path):
+        raise ValueError(f'the key {key_name!r} of bulk endpoint {self.http} must be the last segment of the path')
+      if self.paginate is not None or self.stream is not None or self.idempotent is not None:
+        raise ValueError(f'bulk endpoint {self.http} cannot be paginated, streaming or idempotent')
+    if self.idempotent is not None:
+      if self.http.method not in ('POST', 'PUT', 'PATCH'):
+        raise ValueError(f'only POST, PUT and PATCH endpoints can be idempotent, got {self.http}')
+      if self.stream is not None:
+        raise ValueError(f'streaming endpoint {self.http} cannot be idempotent')
+    if self.stream is not None:
+      if self.return_ is None:
+        raise ValueError(f'streaming endpoint {self.http} must have a return type')
+      if self.paginate is not None:
+        raise ValueError(f'endpoint {self.http} cannot be both paginated and streaming')
+    if self.paginate is not None:
+      self.resolve_pagination()
+
+  def get_bulk_endpoint(self, name: str) -> 'EndpointConfig':
+    """
+    Returns the companion endpoint for a #bulk endpoint with the given *name*. For an endpoint `GET /users/{id}`
+    with the argument `id: string` that returns `User` and `bulk: ids`, the companion endpoint is `POST /users/_bulk`
+    with the body argument `ids: list[string]` and returns a `map[string, User]`. Keys for which there is no item are
+    omitted.
+    """
+
+    assert isinstance(self.bulk, str) and self.args and self.return_
+    (key_name, key), = self.args.items()
+    path = re.sub(r'/\{' + key_name + r'(:[^}]*)?\}', '', self.http.path).rstrip('/') + '/_bulk'
+    endpoint = EndpointConfig(
+      http=HttpPath('POST ' + path),
+      auth=self.auth,
+      args={self.bulk: ArgumentConfig(f'list[{key.type}]', ParamKind.body)},
+      return_=f'map[{key.type}, {self.return_}]',
+      docs=f'Fetches multiple items with `{name}` at once. Keys for which there is no item are omitted.',
+      compress=self.compress,
+      rate_limit=self.rate_limit,
+    )
+    endpoint.bulk_of = name
+    return endpoint
+
+  def resolve_pagination(self) -> None:
+    """ Adds the pagination arguments and adjusts the return type for an endpoint with #paginate enabled. """
+
+    assert self.paginate is not None
+    args = self.args if self.args is not None else {}
+    for arg_name, type_ in {'cursor': 'optional[string]', 'limit': 'optional[integer]'}.items():
+      if arg_name in args and (args[arg_name].type != type_ or args[arg_name].kind not in (None, ParamKind.query)):
+        raise ValueError(f'argument {arg_name!r} is reserved for pagination')
+      args[arg_name] = ArgumentConfig(type_, ParamKind.query)
+    self.args = args
+
+    if self.return_ is None or not self.return_.startswith(('list[', 'page[')):
+      raise ValueError(f'paginated endpoint {self.http} must return `list[T]` or `page[T]`, got {self.return_!r}')
+    if self.return_.startswith('list['):
+      self.return_ = 'page[' + self.return_[len('list['):]
+
   def resolve_arg_kinds(self) -> None:
     """ Ensures that the #ArgumentConfig.kind is set for all arguments in the endpoint. Infers the types of args
     for which the kind is not set based on the #http path parameters and HTTP method (the first unspecified
@@ -89,3 +282,7 @@ class EndpointConfig:
         num_body_args = 1
       else:
         arg.kind = ParamKind.query
+
+    for arg_name, arg in self.args.items():
+      if (arg.type.startswith('stream[') or arg.type == 'binary') and arg.kind != ParamKind.body:
+        raise ValueError(f'argument {arg_name!r} in {self.http} of type {arg.type} must be the body argument')
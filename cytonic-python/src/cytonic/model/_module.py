@@ -9,6 +9,7 @@ import yaml
 from ._auth import AuthenticationConfig
 from ._endpoint import EndpointConfig
 from ._error import ErrorConfig
+from ._rate_limit import RateLimitConfig
 from ._type import TypeConfig
 
 
@@ -33,6 +34,20 @@ class ModuleConfig:
   #: Authentication configuration.
   auth: AuthenticationConfig | None = None
 
+  #: Rate limiting for all endpoints of the service, in addition to the rate limits of the individual endpoints.
+  rate_limit: RateLimitConfig | None = None
+
+  def __post_init__(self) -> None:
+    endpoints: dict[str, EndpointConfig] = {}
+    for name, endpoint in self.endpoints.items():
+      endpoints[name] = endpoint
+      if endpoint.bulk is not None:
+        bulk_name = f'{name}_bulk'
+        if bulk_name in self.endpoints:
+          raise ValueError(f'endpoint {bulk_name!r} collides with the bulk companion of endpoint {name!r}')
+        endpoints[bulk_name] = endpoint.get_bulk_endpoint(name)
+    self.endpoints = endpoints
+
 
 def load_module(config: dict[str, t.Any] | str | Path, filename: str | None = None) -> ModuleConfig:
   """ Loads a module configuration from a nested structure, YAML string or YAML file. """
@@ -18,8 +18,6 @@ class Project:
 
   modules: dict[str, ModuleConfig] = dataclasses.field(default_factory=dict)
 
-  TypeLocator: t.ClassVar = TypeLocator
-
   @classmethod
   def from_files(cls, files: list[str | Path]) -> 'Project':
     project = cls()
@@ -0,0 +1,44 @@
+import dataclasses
+import enum
+import math
+
+
+class RateLimitKey(enum.Enum):
+  """ What identifies a client for rate limiting. """
+
+  #: The bearer token or the username of basic authentication, or the IP address if the client is not
+  #: authenticated.
+  credentials = 'credentials'
+
+  #: The IP address of the client.
+  ip = 'ip'
+
+
+@dataclasses.dataclass
+class RateLimitConfig:
+  """
+  Configures token bucket rate limiting for a service or an endpoint. Every client has a bucket that holds up to
+  #burst tokens and is refilled with #rate tokens per second, and every request takes one token. Requests are
+  rejected while the bucket is empty.
+  """
+
+  #: The number of requests per second that a client can make on average.
+  rate: float
+
+  #: The number of requests that a client can make at once. Defaults to the #rate, but at least one.
+  burst: int | None = None
+
+  #: What identifies a client.
+  key: RateLimitKey = RateLimitKey.credentials
+
+  def __post_init__(self) -> None:
+    if self.rate <= 0:
+      raise ValueError('`RateLimitConfig.rate` must be positive')
+    if self.burst is not None and self.burst < 1:
+      raise ValueError('`RateLimitConfig.burst` must be at least 1')
+
+  @property
+  def capacity(self) -> int:
+    """ The number of tokens that a bucket can hold. """
+
+    return self.burst if self.burst is not None else max(1, math.ceil(self.rate))
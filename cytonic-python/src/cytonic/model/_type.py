@@ -110,6 +110,11 @@ class FieldConfig:
   docs: str | None = None
   default: t.Any = NotSet.Value
 
+  #: The field number in positional binary encodings. Fields without an explicit number are numbered in the
+  #: order that they are declared in. Set it explicitly to keep the encoding compatible when fields are added
+  #: or removed.
+  number: int | None = None
+
   @classmethod
   def _convert_json(cls, ctx: Context) -> t.Any:
     if ctx.direction.is_deserialize() and isinstance(ctx.value, str):
@@ -145,3 +150,36 @@ class TypeConfig:
     for group1, group2 in itertools.permutations(groups, 2):
       if any(getattr(self, n) is not None for n in group1) and any(getattr(self, n) is not None for n in group2):
         raise ValueError(f'TypeConfig {group1} cannot be mixed with {group2}')
+    if self.fields:
+      self.field_numbers()
+
+  def field_numbers(self) -> dict[str, int]:
+    """ Returns the field numbers of the struct for positional binary encodings. """
+
+    fields = self.fields or {}
+    return assign_field_numbers(list(fields), {k: f.number for k, f in fields.items() if f.number is not None})
+
+
+def assign_field_numbers(field_names: t.Sequence[str], explicit: t.Mapping[str, int]) -> dict[str, int]:
+  """
+  Assigns a number to every field in *field_names*. Fields in *explicit* keep their number, all other fields are
+  numbered in order starting from 1, skipping numbers that are already taken.
+  """
+
+  taken = set(explicit.values())
+  if len(taken) != len(explicit):
+    raise ValueError(f'duplicate field numbers: {dict(explicit)}')
+  if any(n < 1 for n in taken):
+    raise ValueError(f'field numbers must be positive: {dict(explicit)}')
+
+  result = {}
+  next_number = 1
+  for name in field_names:
+    if name in explicit:
+      result[name] = explicit[name]
+      continue
+    while next_number in taken:
+      next_number += 1
+    result[name] = next_number
+    taken.add(next_number)
+  return result
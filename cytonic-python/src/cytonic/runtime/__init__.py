@@ -1,5 +1,13 @@
 
 """ Classes required at runtime when implementing servers or using clients. """
 
+from .arrays import DoubleArray, IntegerArray
 from .auth import BasicAuth, BearerToken, Credentials
-from .exceptions import ConflictError, IllegalArgumentError, NotFoundError, UnauthorizedError, ServiceException
+from .binary import Binary
+from .bulk import fetch_bulk, fetch_bulk_blocking
+from .exceptions import ConflictError, IllegalArgumentError, NotFoundError, UnauthorizedError, ServiceException, \
+  TooManyRequestsError
+from .loader import DataLoader, scoped
+from .pagination import Page
+from .principal import PrincipalResolver, get_principal
+from .ref import Ref
@@ -0,0 +1,50 @@
+""" Helpers to inspect the Python types that values are serialized from. """
+
+import dataclasses
+import functools
+import typing as t
+
+
+def get_dataclass(type_: t.Any) -> type | None:
+  """ Returns the dataclass if *type_* is a dataclass or a parametrized generic dataclass (e.g. `Page[User]`). """
+
+  if isinstance(type_, type):
+    return type_ if dataclasses.is_dataclass(type_) else None
+  origin = t.get_origin(type_)
+  if isinstance(origin, type) and dataclasses.is_dataclass(origin):
+    return origin
+  return None
+
+
+def is_struct_type(type_: t.Any) -> bool:
+  """
+  Returns `True` if *type_* is a (parametrized generic) dataclass that is serialized as a struct. Dataclasses that
+  set `__cytonic_scalar__` are serialized by a custom converter instead (e.g. #Ref and #TypedArray).
+  """
+
+  cls = get_dataclass(type_)
+  return cls is not None and not getattr(cls, '__cytonic_scalar__', False)
+
+
+@functools.lru_cache(maxsize=None)
+def get_type_hints(type_: t.Any) -> dict[str, t.Any]:
+  """ Returns the type hints of a (parametrized generic) dataclass with type variables replaced. """
+
+  cls = get_dataclass(type_)
+  if cls is None:
+    raise TypeError(f'not a dataclass: {type_!r}')
+  hints = t.get_type_hints(cls, include_extras=True)
+  parameters = getattr(cls, '__parameters__', ())
+  if cls is type_ or not parameters:
+    return hints
+  mapping = dict(zip(parameters, t.get_args(type_)))
+  return {k: _substitute(v, mapping) for k, v in hints.items()}
+
+
+def _substitute(hint: t.Any, mapping: dict[t.Any, t.Any]) -> t.Any:
+  if isinstance(hint, t.TypeVar):
+    return mapping.get(hint, hint)
+  parameters = getattr(hint, '__parameters__', ())
+  if parameters:
+    return hint[tuple(mapping.get(p, p) for p in parameters)]
+  return hint
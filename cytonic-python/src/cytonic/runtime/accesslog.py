@@ -0,0 +1,163 @@
+"""
+A structured access log that does not slow down the requests it logs. The router hands one #AccessLogRecord per
+request to the #AccessLog, which puts it in a queue without taking a lock. A background thread writes the records
+in batches as JSON lines. If the queue is full because the writer cannot keep up, records are dropped instead of
+blocking the request.
+"""
+
+from __future__ import annotations
+
+import collections
+import dataclasses
+import json
+import os
+import random
+import sys
+import threading
+import typing as t
+
+from cytonic.model import BasicAuth, NoAuth, OAuth2Bearer
+
+from .auth import Credentials
+
+_CREDENTIAL_TYPES = {OAuth2Bearer: 'oauth2_bearer', BasicAuth: 'basic', NoAuth: 'none'}
+
+
+def get_credentials_type(credentials: Credentials | None) -> str | None:
+  """ Returns the name of the authentication method of the *credentials*, as used in the YAML specification. """
+
+  if credentials is None:
+    return None
+  if not credentials:
+    return 'none'
+  return _CREDENTIAL_TYPES.get(type(credentials.config))
+
+
+@dataclasses.dataclass
+class AccessLogRecord:
+  """ Describes a request that was handled by the router. Times are in seconds. """
+
+  service: str
+  endpoint: str
+  method: str
+
+  #: The path template of the endpoint, as in the `HttpPath` of its specification.
+  path: str
+
+  #: The time at which the request was dispatched, in seconds since the epoch.
+  timestamp: float
+  status: int = 0
+
+  #: The `ERROR_CODE` of the #ServiceException that the request failed with, if any.
+  error_code: str | None = None
+  duration: float = 0.0
+
+  #: The durations of the phases of the request: `auth`, `decode`, `handler` and `encode`.
+  phases: dict[str, float] = dataclasses.field(default_factory=dict)
+
+  #: The `Content-Length` of the request, if it was specified.
+  bytes_in: int | None = None
+
+  #: The `Content-Length` of the response, unless it was streamed.
+  bytes_out: int | None = None
+
+  #: The authentication method of the request, see #get_credentials_type().
+  credentials: str | None = None
+
+
+class AccessLog:
+  """
+  Writes a sample of *sample_rate* of the requests as JSON lines to the *target*, which is a filename, a text
+  stream or standard output by default. Records are written by a background thread every *flush_interval* seconds
+  or as soon as *batch_size* records are queued, whichever is earlier. At most *max_queue_size* records are queued,
+  and further records are dropped and counted in #dropped until the writer catches up.
+
+  The writer thread is started with the first record. Call #close() to write the remaining records at shutdown.
+  """
+
+  def __init__(
+    self,
+    target: str | os.PathLike[str] | t.TextIO | None = None,
+    sample_rate: float = 1.0,
+    max_queue_size: int = 10_000,
+    batch_size: int = 500,
+    flush_interval: float = 1.0,
+  ) -> None:
+    if not 0.0 <= sample_rate <= 1.0:
+      raise ValueError('`sample_rate` must be between 0 and 1')
+    self.sample_rate = sample_rate
+    self.max_queue_size = max_queue_size
+    self.batch_size = batch_size
+    self.flush_interval = flush_interval
+
+    #: The number of records that were dropped because the queue was full.
+    self.dropped = 0
+
+    self._target = target
+    self._queue: collections.deque[AccessLogRecord] = collections.deque()
+    self._wakeup = threading.Event()
+    self._closed = False
+    self._thread: threading.Thread | None = None
+    self._start_lock = threading.Lock()
+
+  def should_log(self) -> bool:
+    """ Returns `True` if the next request should be logged according to the sample rate. """
+
+    return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+  def log(self, record: AccessLogRecord) -> None:
+    """ Queues the *record* for writing, or drops it if the queue is full. Never blocks. """
+
+    if self._closed:
+      return
+    if len(self._queue) >= self.max_queue_size:
+      self.dropped += 1
+      return
+    self._queue.append(record)
+    if self._thread is None:
+      self._start()
+    elif len(self._queue) >= self.batch_size:
+      self._wakeup.set()
+
+  def close(self) -> None:
+    """ Writes the queued records and stops the writer thread. """
+
+    self._closed = True
+    if self._thread is not None:
+      self._wakeup.set()
+      self._thread.join()
+      self._thread = None
+
+  def _start(self) -> None:
+    with self._start_lock:
+      if self._thread is None:
+        self._thread = threading.Thread(target=self._run, name='cytonic-access-log', daemon=True)
+        self._thread.start()
+
+  def _run(self) -> None:
+    if self._target is None:
+      fp, owned = sys.stdout, False
+    elif hasattr(self._target, 'write'):
+      fp, owned = t.cast(t.TextIO, self._target), False
+    else:
+      fp, owned = open(self._target, 'a', encoding='utf-8'), True
+
+    try:
+      while True:
+        self._wakeup.wait(self.flush_interval)
+        self._wakeup.clear()
+        closed = self._closed
+        while self._queue:
+          self._write_batch(fp)
+        if closed:
+          break
+    finally:
+      if owned:
+        fp.close()
+
+  def _write_batch(self, fp: t.TextIO) -> None:
+    lines = []
+    for _ in range(min(self.batch_size, len(self._queue))):
+      lines.append(json.dumps(dataclasses.asdict(self._queue.popleft()), separators=(',', ':')) + '\n')
+    fp.write(''.join(lines))
+    fp.flush()
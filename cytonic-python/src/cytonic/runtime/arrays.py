@@ -0,0 +1,108 @@
+"""
+Typed numeric arrays, written as `array[double]` and `array[integer]` in the YAML configuration. They are backed
+by #array.array, such that the values are not stored as individual Python objects, and are serialized as packed
+little-endian buffers in binary encodings and as lists of numbers in JSON. NumPy arrays are accepted wherever a
+typed array is expected, and #TypedArray.to_numpy() converts to one without copying.
+"""
+
+from __future__ import annotations
+
+import array
+import contextlib
+import contextvars
+import dataclasses
+import sys
+import typing as t
+
+from databind.core import Context
+from databind.json.annotations import with_custom_json_converter
+
+_packed: contextvars.ContextVar[bool] = contextvars.ContextVar('_packed', default=False)
+
+
+@contextlib.contextmanager
+def packed_arrays(enabled: bool = True) -> t.Iterator[None]:
+  """
+  While enabled, typed arrays are serialized as packed little-endian `bytes` instead of lists by databind. This
+  is used by encodings that support binary data.
+  """
+
+  token = _packed.set(enabled)
+  try:
+    yield
+  finally:
+    _packed.reset(token)
+
+
+class TypedArray(array.array):
+  """ Base class for typed arrays with a fixed #TYPECODE. """
+
+  TYPECODE: t.ClassVar[str]
+  __cytonic_scalar__: t.ClassVar[bool] = True
+
+  def __new__(cls, values: t.Iterable[t.Any] | bytes = ()) -> TypedArray:
+    if isinstance(values, (bytes, bytearray, memoryview)):
+      return cls.frombuffer(values)
+    if hasattr(values, 'tolist') and not isinstance(values, array.array):
+      values = values.tolist()  # NumPy arrays
+    return super().__new__(cls, cls.TYPECODE, values)
+
+  def __reduce__(self) -> t.Any:
+    return (type(self), (self.tobytes(),))
+
+  @classmethod
+  def frombuffer(cls, data: bytes | bytearray | memoryview) -> TypedArray:
+    """ Creates an array from packed little-endian values. """
+
+    result = super().__new__(cls, cls.TYPECODE)
+    result.frombytes(data)
+    if sys.byteorder == 'big':
+      result.byteswap()
+    return result
+
+  def tobuffer(self) -> bytes:
+    """ Returns the values packed as little-endian. """
+
+    if sys.byteorder == 'big':
+      swapped = type(self)(self)
+      swapped.byteswap()
+      return swapped.tobytes()
+    return self.tobytes()
+
+  def to_numpy(self) -> t.Any:
+    """ Returns a NumPy array that shares the memory of this array. Requires the `numpy` package. """
+
+    import numpy
+    return numpy.frombuffer(self, dtype=self.TYPECODE)
+
+  @classmethod
+  def _convert_json(cls, ctx: Context) -> t.Any:
+    if ctx.direction.is_serialize():
+      value = ctx.value if isinstance(ctx.value, cls) else cls(ctx.value)
+      return value.tobuffer() if _packed.get() else value.tolist()
+    if isinstance(ctx.value, (bytes, bytearray, memoryview)):
+      return cls.frombuffer(ctx.value)
+    if isinstance(ctx.value, list):
+      try:
+        return cls(ctx.value)
+      except TypeError as exc:
+        raise ctx.error(str(exc))
+    raise ctx.type_error(expected='list or bytes')
+
+
+# NOTE: The typed arrays are dataclasses without fields only because databind applies custom converters to
+#   dataclasses only.
+@with_custom_json_converter()
+@dataclasses.dataclass(init=False, repr=False, eq=False)
+class DoubleArray(TypedArray):
+  """ An array of 64-bit floating point numbers. """
+
+  TYPECODE = 'd'
+
+
+@with_custom_json_converter()
+@dataclasses.dataclass(init=False, repr=False, eq=False)
+class IntegerArray(TypedArray):
+  """ An array of 64-bit signed integers. """
+
+  TYPECODE = 'q'
@@ -0,0 +1,86 @@
+"""
+Binary payloads, written as `binary` in the YAML configuration. Unlike `bytes`, which is held in memory and can
+be used anywhere (it is base64 encoded in JSON), a #Binary can only be the body argument or the return type of an
+endpoint and is transferred as the raw request or response body, such that large payloads are streamed instead
+of being copied into memory.
+"""
+
+from __future__ import annotations
+
+import os
+import typing as t
+
+OCTET_STREAM = 'application/octet-stream'
+
+
+class Binary:
+  """
+  A binary payload that is backed by bytes in memory, by a file on disk or by an (async) iterable of chunks. The
+  payload can only be consumed once if it is backed by an iterable.
+
+  When returned from an endpoint, a file backed payload is sent as a file response, which servers can transfer
+  with `sendfile()`, and an iterable is sent as a streaming response. A request body is passed to the endpoint
+  as a #Binary backed by the chunks received from the client.
+  """
+
+  def __init__(
+    self,
+    data: bytes | memoryview | t.AsyncIterable[bytes] | t.Iterable[bytes],
+    media_type: str = OCTET_STREAM,
+    size: int | None = None,
+  ) -> None:
+    if isinstance(data, (bytes, memoryview)) and size is None:
+      size = len(data)
+    self._data = data
+    self._path: str | None = None
+    self.media_type = media_type
+    self.size = size
+
+  def __repr__(self) -> str:
+    source = self._path if self._path is not None else type(self._data).__name__
+    return f'Binary({source}, media_type={self.media_type!r}, size={self.size!r})'
+
+  @classmethod
+  def from_path(cls, path: str | os.PathLike[str], media_type: str = OCTET_STREAM) -> Binary:
+    """ Creates a #Binary backed by the file at *path*. The file is read lazily. """
+
+    binary = cls(_iter_file(os.fspath(path)), media_type, os.path.getsize(path))
+    binary._path = os.fspath(path)
+    return binary
+
+  @property
+  def path(self) -> str | None:
+    """ The path of the file that backs the payload, if any. """
+
+    return self._path
+
+  @property
+  def data(self) -> bytes | memoryview | None:
+    """ The payload if it is held in memory, otherwise `None`. """
+
+    return self._data if isinstance(self._data, (bytes, memoryview)) else None
+
+  async def __aiter__(self) -> t.AsyncIterator[bytes | memoryview]:
+    """ Iterates over the chunks of the payload without copying them. """
+
+    if isinstance(self._data, (bytes, memoryview)):
+      yield self._data
+    elif isinstance(self._data, t.AsyncIterable):
+      async for chunk in self._data:
+        yield chunk
+    else:
+      for chunk in self._data:
+        yield chunk
+
+  async def read(self) -> bytes:
+    """ Reads the whole payload into memory. """
+
+    if isinstance(self._data, bytes):
+      return self._data
+    return b''.join([bytes(chunk) async for chunk in self])
+
+
+def _iter_file(path: str, chunk_size: int = 64 * 1024) -> t.Iterator[bytes]:
+  with open(path, 'rb') as fp:
+    while chunk := fp.read(chunk_size):
+      yield chunk
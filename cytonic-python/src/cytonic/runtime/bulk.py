@@ -0,0 +1,54 @@
+"""
+Default implementations of the companion endpoints that are generated for `bulk` endpoints, which fetch multiple
+items by calling the single-item endpoint for every key.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import typing as t
+
+from .exceptions import NotFoundError
+
+K = t.TypeVar('K', bound=t.Hashable)
+V = t.TypeVar('V')
+
+
+async def fetch_bulk(
+  keys: t.Iterable[K],
+  fetch: t.Callable[[K], t.Awaitable[V]],
+  concurrency: int = 16,
+) -> dict[K, V]:
+  """
+  Calls *fetch* for every unique key in *keys*, with at most *concurrency* calls at a time, and returns a
+  dictionary that maps the keys to the results. Keys for which *fetch* raises a #NotFoundError are omitted.
+  """
+
+  semaphore = asyncio.Semaphore(concurrency)
+  missing: t.Any = object()
+
+  async def _fetch(key: K) -> V:
+    async with semaphore:
+      try:
+        return await fetch(key)
+      except NotFoundError:
+        return missing
+
+  unique_keys = list(dict.fromkeys(keys))
+  results = await asyncio.gather(*map(_fetch, unique_keys))
+  return {key: value for key, value in zip(unique_keys, results) if value is not missing}
+
+
+def fetch_bulk_blocking(keys: t.Iterable[K], fetch: t.Callable[[K], V]) -> dict[K, V]:
+  """
+  Calls *fetch* for every unique key in *keys* one after another and returns a dictionary that maps the keys to
+  the results. Keys for which *fetch* raises a #NotFoundError are omitted.
+  """
+
+  result = {}
+  for key in dict.fromkeys(keys):
+    try:
+      result[key] = fetch(key)
+    except NotFoundError:
+      pass
+  return result
@@ -0,0 +1,200 @@
+"""
+A schema-aware positional binary encoding. Struct fields are written as a MessagePack array indexed by their field
+number instead of a map keyed by field name, which makes payloads like `list[TodoItem]` considerably smaller and
+allows decoding them without a lookup per field. Requires the `msgpack` package.
+
+Field numbers are derived from the order of the dataclass fields, which matches the order of the fields in the
+YAML configuration. Fields that have an explicit number (see #FieldConfig.number) carry it in their dataclass
+field metadata under the #FIELD_NUMBER_METADATA_KEY.
+"""
+
+import dataclasses
+import textwrap
+import types
+import typing as t
+
+import databind.json
+
+from cytonic.model import assign_field_numbers
+from ._typing import get_dataclass, get_type_hints, is_struct_type
+from .arrays import TypedArray
+from .encoding import Encoding
+from .projection import Projection
+
+FIELD_NUMBER_METADATA_KEY = 'cytonic.field_number'
+
+_Converter = t.Callable[[t.Any], t.Any]
+
+
+def _identity(value: t.Any) -> t.Any:
+  return value
+
+
+def get_field_numbers(type_: t.Any) -> dict[str, int]:
+  """ Returns the field numbers for the fields of the dataclass *type_* that are accepted by its constructor. """
+
+  cls = get_dataclass(type_)
+  if cls is None:
+    raise TypeError(f'expected a dataclass, got {type_!r}')
+  fields = [f for f in dataclasses.fields(cls) if f.init]
+  explicit = {f.name: f.metadata[FIELD_NUMBER_METADATA_KEY] for f in fields if FIELD_NUMBER_METADATA_KEY in f.metadata}
+  return assign_field_numbers([f.name for f in fields], explicit)
+
+
+@dataclasses.dataclass
+class CompactCodec:
+  """ A pair of functions to convert values of a type to and from their positional wire form. """
+
+  encode: _Converter
+  decode: _Converter
+
+
+class CompactCodecs:
+  """
+  Compiles and caches a #CompactCodec per type. Codecs for dataclasses are generated as Python code specific to
+  the struct, other types that have no positional form (e.g. datetimes, decimals, enums, unions and references)
+  are converted with databind, using the same rules as the JSON encoding.
+  """
+
+  def __init__(self) -> None:
+    self._cache: dict[tuple[t.Any, Projection | None], CompactCodec] = {}
+
+  def get(self, type_: t.Any, projection: Projection | None = None) -> CompactCodec:
+    """
+    Returns the codec for *type_*. If a *projection* is specified, the codec's encoder writes only the selected
+    fields of structs and leaves the positions of all other fields empty.
+    """
+
+    key = (type_, projection)
+    try:
+      return self._cache[key]
+    except KeyError:
+      pass
+    if is_struct_type(type_):
+      # Register a codec that resolves the real one lazily first to support recursive types.
+      self._cache[key] = CompactCodec(lambda v: self._cache[key].encode(v), lambda v: self._cache[key].decode(v))
+    try:
+      codec = self._cache[key] = self._compile(type_, projection)
+    except BaseException:
+      self._cache.pop(key, None)
+      raise
+    return codec
+
+  def _compile(self, type_: t.Any, projection: Projection | None) -> CompactCodec:
+    if type_ in (t.Any, object, str, int, bool, bytes, type(None)):
+      return CompactCodec(_identity, _identity)
+    if type_ is float:
+      return CompactCodec(_identity, float)
+    if isinstance(type_, type) and issubclass(type_, TypedArray):
+      array_type = type_
+      return CompactCodec(
+        lambda v: (v if isinstance(v, array_type) else array_type(v)).tobuffer(),
+        array_type.frombuffer,
+      )
+    if is_struct_type(type_):
+      return self._compile_dataclass(type_, projection)
+
+    origin, args = t.get_origin(type_), t.get_args(type_)
+    if origin in (list, set, frozenset) and len(args) == 1:
+      item = self.get(args[0], projection)
+      if item.encode is _identity and item.decode is _identity and origin is list:
+        return CompactCodec(list, list)
+      return CompactCodec(
+        lambda v: [item.encode(x) for x in v],
+        lambda v: origin(item.decode(x) for x in v),
+      )
+    if origin is dict and len(args) == 2:
+      key, value = self.get(args[0]), self.get(args[1], projection)
+      return CompactCodec(
+        lambda v: {key.encode(k): value.encode(x) for k, x in v.items()},
+        lambda v: {key.decode(k): value.decode(x) for k, x in v.items()},
+      )
+    if origin in (t.Union, types.UnionType) and len(args) == 2 and type(None) in args:
+      inner = self.get(args[0] if args[1] is type(None) else args[1], projection)
+      return CompactCodec(
+        lambda v: None if v is None else inner.encode(v),
+        lambda v: None if v is None else inner.decode(v),
+      )
+
+    return CompactCodec(lambda v: databind.json.dump(v, type_), lambda v: databind.json.load(v, type_))
+
+  def _compile_dataclass(self, type_: t.Any, projection: Projection | None) -> CompactCodec:
+    cls = get_dataclass(type_)
+    assert cls is not None, type_
+    numbers = get_field_numbers(cls)
+    selected = dict(projection.fields) if projection else None
+    fields = {f.name: f for f in dataclasses.fields(cls) if f.name in numbers}
+    hints = get_type_hints(type_)
+    scope: dict[str, t.Any] = {'_cls': cls, '_missing': _missing_field}
+    by_position = {numbers[name] - 1: name for name in fields}
+
+    encode_items = []
+    for index in range(max(by_position) + 1 if by_position else 0):
+      if index in by_position and (selected is None or by_position[index] in selected):
+        name = by_position[index]
+        codec = self.get(hints[name], selected[name] if selected else None)
+        scope[f'_e_{name}'] = codec.encode
+        encode_items.append(f'v.{name}' if codec.encode is _identity else f'_e_{name}(v.{name})')
+      else:
+        encode_items.append('None')
+
+    decode_args = []
+    for index, name in sorted(by_position.items()):
+      field = fields[name]
+      codec = self.get(hints[name])
+      scope[f'_d_{name}'] = codec.decode
+      if field.default is not dataclasses.MISSING:
+        scope[f'_default_{name}'] = field.default
+        fallback = f'_default_{name}'
+      elif field.default_factory is not dataclasses.MISSING:
+        scope[f'_factory_{name}'] = field.default_factory
+        fallback = f'_factory_{name}()'
+      else:
+        fallback = f'_missing(_cls, {name!r})'
+      # Positions of fields that were left out by a projection are empty and not passed to the decoder.
+      value = f'a[{index}]' if codec.decode is _identity else f'(None if a[{index}] is None else _d_{name}(a[{index}]))'
+      decode_args.append(f'{name}={value} if n > {index} else {fallback},')
+
+    exec(textwrap.dedent('''
+      def _encode(v):
+        return [{encode_items}]
+      def _decode(a):
+        n = len(a)
+        return _cls(
+          {decode_args}
+        )
+    ''').format(encode_items=', '.join(encode_items), decode_args='\n          '.join(decode_args)), scope)
+    return CompactCodec(scope['_encode'], scope['_decode'])
+
+
+def _missing_field(cls: type, name: str) -> t.NoReturn:
+  raise ValueError(f'missing field {name!r} for {cls.__name__}')
+
+
+class CompactEncoding(Encoding):
+  """ Positional binary encoding for structs on top of MessagePack. Requires the `msgpack` package. """
+
+  media_type = 'application/x-cytonic-compact'
+  binary = True
+
+  def __init__(self, codecs: CompactCodecs | None = None) -> None:
+    import msgpack
+    self._msgpack = msgpack
+    self._codecs = codecs or CompactCodecs()
+
+  def serialize(self, value: t.Any, type_: t.Any | None, projection: Projection | None = None) -> t.Any:
+    if type_ in (None, type(None)):
+      return value
+    return self._codecs.get(type_, projection).encode(value)
+
+  def deserialize(self, value: t.Any, type_: t.Any) -> t.Any:
+    try:
+      return self._codecs.get(type_).decode(value)
+    except (TypeError, IndexError, KeyError, AttributeError) as exc:
+      raise ValueError(f'bad {self.media_type} payload for {type_}: {exc}') from exc
+
+  def encode(self, value: t.Any) -> bytes:
+    return self._msgpack.packb(value, use_bin_type=True)
+
+  def decode(self, data: bytes) -> t.Any:
+    return self._msgpack.unpackb(data, raw=False, strict_map_key=False)
@@ -0,0 +1,122 @@
+""" Compression of encoded payloads and the negotiation of the algorithm through the `Accept-Encoding` header. """
+
+import abc
+import typing as t
+import zlib
+
+
+class Compressor(abc.ABC):
+  """ Base class for compression algorithms. """
+
+  #: The name of the algorithm in the `Accept-Encoding` and `Content-Encoding` headers.
+  name: t.ClassVar[str]
+
+  @abc.abstractmethod
+  def compress(self, data: bytes) -> bytes:
+    ...
+
+  @abc.abstractmethod
+  def decompress(self, data: bytes) -> bytes:
+    ...
+
+
+class GzipCompressor(Compressor):
+
+  name = 'gzip'
+
+  def __init__(self, level: int = 5) -> None:
+    self._level = level
+
+  def compress(self, data: bytes) -> bytes:
+    compressor = zlib.compressobj(self._level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+  def decompress(self, data: bytes) -> bytes:
+    return zlib.decompress(data, 16 + zlib.MAX_WBITS)
+
+
+class BrotliCompressor(Compressor):
+  """ Brotli compression. Requires the `brotli` package. """
+
+  name = 'br'
+
+  def __init__(self, quality: int = 4) -> None:
+    import brotli
+    self._brotli = brotli
+    self._quality = quality
+
+  def compress(self, data: bytes) -> bytes:
+    return self._brotli.compress(data, quality=self._quality)
+
+  def decompress(self, data: bytes) -> bytes:
+    return self._brotli.decompress(data)
+
+
+class ZstdCompressor(Compressor):
+  """ Zstandard compression. Requires the `zstandard` package. """
+
+  name = 'zstd'
+
+  def __init__(self, level: int = 3) -> None:
+    import zstandard
+    self._compressor = zstandard.ZstdCompressor(level=level)
+    self._decompressor = zstandard.ZstdDecompressor()
+
+  def compress(self, data: bytes) -> bytes:
+    return self._compressor.compress(data)
+
+  def decompress(self, data: bytes) -> bytes:
+    return self._decompressor.decompress(data)
+
+
+def default_compressors() -> list[Compressor]:
+  """ Returns the compressors for which the required packages are installed, from the most effective one. """
+
+  compressors: list[Compressor] = []
+  for compressor_type in (ZstdCompressor, BrotliCompressor, GzipCompressor):
+    try:
+      compressors.append(compressor_type())
+    except ImportError:
+      pass
+  return compressors
+
+
+def negotiate_compression(accept_encoding: str | None, compressors: t.Sequence[Compressor]) -> Compressor | None:
+  """
+  Picks the compressor with the highest quality in an `Accept-Encoding` header, preferring the one that comes
+  first in *compressors* if the qualities are equal. Returns `None` if the response should not be compressed.
+  """
+
+  if not accept_encoding:
+    return None
+
+  qualities: dict[str, float] = {}
+  for item in accept_encoding.split(','):
+    name, _, parameters = item.partition(';')
+    quality = 1.0
+    key, _, value = parameters.partition('=')
+    if key.strip().lower() == 'q':
+      try:
+        quality = float(value)
+      except ValueError:
+        continue
+    qualities[name.strip().lower()] = quality
+
+  best: Compressor | None = None
+  best_quality = 0.0
+  for compressor in compressors:
+    quality = qualities.get(compressor.name, qualities.get('*', 0.0))
+    if quality > best_quality:
+      best, best_quality = compressor, quality
+  return best
+
+
+def decompress(data: bytes, content_encoding: str | None, compressors: t.Sequence[Compressor]) -> bytes:
+  """ Decompresses a payload according to its `Content-Encoding` header. """
+
+  if not content_encoding or content_encoding == 'identity':
+    return data
+  for compressor in compressors:
+    if compressor.name == content_encoding:
+      return compressor.decompress(data)
+  raise ValueError(f'unsupported Content-Encoding: {content_encoding!r}')
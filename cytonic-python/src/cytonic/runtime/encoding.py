@@ -0,0 +1,178 @@
+""" Wire encodings for request and response payloads and the negotiation between them. """
+
+import abc
+import json
+import typing as t
+
+import databind.json
+
+from .arrays import packed_arrays
+from .projection import Projection
+
+
+class Encoding(abc.ABC):
+  """
+  Base class for wire encodings. By default, an encoding only turns the JSON-compatible structure produced by
+  `databind.json.dump()` into bytes and back, such that the type-driven rules for datetimes, decimals, sets,
+  maps and unions are the same for every encoding. Schema-aware encodings override #serialize() and
+  #deserialize().
+  """
+
+  #: The media type that identifies the encoding in the `Accept` and `Content-Type` headers.
+  media_type: t.ClassVar[str]
+
+  #: Alternative media types that are accepted for the encoding.
+  media_type_aliases: t.ClassVar[tuple[str, ...]] = ()
+
+  #: Whether the encoding supports binary data. If so, typed arrays are serialized as packed buffers.
+  binary: t.ClassVar[bool] = False
+
+  def matches(self, media_type: str) -> bool:
+    return media_type == self.media_type or media_type in self.media_type_aliases
+
+  def serialize(self, value: t.Any, type_: t.Any | None, projection: Projection | None = None) -> t.Any:
+    """
+    Converts *value* of the Python type *type_* to the structure that is passed to #encode(). The type is ignored
+    if it is `None`. If a *projection* is specified, only the fields of structs selected by it are serialized.
+    """
+
+    with packed_arrays(self.binary):
+      if projection is not None:
+        return projection.dump(value, type_)
+      elif type_ not in (None, type(None)):
+        return databind.json.dump(value, type_)
+    return value
+
+  def deserialize(self, value: t.Any, type_: t.Any) -> t.Any:
+    """ Converts a structure returned by #decode() to the Python type *type_*. """
+
+    return databind.json.load(value, type_)
+
+  def dump(self, value: t.Any, type_: t.Any | None, projection: Projection | None = None) -> bytes:
+    return self.encode(self.serialize(value, type_, projection))
+
+  def load(self, data: bytes, type_: t.Any) -> t.Any:
+    return self.deserialize(self.decode(data), type_)
+
+  @abc.abstractmethod
+  def encode(self, value: t.Any) -> bytes:
+    ...
+
+  @abc.abstractmethod
+  def decode(self, data: bytes) -> t.Any:
+    ...
+
+
+class JsonEncoding(Encoding):
+
+  media_type = 'application/json'
+
+  def encode(self, value: t.Any) -> bytes:
+    return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+  def decode(self, data: bytes) -> t.Any:
+    return json.loads(data)
+
+
+class MsgpackEncoding(Encoding):
+  """ MessagePack encoding. Requires the `msgpack` package. """
+
+  media_type = 'application/msgpack'
+  media_type_aliases = ('application/x-msgpack',)
+  binary = True
+
+  def __init__(self) -> None:
+    import msgpack
+    self._msgpack = msgpack
+
+  def encode(self, value: t.Any) -> bytes:
+    return self._msgpack.packb(value, use_bin_type=True)
+
+  def decode(self, data: bytes) -> t.Any:
+    return self._msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+class CborEncoding(Encoding):
+  """ CBOR encoding. Requires the `cbor2` package. """
+
+  media_type = 'application/cbor'
+  binary = True
+
+  def __init__(self) -> None:
+    import cbor2
+    self._cbor2 = cbor2
+
+  def encode(self, value: t.Any) -> bytes:
+    return self._cbor2.dumps(value)
+
+  def decode(self, data: bytes) -> t.Any:
+    return self._cbor2.loads(data)
+
+
+def default_encodings() -> list[Encoding]:
+  """ Returns JSON, followed by all binary encodings for which the required packages are installed. """
+
+  encodings: list[Encoding] = [JsonEncoding()]
+  for encoding_type in (MsgpackEncoding, CborEncoding):
+    try:
+      encodings.append(encoding_type())
+    except ImportError:
+      pass
+  return encodings
+
+
+def parse_media_type(value: str) -> tuple[str, dict[str, str]]:
+  """ Splits a media type like `application/json; charset=utf-8` into the type and its parameters. """
+
+  media_type, *parameters = value.split(';')
+  result = {}
+  for parameter in parameters:
+    key, _, param_value = parameter.partition('=')
+    result[key.strip().lower()] = param_value.strip().strip('"')
+  return media_type.strip().lower(), result
+
+
+def negotiate_encoding(accept: str | None, encodings: t.Sequence[Encoding]) -> Encoding:
+  """
+  Picks the encoding with the highest quality from an `Accept` header. The first of the *encodings* is used as
+  the fallback if the header is missing or none of the media types it lists is supported, which is why it should
+  always be the JSON encoding.
+  """
+
+  if not accept:
+    return encodings[0]
+
+  best: Encoding | None = None
+  best_quality = 0.0
+  for item in accept.split(','):
+    media_type, parameters = parse_media_type(item)
+    try:
+      quality = float(parameters.get('q', '1'))
+    except ValueError:
+      continue
+    if quality <= best_quality:
+      continue
+    if media_type in ('*/*', 'application/*'):
+      best, best_quality = encodings[0], quality
+      continue
+    for encoding in encodings:
+      if encoding.matches(media_type):
+        best, best_quality = encoding, quality
+        break
+
+  return best or encodings[0]
+
+
+def find_encoding(content_type: str | None, encodings: t.Sequence[Encoding]) -> Encoding | None:
+  """
+  Returns the encoding matching the `Content-Type` of a request, or `None` if the content type is not supported.
+  A missing content type is assumed to be the first of the *encodings*.
+  """
+
+  if not content_type:
+    return encodings[0]
+  media_type = parse_media_type(content_type)[0]
+  for encoding in encodings:
+    if encoding.matches(media_type):
+      return encoding
+  return None
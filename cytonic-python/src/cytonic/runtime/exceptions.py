@@ -4,6 +4,15 @@ import typing as t
 
 from nr.util.safearg import Arg
 
+#: The HTTP status codes of the builtin error codes. Other error codes are sent with status code 500.
+STATUS_CODES: dict[str, int] = {
+  'UNAUTHORIZED': 403,
+  'NOT_FOUND': 404,
+  'CONFLICT': 409,
+  'ILLEGAL_ARGUMENT': 400,
+  'TOO_MANY_REQUESTS': 429,
+}
+
 
 class ServiceException(Exception):
   """
@@ -56,3 +65,16 @@ class ConflictError(ServiceException):
 class IllegalArgumentError(ServiceException):
   ERROR_CODE = 'ILLEGAL_ARGUMENT'
   ERROR_NAME = 'Default:IllegalArgument'
+
+
+@dataclasses.dataclass
+class TooManyRequestsError(ServiceException):
+  """ Raised if a client exceeds a rate limit. The client can retry after *retry_after* seconds. """
+
+  ERROR_CODE = 'TOO_MANY_REQUESTS'
+  ERROR_NAME = 'Default:TooManyRequests'
+
+  retry_after: float
+
+  def __post_init__(self) -> None:
+    super().__init__()
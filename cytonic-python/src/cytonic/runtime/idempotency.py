@@ -0,0 +1,122 @@
+"""
+Stores for the responses of idempotent endpoints (see #IdempotencyConfig). The router stores the result of the
+first request with an `Idempotency-Key` and returns it for repeated requests with the same key. Implement the
+#IdempotencyStore interface to share the responses between multiple processes, e.g. with Redis.
+"""
+
+from __future__ import annotations
+
+import abc
+import asyncio
+import collections
+import dataclasses
+import time
+import typing as t
+
+
+@dataclasses.dataclass
+class StoredResponse:
+  """
+  The result of the first request with an idempotency key. The result is stored independent of the encoding and
+  compression that were negotiated for that request, and is encoded again for every repeated request, such that
+  every client receives the representation that it asked for.
+  """
+
+  status_code: int
+
+  #: The JSON encoded return value of the endpoint, or the error if the #status_code is not successful.
+  body: bytes
+
+  #: A hash of the request that the response was sent for, to detect the reuse of a key for a different request.
+  fingerprint: str
+
+
+class IdempotencyStore(abc.ABC):
+  """ Interface for the storage of the responses to requests with an idempotency key. """
+
+  @abc.abstractmethod
+  async def get(self, key: str) -> StoredResponse | None:
+    """ Returns the response stored for *key*, unless it does not exist or has expired. """
+
+  @abc.abstractmethod
+  async def put(self, key: str, response: StoredResponse, ttl: float) -> None:
+    """ Stores the *response* for *key* for *ttl* seconds. """
+
+
+class MemoryIdempotencyStore(IdempotencyStore):
+  """
+  Stores responses in memory. Expired responses are removed as they are encountered, and the least recently used
+  responses are removed if more than *max_size* responses or more than *max_bytes* bytes of response bodies are
+  stored.
+  """
+
+  def __init__(self, max_size: int = 10_000, max_bytes: int = 64 * 1024 * 1024) -> None:
+    self.max_size = max_size
+    self.max_bytes = max_bytes
+    self._entries: collections.OrderedDict[str, tuple[float, StoredResponse]] = collections.OrderedDict()
+    self._bytes = 0
+
+  def __len__(self) -> int:
+    return len(self._entries)
+
+  async def get(self, key: str) -> StoredResponse | None:
+    entry = self._entries.get(key)
+    if entry is None:
+      return None
+    if entry[0] <= time.monotonic():
+      self._remove(key)
+      return None
+    self._entries.move_to_end(key)
+    return entry[1]
+
+  async def put(self, key: str, response: StoredResponse, ttl: float) -> None:
+    if key in self._entries:
+      self._remove(key)
+    if len(response.body) > self.max_bytes:
+      return
+    self._entries[key] = (time.monotonic() + ttl, response)
+    self._bytes += len(response.body)
+    while len(self._entries) > self.max_size or self._bytes > self.max_bytes:
+      self._remove(next(iter(self._entries)))
+
+  def _remove(self, key: str) -> None:
+    _, response = self._entries.pop(key)
+    self._bytes -= len(response.body)
+
+
+class InflightRequests:
+  """
+  Tracks the requests with an idempotency key that are currently being processed, such that concurrent requests
+  with the same key wait for the first one instead of calling the endpoint again. This only applies to requests
+  that are handled by the same process.
+  """
+
+  def __init__(self) -> None:
+    self._futures: dict[str, asyncio.Future[StoredResponse | None]] = {}
+
+  def __contains__(self, key: str) -> bool:
+    return key in self._futures
+
+  async def wait(self, key: str) -> StoredResponse | None:
+    """
+    Waits for the request with *key* that is being processed, if any, and returns its response. Returns `None` if
+    no request with *key* is being processed or if its response could not be stored.
+    """
+
+    future = self._futures.get(key)
+    if future is None:
+      return None
+    return await asyncio.shield(future)
+
+  def begin(self, key: str) -> None:
+    """ Marks the request with *key* as being processed. """
+
+    assert key not in self._futures, key
+    self._futures[key] = asyncio.get_running_loop().create_future()
+
+  def end(self, key: str, response: StoredResponse | None) -> None:
+    """ Passes the *response* to the requests waiting for *key*. """
+
+    future = self._futures.pop(key)
+    if not future.done():
+      future.set_result(response)
@@ -0,0 +1,145 @@
+"""
+Batching of lookups by key, to avoid making one call to a backend per object when resolving related objects (the
+"N+1 problem"). A #DataLoader collects the keys that are requested within the same iteration of the event loop
+and passes them to a bulk fetch function at once, e.g. a bulk endpoint of another service.
+
+Loaders cache their results, so they should only live as long as a request. The router opens a #loader_scope()
+for every request, and #scoped() wraps a function that creates a loader, e.g. around a bulk method of a client,
+such that all endpoint calls in the scope share the loader.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+import typing as t
+
+K = t.TypeVar('K', bound=t.Hashable)
+V = t.TypeVar('V')
+L = t.TypeVar('L', bound='DataLoader[t.Any, t.Any]')
+
+BatchFunction = t.Callable[[list[K]], t.Awaitable[t.Union[t.Mapping[K, V], t.Sequence[V]]]]
+
+
+class DataLoader(t.Generic[K, V]):
+  """
+  Loads values by key with the *batch_fn*, which receives a list of unique keys and returns either a mapping of
+  the keys to their values, or a sequence of the values in the same order as the keys. Keys that are missing from
+  a mapping raise a #KeyError from #load(). At most *max_batch_size* keys are passed to the *batch_fn* at a time.
+
+  Values are cached by key unless *cache* is disabled, such that every key is fetched only once. Every batch is
+  loaded in a task of its own, such that cancelling the request that started a batch does not fail the other
+  requests that wait for it.
+  """
+
+  def __init__(self, batch_fn: BatchFunction[K, V], max_batch_size: int | None = None, cache: bool = True) -> None:
+    self._batch_fn = batch_fn
+    self.max_batch_size = max_batch_size
+    self._cache_enabled = cache
+    self._cache: dict[K, asyncio.Future[V]] = {}
+    self._queue: list[tuple[K, asyncio.Future[V]]] = []
+    self._tasks: set[asyncio.Task[None]] = set()
+
+  async def load(self, key: K) -> V:
+    """ Loads the value for *key*, batched with all other keys that are requested in the same loop iteration. """
+
+    future = self._cache.get(key)
+    if future is None:
+      loop = asyncio.get_running_loop()
+      future = loop.create_future()
+      if self._cache_enabled:
+        self._cache[key] = future
+      if not self._queue:
+        loop.call_soon(self._dispatch)
+      self._queue.append((key, future))
+    return await asyncio.shield(future)
+
+  async def load_many(self, keys: t.Iterable[K]) -> list[V]:
+    """ Loads the values for all *keys* in one batch. """
+
+    return list(await asyncio.gather(*map(self.load, keys)))
+
+  def prime(self, key: K, value: V) -> None:
+    """ Adds a value to the cache, unless the key is already cached. """
+
+    if self._cache_enabled and key not in self._cache:
+      future: asyncio.Future[V] = asyncio.get_running_loop().create_future()
+      future.set_result(value)
+      self._cache[key] = future
+
+  def clear(self, key: K) -> None:
+    """ Removes a key from the cache, e.g. after the value was modified. """
+
+    self._cache.pop(key, None)
+
+  def clear_all(self) -> None:
+    """ Empties the cache. """
+
+    self._cache.clear()
+
+  def _dispatch(self) -> None:
+    queue, self._queue = self._queue, []
+    batch_size = self.max_batch_size or len(queue)
+    for offset in range(0, len(queue), batch_size):
+      # Keep a reference to the task, the event loop only keeps a weak one.
+      task = asyncio.ensure_future(self._load_batch(queue[offset:offset + batch_size]))
+      self._tasks.add(task)
+      task.add_done_callback(self._tasks.discard)
+
+  async def _load_batch(self, batch: list[tuple[K, asyncio.Future[V]]]) -> None:
+    keys = list(dict.fromkeys(key for key, _ in batch))
+    try:
+      result = await self._batch_fn(keys)
+      if not isinstance(result, t.Mapping):
+        if len(result) != len(keys):
+          raise ValueError(f'batch function returned {len(result)} values for {len(keys)} keys')
+        result = dict(zip(keys, result))
+    except BaseException as exc:
+      for key, future in batch:
+        self._cache.pop(key, None)
+        if not future.done():
+          future.set_exception(exc)
+      if not isinstance(exc, Exception):
+        raise
+      return
+
+    for key, future in batch:
+      if future.done():
+        continue
+      if key in result:
+        future.set_result(result[key])
+      else:
+        self._cache.pop(key, None)
+        future.set_exception(KeyError(key))
+
+
+_scope: contextvars.ContextVar[dict[t.Any, t.Any] | None] = contextvars.ContextVar('_scope', default=None)
+
+
+@contextlib.contextmanager
+def loader_scope() -> t.Iterator[None]:
+  """ Loaders created with #scoped() are shared while the scope is open. The router opens one for every request. """
+
+  token = _scope.set({})
+  try:
+    yield
+  finally:
+    _scope.reset(token)
+
+
+def scoped(factory: t.Callable[[], L]) -> t.Callable[[], L]:
+  """
+  Returns a function that returns the loader created by *factory* for the current #loader_scope(), creating it on
+  first use. Outside of a scope, every call creates a new loader.
+  """
+
+  def _get() -> L:
+    scope = _scope.get()
+    if scope is None:
+      return factory()
+    if _get not in scope:
+      scope[_get] = factory()
+    return t.cast(L, scope[_get])
+
+  return _get
@@ -0,0 +1,140 @@
+"""
+Instrumentation of the event loop, to tell apart latency that is caused by a slow endpoint from latency that is
+caused by code that blocks the event loop, which delays all requests that are handled concurrently.
+
+The #LoopMonitor measures the lag of the event loop continuously, i.e. how late a task that sleeps for a fixed
+interval is woken up, and detects when the loop does not make progress for longer than a threshold. In that case
+it captures the stack of the event loop thread and the endpoint of the request that was running.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import contextlib
+import dataclasses
+import logging
+import sys
+import threading
+import time
+import traceback
+import typing as t
+
+from .metrics import MetricsSink, NoopMetricsSink
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class BlockedLoop:
+  """ A time when the event loop was blocked. """
+
+  #: The endpoint of the request that held the event loop, if it was running one.
+  endpoint: str | None
+
+  #: The number of seconds that the loop had been blocked when it was detected.
+  duration: float
+
+  #: The formatted stack of the event loop thread when the block was detected.
+  stack: str
+
+
+class LoopMonitor:
+  """
+  Measures the lag of the event loop every *interval* seconds and publishes it as `cytonic.loop.lag` to the
+  *metrics*. A background thread checks that the loop makes progress, and if it is blocked for longer than
+  *threshold* seconds, it logs a warning with the stack of the event loop thread, increments the
+  `cytonic.loop.blocked` counter tagged with the endpoint and keeps the last *max_blocked* occurrences.
+
+  The router starts the monitor on the loop of the first request and attributes blocks to endpoints while it
+  handles requests, see #track().
+  """
+
+  def __init__(
+    self,
+    metrics: MetricsSink | None = None,
+    interval: float = 0.1,
+    threshold: float = 0.1,
+    max_blocked: int = 100,
+  ) -> None:
+    self.metrics = metrics if metrics is not None else NoopMetricsSink()
+    self.interval = interval
+    self.threshold = threshold
+    self._blocked: collections.deque[BlockedLoop] = collections.deque(maxlen=max_blocked)
+    self._tasks: dict[asyncio.Task[t.Any], str] = {}
+    self._loop: asyncio.AbstractEventLoop | None = None
+    self._last_tick = 0.0
+    self._stop_event = threading.Event()
+    self._task: asyncio.Task[None] | None = None
+    self._watchdog: threading.Thread | None = None
+
+  def start(self) -> None:
+    """ Starts monitoring the running event loop, unless the monitor is already started on it. """
+
+    loop = asyncio.get_running_loop()
+    if self._loop is loop:
+      return
+    self.stop()
+    self._loop = loop
+    self._last_tick = time.monotonic()
+    self._stop_event = threading.Event()
+    self._task = loop.create_task(self._measure_lag())
+    args = (loop, threading.get_ident(), self._stop_event)
+    self._watchdog = threading.Thread(target=self._watch, args=args, daemon=True)
+    self._watchdog.start()
+
+  def stop(self) -> None:
+    """ Stops monitoring the event loop. """
+
+    self._stop_event.set()
+    if self._task is not None and self._loop is not None and not self._loop.is_closed():
+      self._loop.call_soon_threadsafe(self._task.cancel)
+    self._loop = self._task = self._watchdog = None
+    self._tasks.clear()
+
+  @contextlib.contextmanager
+  def track(self, endpoint: str) -> t.Iterator[None]:
+    """ Attributes blocks of the event loop to the *endpoint* while the current task is in the context. """
+
+    task = asyncio.current_task()
+    if task is None:
+      yield
+      return
+    self._tasks[task] = endpoint
+    try:
+      yield
+    finally:
+      self._tasks.pop(task, None)
+
+  def get_blocked(self) -> list[BlockedLoop]:
+    """ Returns the last times that the event loop was blocked, oldest first. """
+
+    return list(self._blocked)
+
+  async def _measure_lag(self) -> None:
+    while True:
+      start = time.monotonic()
+      await asyncio.sleep(self.interval)
+      self._last_tick = now = time.monotonic()
+      self.metrics.observe('cytonic.loop.lag', max(0.0, now - start - self.interval))
+
+  def _watch(self, loop: asyncio.AbstractEventLoop, thread_id: int, stop_event: threading.Event) -> None:
+    reported_tick = None
+    while not stop_event.wait(self.threshold / 2):
+      last_tick = self._last_tick
+      duration = time.monotonic() - last_tick - self.interval
+      if duration <= self.threshold or last_tick == reported_tick:
+        continue
+      reported_tick = last_tick
+      task = asyncio.current_task(loop)
+      endpoint = self._tasks.get(task) if task is not None else None
+      frame = sys._current_frames().get(thread_id)
+      stack = ''.join(traceback.format_stack(frame)) if frame is not None else ''
+      self._blocked.append(BlockedLoop(endpoint, duration, stack))
+      self.metrics.increment('cytonic.loop.blocked', tags={'endpoint': endpoint or ''})
+      logger.warning(
+        'Event loop blocked for more than %.3fs by %s\n%s',
+        duration,
+        f'endpoint {endpoint!r}' if endpoint else 'unknown code',
+        stack,
+      )
@@ -0,0 +1,146 @@
+"""
+Accounting of the memory allocated by a sample of the requests to each endpoint with #tracemalloc. The router
+measures the phases of a request separately: extracting the credentials (`auth`), decoding the request body
+(`decode`), calling the endpoint (`handler`) and encoding the response (`encode`). For every endpoint and phase,
+the #MemoryTracker records the bytes that are still allocated at the end of the phase and the peak of the memory
+allocated during the phase, as well as the source lines that allocated the most memory.
+
+Unless #tracemalloc was already started, it is only started for the requests that are measured, so the other
+requests are not slowed down. Only one request is measured at a time, and since the event loop keeps running
+other requests while the measured request waits for I/O, their allocations are included as well.
+"""
+
+from __future__ import annotations
+
+import collections
+import contextlib
+import dataclasses
+import itertools
+import threading
+import tracemalloc
+import typing as t
+
+@dataclasses.dataclass
+class PhaseMemory:
+  """ The memory allocated by the measured requests to an endpoint in one phase. """
+
+  #: The number of measured requests.
+  count: int = 0
+
+  #: The total number of bytes that were still allocated at the end of the phase.
+  allocated: int = 0
+
+  #: The maximum number of bytes that were allocated at once during the phase.
+  peak: int = 0
+
+
+class MemoryTracker:
+  """
+  Measures the memory allocated by every *sample_every*-th request to each endpoint, or none if *sample_every*
+  is `0`. The *sample_every* attribute can be changed at any time to enable or disable the tracker. Allocations
+  are attributed to the innermost *frames* frames of their traceback.
+  """
+
+  def __init__(self, sample_every: int = 0, frames: int = 1) -> None:
+    if sample_every < 0:
+      raise ValueError('`sample_every` must not be negative')
+    self.sample_every = sample_every
+    self.frames = frames
+    self._counters: dict[str, t.Iterator[int]] = {}
+    self._phases: dict[str, dict[str, PhaseMemory]] = {}
+    self._sites: dict[str, collections.Counter[str]] = {}
+    self._lock = threading.Lock()
+    self._active = False
+
+  def start_request(self, endpoint: str) -> RequestMemory | None:
+    """
+    Returns a #RequestMemory to measure the phases of a request to the *endpoint* if the request is sampled. The
+    #RequestMemory must be closed at the end of the request.
+    """
+
+    if self.sample_every == 0:
+      return None
+    counter = self._counters.get(endpoint)
+    if counter is None:
+      counter = self._counters[endpoint] = itertools.count()
+    if next(counter) % self.sample_every != 0:
+      return None
+    with self._lock:
+      if self._active:
+        return None
+      self._active = True
+    return RequestMemory(self, endpoint)
+
+  def get_report(self) -> dict[str, dict[str, PhaseMemory]]:
+    """ Returns the memory allocated per endpoint and phase. """
+
+    return {
+      endpoint: {phase: dataclasses.replace(memory) for phase, memory in phases.items()}
+      for endpoint, phases in self._phases.items()
+    }
+
+  def get_top_sites(self, endpoint: str, limit: int = 10) -> list[tuple[str, int]]:
+    """ Returns the source lines that allocated the most bytes which were still allocated at the end of a phase. """
+
+    return self._sites.get(endpoint, collections.Counter()).most_common(limit)
+
+  def reset(self) -> None:
+    """ Discards the measurements. """
+
+    self._phases.clear()
+    self._sites.clear()
+
+  def _record(self, endpoint: str, phase: str, allocated: int, peak: int, sites: t.Iterable[tuple[str, int]]) -> None:
+    memory = self._phases.setdefault(endpoint, {}).setdefault(phase, PhaseMemory())
+    memory.count += 1
+    memory.allocated += allocated
+    memory.peak = max(memory.peak, peak)
+    counter = self._sites.setdefault(endpoint, collections.Counter())
+    for site, size in sites:
+      counter[site] += size
+
+  def _release(self) -> None:
+    self._active = False
+
+
+class RequestMemory:
+  """ Measures the phases of one request, see #MemoryTracker.start_request(). """
+
+  _FILTERS = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+
+  def __init__(self, tracker: MemoryTracker, endpoint: str) -> None:
+    self._tracker = tracker
+    self._endpoint = endpoint
+    self._started = not tracemalloc.is_tracing()
+    if self._started:
+      tracemalloc.start(tracker.frames)
+    self._snapshot = self._take_snapshot()
+
+  @contextlib.contextmanager
+  def phase(self, name: str) -> t.Iterator[None]:
+    """ Measures the memory allocated by the code executed in the context. """
+
+    start, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    try:
+      yield
+    finally:
+      current, peak = tracemalloc.get_traced_memory()
+      snapshot = self._take_snapshot()
+      sites = [
+        (str(stat.traceback), stat.size_diff)
+        for stat in snapshot.compare_to(self._snapshot, 'lineno')
+        if stat.size_diff > 0
+      ]
+      self._snapshot = snapshot
+      self._tracker._record(self._endpoint, name, max(0, current - start), max(0, peak - start), sites)
+
+  def close(self) -> None:
+    """ Stops #tracemalloc if it was started for the request. """
+
+    if self._started:
+      tracemalloc.stop()
+    self._tracker._release()
+
+  def _take_snapshot(self) -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces(self._FILTERS)
@@ -0,0 +1,92 @@
+"""
+A minimal interface to publish metrics, such as the latencies that the router measures for every endpoint, to a
+metrics backend. Implement #MetricsSink to forward them to e.g. StatsD or Prometheus.
+"""
+
+from __future__ import annotations
+
+import abc
+import dataclasses
+import threading
+import typing as t
+
+Tags = t.Mapping[str, str]
+
+
+class MetricsSink(abc.ABC):
+
+  @abc.abstractmethod
+  def observe(self, name: str, value: float, tags: Tags | None = None) -> None:
+    """ Records a measurement of a distribution, e.g. a duration in seconds. """
+
+  @abc.abstractmethod
+  def increment(self, name: str, value: int = 1, tags: Tags | None = None) -> None:
+    """ Increments a counter. """
+
+
+class NoopMetricsSink(MetricsSink):
+  """ Discards all metrics. """
+
+  def observe(self, name: str, value: float, tags: Tags | None = None) -> None:
+    pass
+
+  def increment(self, name: str, value: int = 1, tags: Tags | None = None) -> None:
+    pass
+
+
+@dataclasses.dataclass
+class Summary:
+  """ A summary of the measurements of a distribution. """
+
+  count: int = 0
+  total: float = 0.0
+  min: float = float('inf')
+  max: float = float('-inf')
+
+  @property
+  def mean(self) -> float:
+    return self.total / self.count if self.count else 0.0
+
+  def add(self, value: float) -> None:
+    self.count += 1
+    self.total += value
+    self.min = min(self.min, value)
+    self.max = max(self.max, value)
+
+
+class MemoryMetricsSink(MetricsSink):
+  """ Aggregates metrics in memory, e.g. for tests or to serve them from an admin endpoint. """
+
+  def __init__(self) -> None:
+    self._summaries: dict[tuple[str, frozenset[tuple[str, str]]], Summary] = {}
+    self._counters: dict[tuple[str, frozenset[tuple[str, str]]], int] = {}
+    self._lock = threading.Lock()
+
+  def observe(self, name: str, value: float, tags: Tags | None = None) -> None:
+    key = (name, frozenset(tags.items()) if tags else frozenset())
+    with self._lock:
+      summary = self._summaries.get(key)
+      if summary is None:
+        summary = self._summaries[key] = Summary()
+      summary.add(value)
+
+  def increment(self, name: str, value: int = 1, tags: Tags | None = None) -> None:
+    key = (name, frozenset(tags.items()) if tags else frozenset())
+    with self._lock:
+      self._counters[key] = self._counters.get(key, 0) + value
+
+  def get_summary(self, name: str, **tags: str) -> Summary | None:
+    """ Returns the summary of the measurements with the *name* and exactly the *tags*. """
+
+    summary = self._summaries.get((name, frozenset(tags.items())))
+    return dataclasses.replace(summary) if summary is not None else None
+
+  def get_counter(self, name: str, **tags: str) -> int:
+    """ Returns the value of the counter with the *name* and exactly the *tags*. """
+
+    return self._counters.get((name, frozenset(tags.items())), 0)
+
+  def reset(self) -> None:
+    with self._lock:
+      self._summaries.clear()
+      self._counters.clear()
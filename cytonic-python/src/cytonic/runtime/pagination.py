@@ -0,0 +1,111 @@
+"""
+Cursor based pagination, written as `page[T]` in the YAML configuration and enabled for an endpoint with the
+`paginate` option, which adds the `cursor` and `limit` arguments to it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import dataclasses
+import itertools
+import typing as t
+
+from nr.util.safearg import Safe
+
+from .exceptions import IllegalArgumentError
+
+T = t.TypeVar('T')
+
+
+@dataclasses.dataclass
+class Page(t.Generic[T]):
+  """ A page of items. If there are more items, the #next_cursor is passed to fetch the next page. """
+
+  items: t.List[T]
+  next_cursor: t.Optional[str] = None
+
+
+async def paginate(
+  items: t.AsyncIterable[T] | t.Iterable[T],
+  limit: int,
+  cursor_of: t.Callable[[T], str],
+) -> Page[T]:
+  """
+  Collects a #Page of up to *limit* items from *items*, which must start after the cursor that the page was
+  requested with. Only one item more than the *limit* is consumed from *items* to find out if there is a next
+  page, the cursor of which is generated from the last item in the page with *cursor_of*.
+  """
+
+  result: list[T] = []
+  has_more = False
+  if isinstance(items, t.AsyncIterable):
+    async for item in items:
+      if len(result) == limit:
+        has_more = True
+        break
+      result.append(item)
+  else:
+    result = list(itertools.islice(items, limit + 1))
+    has_more = len(result) > limit
+    del result[limit:]
+  return Page(result, cursor_of(result[-1]) if has_more and result else None)
+
+
+def paginate_sequence(items: t.Sequence[T], cursor: str | None, limit: int) -> Page[T]:
+  """ Returns a #Page from a sequence that is already in memory, using the offset into it as the cursor. """
+
+  offset = decode_offset_cursor(cursor) if cursor else 0
+  next_offset = offset + limit
+  return Page(list(items[offset:next_offset]), encode_offset_cursor(next_offset) if next_offset < len(items) else None)
+
+
+def encode_offset_cursor(offset: int) -> str:
+  return base64.urlsafe_b64encode(f'offset:{offset}'.encode('ascii')).decode('ascii')
+
+
+def decode_offset_cursor(cursor: str) -> int:
+  try:
+    prefix, _, offset = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('ascii').partition(':')
+    if prefix != 'offset' or int(offset) < 0:
+      raise ValueError
+    return int(offset)
+  except ValueError:
+    raise IllegalArgumentError(Safe('bad cursor'), cursor=Safe(cursor))
+
+
+async def iter_pages(
+  fetch: t.Callable[[str | None], t.Awaitable[Page[T]]],
+  prefetch: bool = False,
+) -> t.AsyncIterator[Page[T]]:
+  """
+  Iterates over all pages returned by *fetch*, which is called with the cursor of the next page (`None` for the
+  first page). If *prefetch* is enabled, the next page is requested while the current one is being processed.
+  """
+
+  cursor: str | None = None
+  page = await fetch(cursor)
+  while True:
+    next_page: asyncio.Task[Page[T]] | None = None
+    if prefetch and page.next_cursor is not None:
+      next_page = asyncio.ensure_future(fetch(page.next_cursor))
+    try:
+      yield page
+    except BaseException:
+      if next_page is not None:
+        next_page.cancel()
+      raise
+    if page.next_cursor is None:
+      break
+    page = await next_page if next_page is not None else await fetch(page.next_cursor)
+
+
+async def iter_items(
+  fetch: t.Callable[[str | None], t.Awaitable[Page[T]]],
+  prefetch: bool = False,
+) -> t.AsyncIterator[T]:
+  """ Iterates over the items of all pages returned by *fetch*. See #iter_pages(). """
+
+  async for page in iter_pages(fetch, prefetch):
+    for item in page.items:
+      yield item
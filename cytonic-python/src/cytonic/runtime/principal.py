@@ -0,0 +1,123 @@
+"""
+Resolution of the #Credentials of a request to a principal, such as the user that a bearer token belongs to. The
+router calls the #PrincipalResolver after extracting the credentials of a request, and the endpoint retrieves the
+principal with #get_principal(). Results are cached, such that the identity backend is not asked on every request.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import contextvars
+import hashlib
+import time
+import typing as t
+
+from .auth import BasicAuth, BearerToken, Credentials
+from .exceptions import ServiceException
+
+P = t.TypeVar('P')
+
+_principal: contextvars.ContextVar[t.Any] = contextvars.ContextVar('_principal')
+
+
+def get_principal() -> t.Any:
+  """ Returns the principal of the current request. Raises a #RuntimeError if there is none. """
+
+  try:
+    return _principal.get()
+  except LookupError:
+    raise RuntimeError('no principal was resolved for the current request')
+
+
+def set_principal(principal: t.Any) -> None:
+  """ Sets the principal of the current request. This is called by the router. """
+
+  _principal.set(principal)
+
+
+def get_credentials_key(credentials: Credentials) -> str:
+  """ Returns a hash that identifies the *credentials*, such that secrets are not kept in memory as they are. """
+
+  if isinstance(credentials.value, BearerToken):
+    secret = 'token:' + credentials.value.value
+  elif isinstance(credentials.value, BasicAuth):
+    secret = f'basic:{credentials.value.username}:{credentials.value.password}'
+  else:
+    secret = 'none'
+  return hashlib.sha256(secret.encode()).hexdigest()
+
+
+class PrincipalResolver(t.Generic[P]):
+  """
+  Resolves #Credentials to a principal with the *resolve* function and caches the result for *ttl* seconds. If
+  *resolve* raises a #ServiceException, e.g. an #UnauthorizedError for an invalid token, the exception is cached
+  for *negative_ttl* seconds. Other exceptions are not cached. At most *max_size* results are cached, and the least
+  recently used ones are removed first. Concurrent requests with the same credentials share one call to *resolve*.
+  """
+
+  def __init__(
+    self,
+    resolve: t.Callable[[Credentials], t.Awaitable[P]],
+    ttl: float = 60.0,
+    negative_ttl: float = 5.0,
+    max_size: int = 10_000,
+  ) -> None:
+    self._resolve = resolve
+    self.ttl = ttl
+    self.negative_ttl = negative_ttl
+    self.max_size = max_size
+    self._cache: collections.OrderedDict[str, tuple[float, P | ServiceException]] = collections.OrderedDict()
+    self._inflight: dict[str, asyncio.Future[P]] = {}
+
+  async def __call__(self, credentials: Credentials) -> P:
+    key = get_credentials_key(credentials)
+    entry = self._cache.get(key)
+    if entry is not None:
+      expires, result = entry
+      if expires > time.monotonic():
+        self._cache.move_to_end(key)
+        if isinstance(result, ServiceException):
+          raise result.with_traceback(None)
+        return result
+      del self._cache[key]
+
+    if key in self._inflight:
+      return await asyncio.shield(self._inflight[key])
+
+    future: asyncio.Future[P] = asyncio.get_running_loop().create_future()
+    self._inflight[key] = future
+    try:
+      principal = await self._resolve(credentials)
+    except ServiceException as exc:
+      self._store(key, exc, self.negative_ttl)
+      future.set_exception(exc)
+      raise
+    except asyncio.CancelledError:
+      future.cancel()
+      raise
+    except BaseException as exc:
+      future.set_exception(exc)
+      raise
+    else:
+      self._store(key, principal, self.ttl)
+      future.set_result(principal)
+      return principal
+    finally:
+      del self._inflight[key]
+      # Retrieve the exception to avoid a warning if no other request was waiting for it.
+      if future.done() and not future.cancelled():
+        future.exception()
+
+  def invalidate(self, credentials: Credentials) -> None:
+    """ Removes the cached result for the *credentials*, e.g. after a token was revoked. """
+
+    self._cache.pop(get_credentials_key(credentials), None)
+
+  def _store(self, key: str, result: P | ServiceException, ttl: float) -> None:
+    if ttl <= 0:
+      return
+    self._cache[key] = (time.monotonic() + ttl, result)
+    self._cache.move_to_end(key)
+    while len(self._cache) > self.max_size:
+      self._cache.popitem(last=False)
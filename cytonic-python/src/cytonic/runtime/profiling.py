@@ -0,0 +1,213 @@
+"""
+Profiling of a sample of the requests to each endpoint. The router profiles every n-th request to an endpoint with a
+#RequestProfiler and aggregates the results per endpoint in memory, from where they can be retrieved through an
+admin endpoint or dumped to files. There is no overhead for requests that are not profiled.
+
+Only one request is profiled at a time. Note that the event loop keeps running other requests while a profiled
+request waits for I/O, so the results include some of the work done for concurrent requests.
+"""
+
+from __future__ import annotations
+
+import abc
+import collections
+import contextlib
+import cProfile
+import io
+import itertools
+import marshal
+import os
+import pstats
+import re
+import sys
+import threading
+import typing as t
+
+
+class RequestProfiler(abc.ABC):
+  """
+  Base class for profilers that profile every *sample_every*-th request to each endpoint. Profiling is disabled if
+  *sample_every* is `0`.
+  """
+
+  #: The file extension of the files written by #dump().
+  extension: t.ClassVar[str]
+
+  def __init__(self, sample_every: int = 0) -> None:
+    if sample_every < 0:
+      raise ValueError('`sample_every` must not be negative')
+    self.sample_every = sample_every
+    self._counters: dict[str, t.Iterator[int]] = {}
+    self._samples: collections.Counter[str] = collections.Counter()
+    self._lock = threading.Lock()
+    self._active = False
+
+  def should_profile(self, endpoint: str) -> bool:
+    """ Returns `True` if the next request to the *endpoint* should be profiled. """
+
+    if self.sample_every == 0 or self._active:
+      return False
+    counter = self._counters.get(endpoint)
+    if counter is None:
+      counter = self._counters[endpoint] = itertools.count()
+    return next(counter) % self.sample_every == 0
+
+  @contextlib.contextmanager
+  def profile(self, endpoint: str) -> t.Iterator[None]:
+    """ Profiles the code executed in the context and adds the results to those of the *endpoint*. """
+
+    with self._lock:
+      busy, self._active = self._active, True
+    if busy:
+      yield
+      return
+    try:
+      self._start()
+    except ValueError:  # Another profiler is active in this thread, e.g. a debugger.
+      self._active = False
+      yield
+      return
+    try:
+      yield
+    finally:
+      self._stop(endpoint)
+      self._samples[endpoint] += 1
+      self._active = False
+
+  def get_samples(self) -> dict[str, int]:
+    """ Returns the number of profiled requests per endpoint. """
+
+    return dict(self._samples)
+
+  def dump(self, directory: str | os.PathLike[str]) -> list[str]:
+    """ Writes the results of every endpoint to a file in the *directory* and returns the filenames. """
+
+    os.makedirs(directory, exist_ok=True)
+    filenames = []
+    for endpoint in self._samples:
+      filename = os.path.join(directory, re.sub(r'[^\w.-]', '_', endpoint) + self.extension)
+      with open(filename, 'wb') as fp:
+        fp.write(self.export(endpoint))
+      filenames.append(filename)
+    return filenames
+
+  def reset(self) -> None:
+    """ Discards the results. """
+
+    self._samples.clear()
+    self._reset()
+
+  @abc.abstractmethod
+  def _start(self) -> None: ...
+
+  @abc.abstractmethod
+  def _stop(self, endpoint: str) -> None: ...
+
+  @abc.abstractmethod
+  def _reset(self) -> None: ...
+
+  @abc.abstractmethod
+  def export(self, endpoint: str) -> bytes:
+    """ Returns the results for the *endpoint* in the format of the files written by #dump(). """
+
+  @abc.abstractmethod
+  def format(self, endpoint: str) -> str:
+    """ Returns the results for the *endpoint* in a human readable form. """
+
+
+class CProfileProfiler(RequestProfiler):
+  """ Profiles requests with #cProfile. Results are exported as `pstats` files, e.g. for `snakeviz`. """
+
+  extension = '.pstats'
+
+  def __init__(self, sample_every: int = 0) -> None:
+    super().__init__(sample_every)
+    self._profile: cProfile.Profile | None = None
+    self._stats: dict[str, pstats.Stats] = {}
+
+  def get_stats(self, endpoint: str) -> pstats.Stats | None:
+    """ Returns the aggregated statistics of the *endpoint*. """
+
+    return self._stats.get(endpoint)
+
+  def _start(self) -> None:
+    self._profile = cProfile.Profile()
+    self._profile.enable()
+
+  def _stop(self, endpoint: str) -> None:
+    assert self._profile is not None
+    self._profile.disable()
+    if endpoint in self._stats:
+      self._stats[endpoint].add(self._profile)
+    else:
+      self._stats[endpoint] = pstats.Stats(self._profile)
+    self._profile = None
+
+  def _reset(self) -> None:
+    self._stats.clear()
+
+  def export(self, endpoint: str) -> bytes:
+    return marshal.dumps(self._stats[endpoint].stats)  # type: ignore[attr-defined]
+
+  def format(self, endpoint: str) -> str:
+    out = io.StringIO()
+    stats = pstats.Stats(stream=out)
+    stats.add(self._stats[endpoint])
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(50)
+    return out.getvalue()
+
+
+class StackSamplingProfiler(RequestProfiler):
+  """
+  Profiles requests by capturing the stack of the thread that handles the request every *interval* seconds from a
+  background thread. This has less overhead than #CProfileProfiler. Results are exported in the collapsed stack
+  format, which can be rendered with `flamegraph.pl` or speedscope.
+  """
+
+  extension = '.collapsed'
+
+  def __init__(self, sample_every: int = 0, interval: float = 0.001) -> None:
+    super().__init__(sample_every)
+    self.interval = interval
+    self._stacks: dict[str, collections.Counter[str]] = {}
+    self._current: collections.Counter[str] = collections.Counter()
+    self._stop_event = threading.Event()
+    self._thread: threading.Thread | None = None
+
+  def get_stacks(self, endpoint: str) -> dict[str, int]:
+    """ Returns the number of times that each stack was sampled for the *endpoint*. """
+
+    return dict(self._stacks.get(endpoint, {}))
+
+  def _start(self) -> None:
+    self._current = collections.Counter()
+    self._stop_event.clear()
+    self._thread = threading.Thread(target=self._sample, args=(threading.get_ident(),), daemon=True)
+    self._thread.start()
+
+  def _stop(self, endpoint: str) -> None:
+    assert self._thread is not None
+    self._stop_event.set()
+    self._thread.join()
+    self._thread = None
+    self._stacks.setdefault(endpoint, collections.Counter()).update(self._current)
+
+  def _reset(self) -> None:
+    self._stacks.clear()
+
+  def _sample(self, thread_id: int) -> None:
+    while not self._stop_event.wait(self.interval):
+      frame = sys._current_frames().get(thread_id)
+      stack = []
+      while frame is not None:
+        code = frame.f_code
+        stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+      if stack:
+        self._current[';'.join(reversed(stack))] += 1
+
+  def export(self, endpoint: str) -> bytes:
+    return self.format(endpoint).encode()
+
+  def format(self, endpoint: str) -> str:
+    return ''.join(f'{stack} {count}\n' for stack, count in self._stacks.get(endpoint, {}).items())
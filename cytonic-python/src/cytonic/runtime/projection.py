@@ -0,0 +1,126 @@
+"""
+Sparse fieldsets: a #Projection selects a subset of the fields of the structs in a response, e.g. `id,name,owner.id`
+for a `list[TodoList]`. Fields that are not selected are never serialized.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import types
+import typing as t
+
+import databind.json
+
+from ._typing import get_dataclass, get_type_hints, is_struct_type
+
+
+@dataclasses.dataclass(frozen=True)
+class Projection:
+  """
+  A selection of fields in a struct. Every selected field maps to the projection of its own struct fields, or
+  `None` if the field is selected as a whole. Projections apply to the struct type found in a type by looking
+  through lists, sets, optionals and map values. References (see #Ref) can only be selected as a whole.
+  """
+
+  fields: tuple[tuple[str, Projection | None], ...]
+
+  def __str__(self) -> str:
+    return ','.join(self._paths())
+
+  def _paths(self) -> t.Iterator[str]:
+    for name, sub in self.fields:
+      if sub is None:
+        yield name
+      else:
+        yield from (f'{name}.{path}' for path in sub._paths())
+
+  @classmethod
+  def parse(cls, value: str) -> Projection:
+    """ Parses a comma separated list of field paths, where nested fields are separated by dots. """
+
+    tree: dict[str, t.Any] = {}
+    for path in value.split(','):
+      path = path.strip()
+      if not path:
+        continue
+      node = tree
+      parts = path.split('.')
+      if not all(parts):
+        raise ValueError(f'bad field path: {path!r}')
+      for index, part in enumerate(parts):
+        if node.get(part, ...) is None:
+          break  # The field is already selected as a whole.
+        if index == len(parts) - 1:
+          node[part] = None
+        else:
+          node = node.setdefault(part, {})
+    if not tree:
+      raise ValueError('no fields selected')
+    return cls._from_tree(tree)
+
+  @classmethod
+  def _from_tree(cls, tree: dict[str, t.Any]) -> Projection:
+    return cls(tuple((k, None if v is None else cls._from_tree(v)) for k, v in tree.items()))
+
+  def validate(self, type_: t.Any, path: str = '') -> None:
+    """ Raises a #ValueError if the projection selects fields that do not exist in *type_*. """
+
+    struct_type = get_struct_type(type_)
+    if struct_type is None:
+      raise ValueError(f'field {path[:-1]!r} is not a struct' if path else 'the result is not a struct')
+    cls = get_dataclass(struct_type)
+    assert cls is not None, struct_type
+    hints = get_type_hints(struct_type)
+    field_names = {f.name for f in dataclasses.fields(cls)}
+    for name, sub in self.fields:
+      if name not in field_names:
+        raise ValueError(f'unknown field {path + name!r}')
+      if sub is not None:
+        sub.validate(hints[name], f'{path}{name}.')
+
+  def dump(self, value: t.Any, type_: t.Any) -> t.Any:
+    """ Serializes *value* of the Python type *type_* with databind, including only the selected fields. """
+
+    if value is None:
+      return None
+    if is_struct_type(type_):
+      hints = get_type_hints(type_)
+      result = {}
+      for name, sub in self.fields:
+        field_value = getattr(value, name)
+        if field_value is None:
+          continue
+        field_type = hints[name]
+        result[name] = databind.json.dump(field_value, field_type) if sub is None else sub.dump(field_value, field_type)
+      return result
+    origin, args = t.get_origin(type_), t.get_args(type_)
+    if origin in (list, set, frozenset):
+      return [self.dump(x, args[0]) for x in value]
+    if origin is dict:
+      return {databind.json.dump(k, args[0]): self.dump(v, args[1]) for k, v in value.items()}
+    if origin in (t.Union, types.UnionType):
+      return self.dump(value, _unwrap_optional(type_))
+    raise TypeError(f'cannot apply projection to {type_}')
+
+
+def _unwrap_optional(type_: t.Any) -> t.Any | None:
+  args = t.get_args(type_)
+  if len(args) == 2 and type(None) in args:
+    return args[0] if args[1] is type(None) else args[1]
+  return None
+
+
+def get_struct_type(type_: t.Any) -> t.Any | None:
+  """ Returns the (generic) dataclass that a #Projection applies to in *type_*, or `None` if there is none. """
+
+  while not is_struct_type(type_):
+    origin, args = t.get_origin(type_), t.get_args(type_)
+    if origin in (list, set, frozenset):
+      type_ = args[0]
+    elif origin is dict:
+      type_ = args[1]
+    elif origin in (t.Union, types.UnionType):
+      type_ = _unwrap_optional(type_)
+    else:
+      return None
+  return type_
@@ -0,0 +1,177 @@
+"""
+Token bucket rate limiting (see #RateLimitConfig). The router takes a token from the bucket of the client for every
+request after extracting its credentials, and rejects the request with a #TooManyRequestsError if the bucket is
+empty. The buckets are kept by a #RateLimiter, which keeps them in memory by default. Use the
+#SharedMemoryRateLimiter to share the buckets between multiple worker processes on the same host.
+"""
+
+from __future__ import annotations
+
+import abc
+import asyncio
+import collections
+import contextlib
+import hashlib
+import os
+import stat
+import struct
+import sys
+import tempfile
+import time
+import typing as t
+
+from cytonic.model import RateLimitConfig, RateLimitKey
+from .auth import BasicAuth, BearerToken, Credentials
+
+
+def get_rate_limit_key(config: RateLimitConfig, credentials: Credentials | None, client_host: str | None) -> str:
+  """
+  Returns the key that identifies the client of a request for the *config*. Bearer tokens are hashed such that
+  they are not kept in memory by the rate limiter.
+  """
+
+  if config.key == RateLimitKey.credentials and credentials is not None:
+    if isinstance(credentials.value, BearerToken):
+      return 'token:' + hashlib.sha256(credentials.value.value.encode()).hexdigest()[:32]
+    if isinstance(credentials.value, BasicAuth):
+      return 'user:' + credentials.value.username
+  return f'ip:{client_host}'
+
+
+def take_token(tokens: float, updated: float, now: float, config: RateLimitConfig) -> tuple[float, float]:
+  """
+  Refills a bucket that had *tokens* at the time *updated* until *now* and takes one token from it. Returns the
+  number of tokens that are left and `0`, or the refilled number of tokens and the number of seconds until a
+  token is available if the bucket is empty.
+  """
+
+  tokens = min(float(config.capacity), tokens + (now - updated) * config.rate)
+  if tokens >= 1:
+    return tokens - 1, 0.0
+  return tokens, (1 - tokens) / config.rate
+
+
+class RateLimiter(abc.ABC):
+  """ Interface for the storage of token buckets. """
+
+  @abc.abstractmethod
+  async def acquire(self, key: str, config: RateLimitConfig) -> float:
+    """
+    Takes a token from the bucket of *key*. Returns `0` if a token was available, otherwise the number of seconds
+    until a token will be available.
+    """
+
+
+class MemoryRateLimiter(RateLimiter):
+  """
+  Keeps the token buckets in memory. If there are more than *max_keys* buckets, the least recently used buckets
+  are removed, which is the same as refilling them.
+  """
+
+  def __init__(self, max_keys: int = 100_000) -> None:
+    self.max_keys = max_keys
+    self._buckets: collections.OrderedDict[str, tuple[float, float]] = collections.OrderedDict()
+
+  async def acquire(self, key: str, config: RateLimitConfig) -> float:
+    now = time.monotonic()
+    tokens, updated = self._buckets.pop(key, (float(config.capacity), now))
+    tokens, retry_after = take_token(tokens, updated, now, config)
+    self._buckets[key] = (tokens, now)
+    if len(self._buckets) > self.max_keys:
+      self._buckets.popitem(last=False)
+    return retry_after
+
+
+def get_private_lock_dir() -> str:
+  """
+  Returns a directory in the temporary directory for lock files that only the current user can access, and creates
+  it if it does not exist. Raises a #PermissionError if the directory exists but is accessible by other users.
+  """
+
+  path = os.path.join(tempfile.gettempdir(), f'cytonic-{os.getuid()}')
+  with contextlib.suppress(FileExistsError):
+    os.mkdir(path, 0o700)
+  info = os.lstat(path)
+  if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+    raise PermissionError(f'{path!r} must be a directory that is only accessible by the current user')
+  return path
+
+
+class SharedMemoryRateLimiter(RateLimiter):
+  """
+  Keeps the token buckets in a shared memory segment with the given *name*, such that all worker processes on the
+  same host that use the same name share the buckets. Access to the buckets is serialized with a lock file in the
+  *lock_dir*, which defaults to #get_private_lock_dir(). The lock is polled without blocking the event loop.
+
+  The segment has a fixed number of *slots*. A client whose key hashes to a slot that is taken by another client
+  replaces that client's bucket, which is the same as refilling the other client's bucket, so the number of slots
+  should be well above the number of clients that are active at the same time. Only available on Unix.
+  """
+
+  _SLOT = struct.Struct('<Qdd')  # (key hash, tokens, updated)
+
+  def __init__(self, name: str = 'cytonic-rate-limit', slots: int = 65536, lock_dir: str | None = None) -> None:
+    import fcntl
+    from multiprocessing import shared_memory
+
+    self._fcntl = fcntl
+    self._slots = slots
+    lock_path = os.path.join(lock_dir or get_private_lock_dir(), f'{name}.lock')
+    self._lock = os.open(lock_path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+    size = slots * self._SLOT.size
+    kwargs: dict[str, t.Any] = {'track': False} if sys.version_info >= (3, 13) else {}
+    self._fcntl.flock(self._lock, self._fcntl.LOCK_EX)
+    try:
+      try:
+        self._memory = shared_memory.SharedMemory(name, create=True, size=size, **kwargs)
+        created = True
+      except FileExistsError:
+        self._memory = shared_memory.SharedMemory(name, **kwargs)
+        created = False
+      buf = self._memory.buf
+      assert buf is not None
+      if created:
+        buf[:size] = bytes(size)
+    finally:
+      self._fcntl.flock(self._lock, self._fcntl.LOCK_UN)
+    if self._memory.size < size:
+      raise ValueError(f'shared memory {name!r} is too small for {slots} slots')
+    self._buf = buf
+
+  def close(self) -> None:
+    """ Detaches from the shared memory segment. """
+
+    self._memory.close()
+    os.close(self._lock)
+
+  def unlink(self) -> None:
+    """ Removes the shared memory segment. Should be called once after all workers have stopped. """
+
+    self._memory.unlink()
+
+  @contextlib.asynccontextmanager
+  async def _locked(self) -> t.AsyncIterator[None]:
+    delay = 0.0001
+    while True:
+      try:
+        self._fcntl.flock(self._lock, self._fcntl.LOCK_EX | self._fcntl.LOCK_NB)
+        break
+      except BlockingIOError:
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 0.01)
+    try:
+      yield
+    finally:
+      self._fcntl.flock(self._lock, self._fcntl.LOCK_UN)
+
+  async def acquire(self, key: str, config: RateLimitConfig) -> float:
+    key_hash = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+    offset = (key_hash % self._slots) * self._SLOT.size
+    now = time.monotonic()
+    async with self._locked():
+      slot_hash, tokens, updated = self._SLOT.unpack_from(self._buf, offset)
+      if slot_hash != key_hash:
+        tokens, updated = float(config.capacity), now
+      tokens, retry_after = take_token(tokens, updated, now, config)
+      self._SLOT.pack_into(self._buf, offset, key_hash, tokens, now)
+    return retry_after
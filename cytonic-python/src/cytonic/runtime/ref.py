@@ -0,0 +1,160 @@
+"""
+Reference types, written as `ref[T]` in the YAML configuration. A #Ref is serialized as the `id` of the struct
+that it points to, unless the referenced type is expanded in the current #RefContext, in which case the full
+object is serialized instead. Expanded objects can alternatively be collected in a side table to serialize
+objects that are referenced many times only once.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import dataclasses
+import types
+import typing as t
+
+import databind.json
+from databind.core import Context
+from databind.json.annotations import with_custom_json_converter
+
+from ._typing import get_dataclass, get_type_hints
+
+T = t.TypeVar('T')
+
+_ref_context: contextvars.ContextVar[RefContext | None] = contextvars.ContextVar('_ref_context', default=None)
+
+
+@dataclasses.dataclass
+class RefContext:
+  """ Controls the de/serialization of #Ref values. Use the #ref_context() function to activate it. """
+
+  #: The names of the referenced types that are expanded during serialization.
+  expand: frozenset[str] = frozenset()
+
+  #: If set, expanded objects are stored in this table instead of in place of the reference, keyed by the type
+  #: name and the string representation of their ID. During deserialization, references are resolved from it.
+  table: dict[str, dict[str, t.Any]] | None = None
+
+  #: Objects deserialized from the #table, such that every object is only deserialized once.
+  _resolved: dict[tuple[str, str], t.Any] = dataclasses.field(default_factory=dict)
+
+
+@contextlib.contextmanager
+def ref_context(
+  expand: t.Iterable[str] = (),
+  table: dict[str, dict[str, t.Any]] | None = None,
+) -> t.Iterator[RefContext]:
+  context = RefContext(frozenset(expand), table)
+  token = _ref_context.set(context)
+  try:
+    yield context
+  finally:
+    _ref_context.reset(token)
+
+
+@with_custom_json_converter()
+@dataclasses.dataclass(eq=False)
+class Ref(t.Generic[T]):
+  """
+  A reference to a struct of type *T*, identified by its `id` field. The referenced object is available as
+  #value if it was known at the time the reference was created or if it was expanded in the payload that the
+  reference was deserialized from.
+
+  `Ref[User]` creates a subclass of #Ref that remembers the referenced type, which is needed to deserialize
+  expanded references.
+  """
+
+  id: t.Any
+  value: T | None = None
+
+  __target__: t.ClassVar[type | None] = None
+  __cytonic_scalar__: t.ClassVar[bool] = True
+  __subclasses: t.ClassVar[dict[type, type[Ref]]] = {}
+
+  def __class_getitem__(cls, target: t.Any) -> t.Any:
+    if not isinstance(target, type) or target is t.Any:
+      return super().__class_getitem__(target)  # type: ignore[misc]
+    try:
+      return Ref.__subclasses[target]
+    except KeyError:
+      subclass = type(f'Ref[{target.__name__}]', (Ref,), {'__target__': target, '__module__': Ref.__module__})
+      Ref.__subclasses[target] = with_custom_json_converter()(subclass)
+      return subclass
+
+  def __eq__(self, other: object) -> bool:
+    return isinstance(other, Ref) and (self.id, self.value) == (other.id, other.value)
+
+  def __repr__(self) -> str:
+    return f'Ref({self.id!r})' if self.value is None else f'Ref({self.id!r}, {self.value!r})'
+
+  @classmethod
+  def of(cls, value: T) -> Ref[T]:
+    """ Creates a reference to *value*, which must have an `id` attribute. """
+
+    return cls(getattr(value, 'id'), value)
+
+  def get(self) -> T:
+    if self.value is None:
+      raise RuntimeError(f'reference {self.id!r} was not expanded')
+    return self.value
+
+  @classmethod
+  def _convert_json(cls, ctx: Context) -> t.Any:
+    context = _ref_context.get()
+
+    if ctx.direction.is_serialize():
+      if not isinstance(ctx.value, Ref):
+        return NotImplemented
+      ref, target = ctx.value, cls.__target__ or type(ctx.value.value)
+      if ref.value is None or context is None or target.__name__ not in context.expand:
+        return ref.id
+      if context.table is None:
+        return databind.json.dump(ref.value, target)
+      table = context.table.setdefault(target.__name__, {})
+      if str(ref.id) not in table:
+        table[str(ref.id)] = None  # Guard against cyclic references.
+        table[str(ref.id)] = databind.json.dump(ref.value, target)
+      return ref.id
+
+    if cls.__target__ is None:
+      raise ctx.error('cannot deserialize a Ref without a referenced type')
+    if isinstance(ctx.value, dict):
+      value: t.Any = databind.json.load(ctx.value, cls.__target__)
+      return cls(getattr(value, 'id'), value)
+    if context is not None and context.table is not None:
+      key = (cls.__target__.__name__, str(ctx.value))
+      if key not in context._resolved and (data := context.table.get(key[0], {}).get(key[1])) is not None:
+        context._resolved[key] = databind.json.load(data, cls.__target__)
+      return cls(ctx.value, context._resolved.get(key))
+    return cls(ctx.value)
+
+
+def is_ref_type(type_: t.Any) -> bool:
+  return isinstance(type_, type) and issubclass(type_, Ref)
+
+
+def get_ref_targets(type_: t.Any) -> set[str]:
+  """ Returns the names of all types that can be referenced by a #Ref anywhere in *type_*. """
+
+  result: set[str] = set()
+  seen: set[t.Any] = set()
+
+  def _visit(type_: t.Any) -> None:
+    if type_ in seen:
+      return
+    seen.add(type_)
+    if is_ref_type(type_):
+      if type_.__target__ is not None:
+        result.add(type_.__target__.__name__)
+        _visit(type_.__target__)
+    elif get_dataclass(type_):
+      for hint in get_type_hints(type_).values():
+        _visit(hint)
+    elif t.get_origin(type_) is t.Annotated:
+      _visit(t.get_args(type_)[0])
+    elif t.get_origin(type_) in (list, set, frozenset, dict, t.Union, types.UnionType):
+      for arg in t.get_args(type_):
+        _visit(arg)
+
+  _visit(type_)
+  return result
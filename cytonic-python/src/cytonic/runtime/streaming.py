@@ -0,0 +1,210 @@
+"""
+Helpers for streaming endpoints (see #StreamConfig). A streaming endpoint returns an iterator over the values that
+it sends to the client. Values are pulled from the iterator only after the previous value was sent, so a slow
+client slows down the producer instead of values being buffered in memory.
+
+Streaming request bodies, written as `stream[T]` in the YAML configuration, are received as an async iterator
+over the elements of a JSON array or of newline-delimited JSON, which are parsed incrementally with the
+#JsonArraySplitter and #NdjsonSplitter.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections.abc
+import re
+import typing as t
+
+T = t.TypeVar('T')
+
+#: The media type of streaming responses that are sent as server-sent events.
+SSE_MEDIA_TYPE = 'text/event-stream'
+
+
+class Heartbeat:
+  """ Yielded by #with_heartbeat() if no value was produced within the heartbeat interval. """
+
+  def __repr__(self) -> str:
+    return 'HEARTBEAT'
+
+
+HEARTBEAT = Heartbeat()
+
+
+def is_stream_type(type_: t.Any) -> bool:
+  """ Returns `True` if *type_* is the type hint of a `stream[T]` body argument, i.e. `AsyncIterator[T]`. """
+
+  return t.get_origin(type_) in (collections.abc.AsyncIterator, collections.abc.AsyncIterable)
+
+
+def get_stream_item_type(type_: t.Any) -> t.Any:
+  """ Returns the item type *T* of an `AsyncIterator[T]`, `Iterator[T]` or related type hint of an endpoint. """
+
+  origin, args = t.get_origin(type_), t.get_args(type_)
+  if origin in (
+    collections.abc.AsyncIterator,
+    collections.abc.AsyncIterable,
+    collections.abc.AsyncGenerator,
+    collections.abc.Iterator,
+    collections.abc.Iterable,
+    collections.abc.Generator,
+  ):
+    return args[0] if args else t.Any
+  raise TypeError(f'expected an iterator type for a streaming endpoint, got {type_}')
+
+
+async def aiter_values(values: t.AsyncIterable[T] | t.Iterable[T]) -> t.AsyncIterator[T]:
+  """ Iterates over an asynchronous or a synchronous iterable. """
+
+  if isinstance(values, collections.abc.AsyncIterable):
+    async for value in values:
+      yield value
+  else:
+    for value in values:
+      yield value
+
+
+async def with_heartbeat(values: t.AsyncIterator[T], interval: float) -> t.AsyncIterator[T | Heartbeat]:
+  """
+  Passes through the items of *values*, and yields #HEARTBEAT whenever no item was produced for *interval*
+  seconds. At most one item is requested from *values* at a time.
+  """
+
+  pending: asyncio.Future[T] | None = None
+  try:
+    while True:
+      if pending is None:
+        pending = asyncio.ensure_future(values.__anext__())
+      done, _ = await asyncio.wait((pending,), timeout=interval)
+      if not done:
+        yield HEARTBEAT
+        continue
+      try:
+        value = pending.result()
+      except StopAsyncIteration:
+        break
+      finally:
+        pending = None
+      yield value
+  finally:
+    if pending is not None:
+      pending.cancel()
+
+
+class JsonArraySplitter:
+  """
+  Splits a JSON array that is fed in chunks into the serialized form of its elements, without parsing them.
+  Only the element that is currently being read is buffered, and it may not be larger than *max_element_size*
+  bytes.
+  """
+
+  _SPECIAL = re.compile(rb'[\[\]{}",]')
+  _STRING_SPECIAL = re.compile(rb'["\\]')
+  _WHITESPACE = b' \t\r\n'
+
+  def __init__(self, max_element_size: int) -> None:
+    self.max_element_size = max_element_size
+    self._buffer = bytearray()
+    self._depth = 0
+    self._count = 0
+    self._in_string = False
+    self._escape = False
+    self._finished = False
+
+  def feed(self, data: bytes) -> list[bytes]:
+    """ Feeds the next chunk of the array and returns the elements that were completed by it. """
+
+    elements: list[bytes] = []
+    pos, start = 0, 0
+    if self._depth == 0 and not self._finished:
+      pos = start = len(data) - len(data.lstrip(self._WHITESPACE))
+      if pos == len(data):
+        return elements
+      if data[pos:pos + 1] != b'[':
+        raise ValueError('expected a JSON array')
+      self._depth = 1
+      pos = start = pos + 1
+
+    while pos < len(data):
+      if self._finished:
+        if data[pos:].strip(self._WHITESPACE):
+          raise ValueError('unexpected data after the end of the JSON array')
+        return elements
+      if self._escape:
+        self._escape = False
+        pos += 1
+        continue
+      if self._in_string:
+        match = self._STRING_SPECIAL.search(data, pos)
+        if match is None:
+          pos = len(data)
+        elif match.group() == b'"':
+          self._in_string = False
+          pos = match.end()
+        else:
+          self._escape = True
+          pos = match.end()
+        continue
+      match = self._SPECIAL.search(data, pos)
+      if match is None:
+        pos = len(data)
+        continue
+      char, pos = match.group(), match.end()
+      if char == b'"':
+        self._in_string = True
+      elif char in b'[{':
+        self._depth += 1
+      elif char in b']}' and self._depth > 1:
+        self._depth -= 1
+      elif self._depth == 1 and char in b'],':
+        self._buffer += data[start:pos - 1]
+        start = pos
+        element = bytes(self._buffer).strip(self._WHITESPACE)
+        self._buffer.clear()
+        if element:
+          self._check_size(len(element))
+          elements.append(element)
+          self._count += 1
+        elif char == b',' or self._count > 0:
+          raise ValueError('missing element in JSON array')
+        if char == b']':
+          self._depth = 0
+          self._finished = True
+      elif char in b']}':
+        raise ValueError('unbalanced brackets in JSON array')
+
+    if not self._finished:
+      self._buffer += data[start:]
+      self._check_size(len(self._buffer))
+    return elements
+
+  def close(self) -> list[bytes]:
+    """ Raises a #ValueError if the array was not complete. """
+
+    if not self._finished:
+      raise ValueError('unexpected end of JSON array')
+    return []
+
+  def _check_size(self, size: int) -> None:
+    if size > self.max_element_size:
+      raise ValueError(f'element exceeds the maximum size of {self.max_element_size} bytes')
+
+
+class NdjsonSplitter:
+  """ Splits newline-delimited JSON that is fed in chunks into its lines, see #JsonArraySplitter. """
+
+  def __init__(self, max_element_size: int) -> None:
+    self.max_element_size = max_element_size
+    self._buffer = bytearray()
+
+  def feed(self, data: bytes) -> list[bytes]:
+    self._buffer += data
+    *lines, rest = self._buffer.split(b'\n')
+    self._buffer = bytearray(rest)
+    if max(map(len, lines), default=0) > self.max_element_size or len(self._buffer) > self.max_element_size:
+      raise ValueError(f'element exceeds the maximum size of {self.max_element_size} bytes')
+    return [bytes(line) for line in lines if line.strip()]
+
+  def close(self) -> list[bytes]:
+    line, self._buffer = bytes(self._buffer), bytearray()
+    return [line] if line.strip() else []
@@ -0,0 +1,200 @@
+"""
+Tracing of requests with spans in the shape of OpenTelemetry, without depending on it. The router opens a span for
+every request, with child spans for extracting the credentials (`auth`), decoding the request body (`decode`),
+calling the endpoint (`handler`), encoding the response (`encode`) and handling an error (`error`).
+
+The trace context is propagated with the W3C `traceparent` header: the span of a request is a child of the span
+in the `traceparent` header of the request, and #Tracer.inject() adds the header of the current span to the
+headers of an outgoing request. Calls within the same process, e.g. to a #PrincipalResolver, are children of the
+current span without further ado.
+
+The #NoopTracer is used by default and has next to no overhead. The #W3CTracer passes finished spans to a function,
+and the #OpenTelemetryTracer delegates to the OpenTelemetry API.
+"""
+
+from __future__ import annotations
+
+import abc
+import contextlib
+import contextvars
+import dataclasses
+import os
+import re
+import time
+import traceback
+import typing as t
+
+TRACEPARENT_HEADER = 'traceparent'
+
+_TRACEPARENT_REGEX = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+
+class Span(t.Protocol):
+  """ The part of the interface of an OpenTelemetry span that is used by Cytonic. """
+
+  def set_attribute(self, key: str, value: t.Any) -> None: ...
+
+  def record_exception(self, exception: BaseException) -> None: ...
+
+  def is_recording(self) -> bool: ...
+
+
+class Tracer(abc.ABC):
+
+  @abc.abstractmethod
+  def span(
+    self,
+    name: str,
+    attributes: t.Mapping[str, t.Any] | None = None,
+    headers: t.Mapping[str, str] | None = None,
+  ) -> t.ContextManager[Span]:
+    """
+    Returns a context manager for a span that is the current span in the context. Spans that are opened with
+    *headers* are the root span of a request, and their parent is taken from the headers if they contain one.
+    Otherwise, the parent is the current span.
+    """
+
+  @abc.abstractmethod
+  def inject(self, headers: t.MutableMapping[str, str]) -> None:
+    """ Adds the headers that propagate the current span to the *headers* of an outgoing request. """
+
+
+class _NoopSpan:
+
+  def __enter__(self) -> _NoopSpan:
+    return self
+
+  def __exit__(self, *args: t.Any) -> None:
+    pass
+
+  def set_attribute(self, key: str, value: t.Any) -> None:
+    pass
+
+  def record_exception(self, exception: BaseException) -> None:
+    pass
+
+  def is_recording(self) -> bool:
+    return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class NoopTracer(Tracer):
+  """ Does not record anything. Every span is the same object, so opening one costs no more than a method call. """
+
+  def span(
+    self,
+    name: str,
+    attributes: t.Mapping[str, t.Any] | None = None,
+    headers: t.Mapping[str, str] | None = None,
+  ) -> t.ContextManager[Span]:
+    return _NOOP_SPAN
+
+  def inject(self, headers: t.MutableMapping[str, str]) -> None:
+    pass
+
+
+@dataclasses.dataclass
+class SpanData:
+  """ A span that is recorded by the #W3CTracer. Times are in seconds since the epoch. """
+
+  name: str
+  trace_id: str
+  span_id: str
+  parent_id: str | None
+  start_time: float
+  end_time: float | None = None
+  attributes: dict[str, t.Any] = dataclasses.field(default_factory=dict)
+
+  #: The formatted exceptions that were recorded on the span.
+  exceptions: list[str] = dataclasses.field(default_factory=list)
+
+  @property
+  def duration(self) -> float | None:
+    return None if self.end_time is None else self.end_time - self.start_time
+
+  def set_attribute(self, key: str, value: t.Any) -> None:
+    self.attributes[key] = value
+
+  def record_exception(self, exception: BaseException) -> None:
+    self.exceptions.append(''.join(traceback.format_exception(type(exception), exception, exception.__traceback__)))
+
+  def is_recording(self) -> bool:
+    return self.end_time is None
+
+
+_current_span: contextvars.ContextVar[SpanData | None] = contextvars.ContextVar('_current_span', default=None)
+
+
+class W3CTracer(Tracer):
+  """
+  Records spans with W3C trace context identifiers and passes them to the *export* function when they end, e.g. to
+  log them or to collect them in a test. Spans that are not sampled by the caller, as indicated by the flags of
+  the `traceparent` header, are recorded as well.
+  """
+
+  def __init__(self, export: t.Callable[[SpanData], t.Any]) -> None:
+    self._export = export
+
+  @contextlib.contextmanager
+  def span(
+    self,
+    name: str,
+    attributes: t.Mapping[str, t.Any] | None = None,
+    headers: t.Mapping[str, str] | None = None,
+  ) -> t.Iterator[Span]:
+    if headers is not None:
+      match = _TRACEPARENT_REGEX.match(headers.get(TRACEPARENT_HEADER, '').strip().lower())
+      trace_id, parent_id = (match.group(1), match.group(2)) if match else (os.urandom(16).hex(), None)
+    else:
+      parent = _current_span.get()
+      trace_id, parent_id = (parent.trace_id, parent.span_id) if parent else (os.urandom(16).hex(), None)
+
+    span = SpanData(name, trace_id, os.urandom(8).hex(), parent_id, time.time(), attributes=dict(attributes or {}))
+    token = _current_span.set(span)
+    try:
+      yield span
+    except BaseException as exc:
+      span.record_exception(exc)
+      raise
+    finally:
+      _current_span.reset(token)
+      span.end_time = time.time()
+      self._export(span)
+
+  def inject(self, headers: t.MutableMapping[str, str]) -> None:
+    span = _current_span.get()
+    if span is not None:
+      headers[TRACEPARENT_HEADER] = f'00-{span.trace_id}-{span.span_id}-01'
+
+
+class OpenTelemetryTracer(Tracer):
+  """
+  Delegates to a tracer of the OpenTelemetry API, the one of the global tracer provider by default. The trace
+  context is propagated with the globally configured propagator. Requires the `opentelemetry-api` package.
+  """
+
+  def __init__(self, tracer: t.Any = None) -> None:
+    from opentelemetry import propagate, trace
+    self._propagate = propagate
+    self._trace = trace
+    self._tracer = tracer if tracer is not None else trace.get_tracer('cytonic')
+
+  def span(
+    self,
+    name: str,
+    attributes: t.Mapping[str, t.Any] | None = None,
+    headers: t.Mapping[str, str] | None = None,
+  ) -> t.ContextManager[Span]:
+    if headers is None:
+      return self._tracer.start_as_current_span(name, attributes=attributes)
+    return self._tracer.start_as_current_span(
+      name,
+      context=self._propagate.extract(headers),
+      kind=self._trace.SpanKind.SERVER,
+      attributes=attributes,
+    )
+
+  def inject(self, headers: t.MutableMapping[str, str]) -> None:
+    self._propagate.inject(headers)
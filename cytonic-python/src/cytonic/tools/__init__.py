@@ -0,0 +1 @@
+""" Command line tools to work with services described by a Cytonic #Project. """
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import typing as t
+
+from cytonic.model import EndpointConfig, Project
+
+
+def get_endpoints(project: Project) -> dict[str, EndpointConfig]:
+  """
+  Returns the endpoints of all modules in the *project* keyed by `<service>.<endpoint>`, with the kinds of their
+  arguments resolved.
+  """
+
+  endpoints = {}
+  for module in project.modules.values():
+    for endpoint_name, endpoint in module.endpoints.items():
+      endpoint.resolve_arg_kinds()
+      endpoints[f'{module.name}.{endpoint_name}'] = endpoint
+  return endpoints
+
+
+def match_endpoints(names: t.Iterable[str], key: str) -> list[str]:
+  """ Returns the endpoint *names* matched by *key*, which is either `<endpoint>` or `<service>.<endpoint>`. """
+
+  matches = [name for name in names if name == key or name.endswith('.' + key)]
+  if not matches:
+    raise ValueError(f'no endpoint named {key!r}')
+  return matches
@@ -0,0 +1,415 @@
+"""
+A load generator for services described by a Cytonic #Project. It sends requests with random but valid arguments
+(see #SyntheticData) to the endpoints of a running server over a pool of keep-alive connections and reports the
+latency percentiles and error rates per endpoint. Run it as `cytonic-bench`, which requires `httpx`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import collections
+import dataclasses
+import json
+import math
+import random
+import re
+import sys
+import time
+import typing as t
+import urllib.parse
+
+from cytonic.model import ParamKind, Project
+from cytonic.runtime.encoding import Encoding, JsonEncoding, default_encodings
+
+from ._util import get_endpoints, match_endpoints
+from .synthetic import SyntheticData
+
+if t.TYPE_CHECKING:
+  import httpx
+
+PERCENTILES = (50, 90, 99)
+
+
+@dataclasses.dataclass
+class PreparedRequest:
+  method: str
+  url: str
+  params: dict[str, t.Any]
+  headers: dict[str, str]
+  cookies: dict[str, str]
+  content: bytes | None
+
+
+@dataclasses.dataclass
+class EndpointStats:
+  """ The results of the requests sent to one endpoint. """
+
+  #: The latencies of all requests in seconds, including failed ones.
+  latencies: list[float] = dataclasses.field(default_factory=list)
+
+  #: The number of responses per status code. Requests that failed without a response are counted under the
+  #: name of the exception.
+  status_codes: collections.Counter[str] = dataclasses.field(default_factory=collections.Counter)
+
+  #: The number of requests that failed or returned a status code of 400 or higher.
+  errors: int = 0
+
+  @property
+  def requests(self) -> int:
+    return len(self.latencies)
+
+  @property
+  def error_rate(self) -> float:
+    return self.errors / self.requests if self.requests else 0.0
+
+  def add(self, latency: float, status: str, error: bool) -> None:
+    self.latencies.append(latency)
+    self.status_codes[status] += 1
+    self.errors += error
+
+  def percentile(self, p: float) -> float:
+    """ Returns the *p*-th percentile (0 to 100) of the latencies in seconds with the nearest-rank method. """
+
+    if not self.latencies:
+      return 0.0
+    ordered = sorted(self.latencies)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+@dataclasses.dataclass
+class BenchResult:
+  #: The wall time of the run in seconds.
+  duration: float
+
+  #: The results per endpoint, keyed by `<service>.<endpoint>`.
+  endpoints: dict[str, EndpointStats]
+
+  @property
+  def requests_per_second(self) -> float:
+    return sum(s.requests for s in self.endpoints.values()) / self.duration if self.duration else 0.0
+
+  def to_json(self) -> dict[str, t.Any]:
+    return {
+      'duration': self.duration,
+      'requests_per_second': self.requests_per_second,
+      'endpoints': {
+        name: {
+          'requests': stats.requests,
+          'errors': stats.errors,
+          'error_rate': stats.error_rate,
+          'status_codes': dict(stats.status_codes),
+          **{f'p{p}_ms': stats.percentile(p) * 1000 for p in PERCENTILES},
+          'max_ms': max(stats.latencies, default=0.0) * 1000,
+        }
+        for name, stats in self.endpoints.items()
+      },
+    }
+
+  def format_table(self) -> str:
+    width = max([len('endpoint')] + [len(name) for name in self.endpoints])
+    columns = ['requests', 'errors', 'error %'] + [f'p{p} ms' for p in PERCENTILES] + ['max ms']
+    lines = [f'{"endpoint":<{width}} ' + ' '.join(f'{c:>10}' for c in columns)]
+    for name, stats in self.endpoints.items():
+      values = [f'{stats.requests:>10}', f'{stats.errors:>10}', f'{stats.error_rate * 100:>10.2f}']
+      values += [f'{stats.percentile(p) * 1000:>10.2f}' for p in PERCENTILES]
+      values.append(f'{max(stats.latencies, default=0.0) * 1000:>10.2f}')
+      lines.append(f'{name:<{width}} ' + ' '.join(values))
+    lines.append(f'\n{self.requests_per_second:.1f} requests per second over {self.duration:.2f} seconds')
+    return '\n'.join(lines)
+
+
+class LoadGenerator:
+  """
+  Sends requests to the endpoints of the *project* that are served at *base_url*.
+
+  The endpoints are picked at random with the weights in the *mix*, which maps endpoint names as `<endpoint>` or
+  `<service>.<endpoint>` to their weight. If no mix is specified, all endpoints that are not streaming have the same
+  weight. For every endpoint, a number of *variants* of requests with different arguments are generated upfront,
+  such that generating arguments does not slow down the load generator.
+
+  Up to *concurrency* requests are sent at the same time. If a *rate* is specified, requests are started at that
+  many requests per second. Latencies are then measured from the time a request was scheduled, not from the time
+  it was sent, such that the time a request waited for a free connection while the server is overloaded is
+  included.
+
+  The *headers* are sent with every request, which is how credentials are passed. Request bodies are encoded with
+  the *encoding*. A *transport* can be specified to send requests to an ASGI application in the same process.
+  """
+
+  def __init__(
+    self,
+    project: Project,
+    base_url: str,
+    mix: t.Mapping[str, float] | None = None,
+    concurrency: int = 10,
+    rate: float | None = None,
+    headers: t.Mapping[str, str] | None = None,
+    encoding: Encoding | None = None,
+    data: SyntheticData | None = None,
+    variants: int = 100,
+    timeout: float = 10.0,
+    transport: httpx.AsyncBaseTransport | None = None,
+  ) -> None:
+    if concurrency < 1:
+      raise ValueError('concurrency must be at least 1')
+    if rate is not None and rate <= 0:
+      raise ValueError('rate must be positive')
+
+    self._base_url = base_url
+    self._concurrency = concurrency
+    self._rate = rate
+    self._headers = dict(headers or {})
+    self._encoding = encoding or JsonEncoding()
+    self._data = data or SyntheticData(project)
+    self._random = random.Random(self._data.seed)
+    self._timeout = timeout
+    self._transport = transport
+
+    self._endpoints = get_endpoints(project)
+
+    self._weights = self._get_weights(mix)
+    self._requests = {
+      name: [self.prepare_request(name) for _ in range(variants)]
+      for name in self._weights
+    }
+
+  def _get_weights(self, mix: t.Mapping[str, float] | None) -> dict[str, float]:
+    if mix is None:
+      return {name: 1.0 for name, endpoint in self._endpoints.items() if endpoint.stream is None}
+    weights = {}
+    for key, weight in mix.items():
+      if weight < 0:
+        raise ValueError(f'weight of endpoint {key!r} must not be negative')
+      weights.update(dict.fromkeys(match_endpoints(self._endpoints, key), weight))
+    if not any(weights.values()):
+      raise ValueError('at least one endpoint in the mix must have a weight greater than 0')
+    return weights
+
+  def prepare_request(self, name: str) -> PreparedRequest:
+    """ Returns a request with random arguments for the endpoint *name* (`<service>.<endpoint>`). """
+
+    endpoint = self._endpoints[name]
+    args = self._data.generate_args(endpoint)
+    request = PreparedRequest(endpoint.http.method, '', {}, dict(self._headers), {}, None)
+
+    path_args = {}
+    for arg_name, value in args.items():
+      kind = (endpoint.args or {})[arg_name].kind
+      if kind == ParamKind.body:
+        if isinstance(value, bytes):
+          request.content = value
+          request.headers['Content-Type'] = 'application/octet-stream'
+        else:
+          request.content = self._encoding.encode(value)
+          request.headers['Content-Type'] = self._encoding.media_type
+      elif value is None:
+        continue
+      elif kind == ParamKind.path:
+        path_args[arg_name] = _to_string(value)
+      elif kind == ParamKind.query:
+        request.params[arg_name] = [_to_string(v) for v in value] if isinstance(value, list) else _to_string(value)
+      elif kind == ParamKind.header:
+        request.headers[arg_name.replace('_', '-')] = _to_string(value)
+      elif kind == ParamKind.cookie:
+        request.cookies[arg_name] = _to_string(value)
+
+    request.url = re.sub(
+      r'\{([A-Za-z][A-Za-z0-9_]*)(:[^}]*)?\}',
+      lambda m: urllib.parse.quote(path_args[m.group(1)], safe=''),
+      endpoint.http.path,
+    )
+    return request
+
+  async def run(self, requests: int | None = None, duration: float | None = None) -> BenchResult:
+    """ Sends *requests* requests in total, or requests for *duration* seconds, whichever limit is hit first. """
+
+    if requests is None and duration is None:
+      raise ValueError('either requests or duration must be specified')
+
+    import httpx
+
+    names = list(self._weights)
+    weights = list(self._weights.values())
+    stats = {name: EndpointStats() for name in names}
+    limits = httpx.Limits(max_connections=self._concurrency, max_keepalive_connections=self._concurrency)
+    issued = 0
+    start = time.perf_counter()
+    deadline = start + duration if duration is not None else math.inf
+
+    def _next_slot() -> float | None:
+      """ Returns the time at which to send the next request, or `None` if no more requests are to be sent. """
+
+      nonlocal issued
+      if requests is not None and issued >= requests:
+        return None
+      scheduled = start + issued / self._rate if self._rate else time.perf_counter()
+      if scheduled >= deadline:
+        return None
+      issued += 1
+      return scheduled
+
+    async with httpx.AsyncClient(
+      base_url=self._base_url,
+      limits=limits,
+      timeout=self._timeout,
+      transport=self._transport,
+    ) as client:
+
+      async def _worker() -> None:
+        while (scheduled := _next_slot()) is not None:
+          if (delay := scheduled - time.perf_counter()) > 0:
+            await asyncio.sleep(delay)
+          name = self._random.choices(names, weights)[0]
+          request = self._random.choice(self._requests[name])
+          try:
+            response = await client.request(
+              request.method,
+              request.url,
+              params=request.params,
+              headers=request.headers,
+              cookies=request.cookies or None,
+              content=request.content,
+            )
+          except httpx.HTTPError as exc:
+            stats[name].add(time.perf_counter() - scheduled, type(exc).__name__, True)
+          else:
+            stats[name].add(time.perf_counter() - scheduled, str(response.status_code), response.status_code >= 400)
+
+      await asyncio.gather(*(_worker() for _ in range(self._concurrency)))
+
+    return BenchResult(time.perf_counter() - start, stats)
+
+
+def _to_string(value: t.Any) -> str:
+  """ Formats a synthetic value for a path, query, header or cookie parameter. """
+
+  if isinstance(value, bool):
+    return 'true' if value else 'false'
+  elif isinstance(value, (dict, list)):
+    return json.dumps(value)
+  return str(value)
+
+
+def _parse_mix(value: str) -> tuple[str, float]:
+  name, sep, weight = value.partition('=')
+  try:
+    return name, float(weight) if sep else 1.0
+  except ValueError:
+    raise argparse.ArgumentTypeError(f'bad weight in {value!r}, expected NAME=WEIGHT')
+
+
+def _parse_header(value: str) -> tuple[str, str]:
+  name, sep, header_value = value.partition(':')
+  if not sep:
+    raise argparse.ArgumentTypeError(f'bad header {value!r}, expected NAME: VALUE')
+  return name.strip(), header_value.strip()
+
+
+def get_argument_parser() -> argparse.ArgumentParser:
+  parser = argparse.ArgumentParser(description='Sends requests with synthetic arguments to a Cytonic service.')
+  parser.add_argument(
+    'files',
+    nargs='+',
+    metavar='FILE',
+    help='One or more YAML files that describe the service.',
+  )
+  parser.add_argument(
+    '--url',
+    required=True,
+    help='The base URL of the server, e.g. http://localhost:8000.',
+  )
+  parser.add_argument(
+    '-n', '--requests',
+    type=int,
+    help='The number of requests to send. Defaults to 1000 unless a --duration is specified.',
+  )
+  parser.add_argument(
+    '-d', '--duration',
+    type=float,
+    help='The number of seconds to send requests for.',
+  )
+  parser.add_argument(
+    '-c', '--concurrency',
+    type=int,
+    default=10,
+    help='The number of requests to send at the same time and the size of the connection pool. (default: 10)',
+  )
+  parser.add_argument(
+    '-r', '--rate',
+    type=float,
+    help='The number of requests per second to start. By default, requests are sent as fast as possible.',
+  )
+  parser.add_argument(
+    '-m', '--mix',
+    type=_parse_mix,
+    action='append',
+    metavar='NAME=WEIGHT',
+    help='Send requests to the endpoint NAME with the relative WEIGHT. Can be specified multiple times. By default, '
+      'all endpoints that are not streaming have the same weight.',
+  )
+  parser.add_argument(
+    '-H', '--header',
+    type=_parse_header,
+    action='append',
+    default=[],
+    metavar='NAME: VALUE',
+    help='A header to send with every request, e.g. "Authorization: Bearer <token>".',
+  )
+  parser.add_argument(
+    '--encoding',
+    choices=[e.media_type for e in default_encodings()],
+    default=JsonEncoding.media_type,
+    help='The media type of the encoding of request bodies. (default: %(default)s)',
+  )
+  parser.add_argument(
+    '--seed',
+    type=int,
+    help='The seed for generating arguments and picking endpoints.',
+  )
+  parser.add_argument(
+    '--timeout',
+    type=float,
+    default=10.0,
+    help='The timeout of a request in seconds. (default: %(default)s)',
+  )
+  parser.add_argument(
+    '--json',
+    action='store_true',
+    help='Print the results as JSON.',
+  )
+  return parser
+
+
+def main() -> None:
+  parser = get_argument_parser()
+  args = parser.parse_args()
+
+  if args.mix and not any(weight for _, weight in args.mix):
+    parser.error('at least one --mix weight must be greater than 0')
+  try:
+    import httpx
+  except ImportError:
+    parser.error('cytonic-bench requires httpx, install it with `pip install httpx`')
+
+  project = Project.from_files(args.files)
+  encoding = next(e for e in default_encodings() if e.media_type == args.encoding)
+  generator = LoadGenerator(
+    project,
+    args.url,
+    mix=dict(args.mix) if args.mix else None,
+    concurrency=args.concurrency,
+    rate=args.rate,
+    headers=dict(args.header),
+    encoding=encoding,
+    data=SyntheticData(project, seed=args.seed),
+    timeout=args.timeout,
+  )
+  requests = args.requests if args.requests is not None or args.duration is not None else 1000
+  result = asyncio.run(generator.run(requests, args.duration))
+
+  if args.json:
+    json.dump(result.to_json(), sys.stdout, indent=2)
+    print()
+  else:
+    print(result.format_table())
@@ -0,0 +1,359 @@
+"""
+A mock server for services described by a Cytonic #Project, to load-test clients without load-testing the real
+service. Responses are generated from the return types of the endpoints (see #SyntheticData) or taken from
+fixtures, and encoded once at startup, such that serving a request only means picking one of the encoded bodies.
+Run it as `cytonic-mock`, which requires `uvicorn`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import dataclasses
+import math
+import random
+import re
+import typing as t
+from pathlib import Path
+
+import yaml
+
+from cytonic.model import EndpointConfig, ModuleConfig, Project
+from cytonic.runtime import ServiceException
+from cytonic.runtime.encoding import Encoding, JsonEncoding, default_encodings, negotiate_encoding
+from cytonic.runtime.exceptions import STATUS_CODES
+from cytonic.runtime.streaming import SSE_MEDIA_TYPE
+
+from ._util import get_endpoints, match_endpoints
+from .synthetic import SyntheticData
+
+OCTET_STREAM = 'application/octet-stream'
+
+
+@dataclasses.dataclass(frozen=True)
+class LatencyDistribution:
+  """
+  A distribution of artificial latencies, in milliseconds. Parse one from a string with #parse():
+
+  * `constant:MS` always waits *MS* milliseconds
+  * `uniform:MIN:MAX` waits between *MIN* and *MAX* milliseconds
+  * `normal:MEAN:STDDEV` follows a normal distribution, cut off at zero
+  * `lognormal:MEDIAN:SIGMA` follows a log-normal distribution, which has the long tail of real services
+  * `exponential:MEAN` follows an exponential distribution
+  """
+
+  kind: str
+  parameters: tuple[float, ...]
+
+  ARITY: t.ClassVar[dict[str, int]] = {'constant': 1, 'uniform': 2, 'normal': 2, 'lognormal': 2, 'exponential': 1}
+
+  def __post_init__(self) -> None:
+    if self.kind not in self.ARITY:
+      raise ValueError(f'unknown latency distribution {self.kind!r}, expected one of {", ".join(self.ARITY)}')
+    if len(self.parameters) != self.ARITY[self.kind]:
+      raise ValueError(f'latency distribution {self.kind!r} takes {self.ARITY[self.kind]} parameter(s)')
+    if any(p < 0 for p in self.parameters):
+      raise ValueError(f'parameters of latency distribution {self.kind!r} must not be negative')
+
+  @classmethod
+  def parse(cls, spec: str) -> LatencyDistribution:
+    kind, *parameters = spec.split(':')
+    return cls(kind, tuple(map(float, parameters)))
+
+  def sample(self, rand: random.Random) -> float:
+    """ Returns a latency in seconds. """
+
+    p = self.parameters
+    if self.kind == 'constant':
+      ms = p[0]
+    elif self.kind == 'uniform':
+      ms = rand.uniform(p[0], p[1])
+    elif self.kind == 'normal':
+      ms = rand.gauss(p[0], p[1])
+    elif self.kind == 'lognormal':
+      ms = rand.lognormvariate(math.log(p[0]), p[1]) if p[0] > 0 else 0.0
+    else:
+      ms = rand.expovariate(1 / p[0]) if p[0] > 0 else 0.0
+    return max(ms, 0.0) / 1000
+
+
+@dataclasses.dataclass
+class _Body:
+  content_type: str
+  content: bytes
+
+
+@dataclasses.dataclass
+class _Error:
+  status: int
+  bodies: dict[str, bytes]
+
+
+@dataclasses.dataclass
+class _MockEndpoint:
+  name: str
+  #: Encoded response bodies keyed by media type, for every variant of the response. Streaming and binary
+  #: endpoints have the same body for every media type.
+  variants: list[dict[str, _Body]]
+  errors: list[_Error]
+  latency: LatencyDistribution | None
+  error_rate: float
+
+
+class MockServer:
+  """
+  An ASGI application that serves the endpoints of the *project* with canned responses.
+
+  For every endpoint, the *fixtures* map endpoint names as `<endpoint>` or `<service>.<endpoint>` to a list of
+  responses in their JSON representation. For endpoints without fixtures, a number of *variants* of responses are
+  generated with the *data* generator. Every response is encoded upfront with all *encodings*, and one of them
+  is picked at random for every request, in the encoding negotiated through the `Accept` header. Streaming
+  endpoints respond with all items of a response as Server-Sent Events at once.
+
+  Before responding, the server waits for a latency drawn from the *latency* distribution, which can be
+  overridden per endpoint with *endpoint_latency*. With the probability *error_rate* (or its override in
+  *endpoint_error_rates*), one of the errors defined in the module of the endpoint is returned instead. Request
+  arguments and credentials are not validated.
+  """
+
+  def __init__(
+    self,
+    project: Project,
+    data: SyntheticData | None = None,
+    fixtures: t.Mapping[str, t.Sequence[t.Any]] | None = None,
+    latency: LatencyDistribution | None = None,
+    endpoint_latency: t.Mapping[str, LatencyDistribution] | None = None,
+    error_rate: float = 0.0,
+    endpoint_error_rates: t.Mapping[str, float] | None = None,
+    encodings: t.Sequence[Encoding] | None = None,
+    variants: int = 10,
+  ) -> None:
+    self._data = data or SyntheticData(project)
+    self._random = random.Random(self._data.seed)
+    self._encodings = list(encodings or default_encodings())
+    self._json_encoding = JsonEncoding()
+    self._negotiated: dict[str, str] = {}
+
+    endpoints = get_endpoints(project)
+    overrides: dict[str, dict[str, t.Any]] = {name: {} for name in endpoints}
+    per_endpoint = {'fixtures': fixtures, 'latency': endpoint_latency, 'error_rate': endpoint_error_rates}
+    for option, mapping in per_endpoint.items():
+      for key, value in (mapping or {}).items():
+        for name in match_endpoints(endpoints, key):
+          overrides[name][option] = value
+
+    module_errors: dict[str, list[_Error]] = {}
+    for module in project.modules.values():
+      module_errors.update(dict.fromkeys((f'{module.name}.{e}' for e in module.endpoints), self._encode_errors(module)))
+
+    self._static_routes: dict[tuple[str, str], _MockEndpoint] = {}
+    self._routes: dict[str, list[tuple[re.Pattern[str], _MockEndpoint]]] = {}
+    for name, endpoint in endpoints.items():
+      options = overrides[name]
+      responses = options.get('fixtures')
+      if responses is None:
+        responses = [self._generate_response(endpoint) for _ in range(variants)]
+      if not responses:
+        raise ValueError(f'fixtures of endpoint {name!r} are empty')
+      rate = options.get('error_rate', error_rate)
+      if not 0 <= rate <= 1:
+        raise ValueError(f'error rate of endpoint {name!r} must be between 0 and 1')
+      mock = _MockEndpoint(
+        name=name,
+        variants=[self._encode_response(endpoint, response) for response in responses],
+        errors=module_errors[name],
+        latency=options.get('latency', latency),
+        error_rate=rate,
+      )
+      if endpoint.http.parameters:
+        self._routes.setdefault(endpoint.http.method, []).append((_compile_path(endpoint.http.path), mock))
+      else:
+        self._static_routes[(endpoint.http.method, endpoint.http.path)] = mock
+
+  def _generate_response(self, endpoint: EndpointConfig) -> t.Any:
+    if endpoint.return_ is None:
+      return None
+    elif endpoint.stream is not None:
+      return self._data.generate(f'list[{endpoint.return_}]')
+    return self._data.generate(endpoint.return_)
+
+  def _encode_response(self, endpoint: EndpointConfig, response: t.Any) -> dict[str, _Body]:
+    if endpoint.return_ == 'binary':
+      body = _Body(OCTET_STREAM, response.encode('utf-8') if isinstance(response, str) else bytes(response))
+      return {encoding.media_type: body for encoding in self._encodings}
+    elif endpoint.stream is not None:
+      events = b''.join(b'data: ' + self._json_encoding.encode(item) + b'\n\n' for item in response)
+      body = _Body(SSE_MEDIA_TYPE, events)
+      return {encoding.media_type: body for encoding in self._encodings}
+    return {e.media_type: _Body(e.media_type, e.encode(response)) for e in self._encodings}
+
+  def _encode_errors(self, module: ModuleConfig) -> list[_Error]:
+    """ Encodes one response for every error defined in the module, or an internal error if it defines none. """
+
+    error_names = {cls.ERROR_CODE: cls.ERROR_NAME for cls in ServiceException.__subclasses__()}
+    payloads: list[dict[str, t.Any]] = []
+    for error in module.errors.values():
+      parameters = {name: self._data.generate(field.type) for name, field in (error.fields or {}).items()}
+      error_name = error_names.get(error.error_code, ServiceException.ERROR_NAME)
+      payloads.append({'error_code': error.error_code, 'error_name': error_name, 'parameters': parameters})
+    if not payloads:
+      payloads.append(ServiceException().safe_dict())
+    return [
+      _Error(
+        STATUS_CODES.get(t.cast(str, payload['error_code']), 500),
+        {encoding.media_type: encoding.encode(payload) for encoding in self._encodings},
+      )
+      for payload in payloads
+    ]
+
+  def _negotiate(self, accept: str | None) -> str:
+    key = accept or ''
+    try:
+      return self._negotiated[key]
+    except KeyError:
+      if len(self._negotiated) > 1000:
+        self._negotiated.clear()
+      media_type = self._negotiated[key] = negotiate_encoding(accept, self._encodings).media_type
+      return media_type
+
+  def _find_endpoint(self, method: str, path: str) -> _MockEndpoint | None:
+    mock = self._static_routes.get((method, path))
+    if mock is None:
+      for pattern, candidate in self._routes.get(method, ()):
+        if pattern.fullmatch(path):
+          return candidate
+    return mock
+
+  async def __call__(self, scope: t.Any, receive: t.Callable, send: t.Callable) -> None:
+    if scope['type'] == 'lifespan':
+      while (message := await receive())['type'] != 'lifespan.shutdown':
+        await send({'type': message['type'] + '.complete'})
+      await send({'type': 'lifespan.shutdown.complete'})
+      return
+    if scope['type'] != 'http':
+      return
+
+    mock = self._find_endpoint(scope['method'], scope['path'])
+    if mock is None:
+      await _respond(send, 404, JsonEncoding.media_type, b'{"detail":"Not Found"}')
+      return
+
+    if mock.latency is not None:
+      await asyncio.sleep(mock.latency.sample(self._random))
+
+    accept = next((v.decode('latin-1') for k, v in scope['headers'] if k == b'accept'), None)
+    media_type = self._negotiate(accept)
+    if mock.error_rate and self._random.random() < mock.error_rate:
+      error = self._random.choice(mock.errors)
+      await _respond(send, error.status, media_type, error.bodies[media_type])
+    else:
+      body = self._random.choice(mock.variants)[media_type]
+      await _respond(send, 200, body.content_type, body.content)
+
+
+def _compile_path(path: str) -> re.Pattern[str]:
+  pattern, offset = '', 0
+  for match in re.finditer(r'\{([A-Za-z][A-Za-z0-9_]*)(?::([A-Za-z][A-Za-z0-9_]*))?\}', path):
+    pattern += re.escape(path[offset:match.start()]) + ('.+' if match.group(2) == 'path' else '[^/]+')
+    offset = match.end()
+  return re.compile(pattern + re.escape(path[offset:]))
+
+
+async def _respond(send: t.Callable, status: int, content_type: str, content: bytes) -> None:
+  await send({
+    'type': 'http.response.start',
+    'status': status,
+    'headers': [(b'content-type', content_type.encode('latin-1')), (b'content-length', str(len(content)).encode())],
+  })
+  await send({'type': 'http.response.body', 'body': content})
+
+
+def _parse_override(value: str, parse: t.Callable[[str], t.Any]) -> tuple[str | None, t.Any]:
+  """ Parses a command line option of the form `[NAME=]VALUE`. """
+
+  name, sep, spec = value.rpartition('=')
+  try:
+    return (name if sep else None), parse(spec)
+  except ValueError as exc:
+    raise argparse.ArgumentTypeError(f'{value!r}: {exc}')
+
+
+def get_argument_parser() -> argparse.ArgumentParser:
+  parser = argparse.ArgumentParser(description='Serves a Cytonic service with synthetic or fixture responses.')
+  parser.add_argument(
+    'files',
+    nargs='+',
+    metavar='FILE',
+    help='One or more YAML files that describe the service.',
+  )
+  parser.add_argument(
+    '--host',
+    default='127.0.0.1',
+    help='The host to bind to. (default: %(default)s)',
+  )
+  parser.add_argument(
+    '--port',
+    type=int,
+    default=8000,
+    help='The port to bind to. (default: %(default)s)',
+  )
+  parser.add_argument(
+    '--fixtures',
+    type=Path,
+    metavar='FILE',
+    help='A YAML or JSON file that maps endpoint names to a list of responses.',
+  )
+  parser.add_argument(
+    '--latency',
+    type=lambda v: _parse_override(v, LatencyDistribution.parse),
+    action='append',
+    default=[],
+    metavar='[NAME=]SPEC',
+    help='The latency distribution of all endpoints, or of the endpoint NAME, e.g. "lognormal:20:0.5" or '
+      '"get_user=uniform:5:10". Distributions are constant:MS, uniform:MIN:MAX, normal:MEAN:STDDEV, '
+      'lognormal:MEDIAN:SIGMA and exponential:MEAN, in milliseconds. Can be specified multiple times.',
+  )
+  parser.add_argument(
+    '--error-rate',
+    type=lambda v: _parse_override(v, float),
+    action='append',
+    default=[],
+    metavar='[NAME=]RATE',
+    help='The fraction of requests to all endpoints, or to the endpoint NAME, that fail with one of the errors of '
+      'the service. Can be specified multiple times.',
+  )
+  parser.add_argument(
+    '--variants',
+    type=int,
+    default=10,
+    help='The number of responses to generate per endpoint without fixtures. (default: %(default)s)',
+  )
+  parser.add_argument(
+    '--seed',
+    type=int,
+    help='The seed for generating responses, latencies and errors.',
+  )
+  return parser
+
+
+def main() -> None:
+  parser = get_argument_parser()
+  args = parser.parse_args()
+
+  try:
+    import uvicorn
+  except ImportError:
+    parser.error('cytonic-mock requires uvicorn, install it with `pip install uvicorn`')
+
+  project = Project.from_files(args.files)
+  server = MockServer(
+    project,
+    data=SyntheticData(project, seed=args.seed),
+    fixtures=yaml.safe_load(args.fixtures.read_text()) if args.fixtures else None,
+    latency=next((v for k, v in args.latency if k is None), None),
+    endpoint_latency={k: v for k, v in args.latency if k is not None},
+    error_rate=next((v for k, v in args.error_rate if k is None), 0.0),
+    endpoint_error_rates={k: v for k, v in args.error_rate if k is not None},
+    variants=args.variants,
+  )
+  uvicorn.run(server, host=args.host, port=args.port, log_level='warning', access_log=False)
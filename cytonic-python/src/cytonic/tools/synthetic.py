@@ -0,0 +1,140 @@
+"""
+Generates random values for the types of a Cytonic #Project. The values are in the JSON-compatible structure that
+`databind.json.dump()` produces for the Python types generated from the project, such that they can be passed to
+any #Encoding and are accepted by a server implementing the project.
+"""
+
+from __future__ import annotations
+
+import base64
+import dataclasses
+import datetime
+import random
+import string
+import typing as t
+
+from cytonic.model import Datatype, EndpointConfig, Project, TypeConfig
+
+
+@dataclasses.dataclass
+class SyntheticData:
+  """
+  Generates random values from type strings like `list[User]`. Enums, unions, optionals, references, pages and
+  structs (including the fields of the types that they extend) defined in the *project* are supported.
+
+  Values of the `binary` type are returned as `bytes`, and `stream[T]` is generated as a list of `T`.
+  """
+
+  project: Project
+
+  #: The seed of the random number generator. Pass the same seed to generate the same values again.
+  seed: int | None = None
+
+  #: The minimum number of items in lists, sets, maps and pages.
+  min_items: int = 0
+
+  #: The maximum number of items in lists, sets, maps and pages.
+  max_items: int = 5
+
+  #: The probability that an optional value is `None`.
+  null_probability: float = 0.2
+
+  #: The nesting depth from which optional values are always `None` and collections are empty, such that values
+  #: of recursive types stay small.
+  max_depth: int = 5
+
+  def __post_init__(self) -> None:
+    if not 0 <= self.min_items <= self.max_items:
+      raise ValueError('`SyntheticData.min_items` must not be negative or greater than `max_items`')
+    self._random = random.Random(self.seed)
+
+  def generate(self, type_string: str) -> t.Any:
+    """ Returns a random value of the type described by *type_string*. """
+
+    return self._generate(Datatype.parse(type_string), 0)
+
+  def generate_args(self, endpoint: EndpointConfig) -> dict[str, t.Any]:
+    """
+    Returns random values for the arguments of the *endpoint*. The kinds of the arguments must have been resolved
+    with #EndpointConfig.resolve_arg_kinds().
+    """
+
+    return {name: self.generate(arg.type) for name, arg in (endpoint.args or {}).items()}
+
+  def _generate(self, datatype: Datatype, depth: int) -> t.Any:
+    rand = self._random
+    name, params = datatype.name, datatype.parameters or []
+    exhausted = depth >= self.max_depth
+
+    if name == 'optional':
+      if exhausted or rand.random() < self.null_probability:
+        return None
+      return self._generate(params[0], depth)
+    elif name in ('list', 'set', 'stream', 'array'):
+      values = [self._generate(params[0], depth + 1) for _ in range(self._num_items(exhausted))]
+      if name == 'set':
+        values = list({repr(v): v for v in values}.values())
+      return values
+    elif name == 'map':
+      return {
+        self._generate(params[0], depth + 1): self._generate(params[1], depth + 1)
+        for _ in range(self._num_items(exhausted))
+      }
+    elif name == 'page':
+      return {
+        'items': [self._generate(params[0], depth + 1) for _ in range(self._num_items(exhausted))],
+        'next_cursor': self._string() if rand.random() >= self.null_probability else None,
+      }
+    elif name == 'ref':
+      return self._generate(self._get_fields(params[0].name)['id'], depth + 1)
+    elif name in ('any', 'string'):
+      return self._string()
+    elif name == 'integer':
+      return rand.randint(0, 1000)
+    elif name == 'double':
+      return round(rand.uniform(0, 1000), 3)
+    elif name == 'boolean':
+      return rand.random() < 0.5
+    elif name == 'datetime':
+      value = datetime.datetime(2020, 1, 1) + datetime.timedelta(seconds=rand.randrange(5 * 365 * 24 * 60 * 60))
+      return value.isoformat()
+    elif name == 'decimal':
+      return f'{rand.randint(0, 100000)}.{rand.randint(0, 99):02}'
+    elif name == 'bytes':
+      return base64.b64encode(rand.randbytes(rand.randint(0, 32))).decode('ascii')
+    elif name == 'binary':
+      return rand.randbytes(rand.randint(0, 1024))
+
+    type_ = self._get_type(name)
+    if type_.values is not None:
+      return rand.choice(type_.values).name
+    elif type_.union is not None:
+      key, member = rand.choice(list(type_.union.items()))
+      return {'type': key, key: self._generate(Datatype.parse(member), depth + 1)}
+    elif depth > 10 * self.max_depth:
+      raise ValueError(f'type {name} is infinitely recursive')
+    return {
+      field_name: self._generate(field_type, depth + 1)
+      for field_name, field_type in self._get_fields(name).items()
+    }
+
+  def _get_type(self, type_name: str) -> TypeConfig:
+    type_locator = self.project.find_type(type_name)
+    if type_locator is None:
+      raise ValueError(f'type {type_name} does not exist')
+    return type_locator.module.types[type_name]
+
+  def _get_fields(self, type_name: str) -> dict[str, Datatype]:
+    """ Returns the types of the fields of the struct *type_name*, including the fields of the types it extends. """
+
+    type_ = self._get_type(type_name)
+    fields = self._get_fields(type_.extends) if type_.extends else {}
+    for field_name, field in (type_.fields or {}).items():
+      fields[field_name] = Datatype.parse(field.type)
+    return fields
+
+  def _num_items(self, exhausted: bool) -> int:
+    return 0 if exhausted else self._random.randint(self.min_items, self.max_items)
+
+  def _string(self) -> str:
+    return ''.join(self._random.choices(string.ascii_letters + string.digits, k=self._random.randint(4, 12)))
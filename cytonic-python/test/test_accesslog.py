@@ -0,0 +1,51 @@
+import io
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from nr.util.safearg import Safe
+
+from cytonic.contrib.fastapi import CytonicServiceRouter
+from cytonic.description import authentication, endpoint, service
+from cytonic.model import OAuth2Bearer
+from cytonic.runtime import Credentials, NotFoundError
+from cytonic.runtime.accesslog import AccessLog, AccessLogRecord
+
+
+def test_access_log_drops_records_when_the_queue_is_full():
+  out = io.StringIO()
+  log = AccessLog(out, max_queue_size=2, flush_interval=60)
+  for name in 'abc':
+    log.log(AccessLogRecord('S', name, 'GET', '/', 0.0))
+  assert log.dropped == 1
+  log.close()
+  assert [json.loads(line)['endpoint'] for line in out.getvalue().splitlines()] == ['a', 'b']
+
+
+def test_router_writes_access_log():
+  @service('Items')
+  @authentication(OAuth2Bearer())
+  class Items:
+    @endpoint('POST /items/{item_id}')
+    async def set_item(self, auth: Credentials, item_id: str, value: str) -> str:
+      if item_id == 'unknown':
+        raise NotFoundError(Safe('item not found'))
+      return value
+
+  out = io.StringIO()
+  log = AccessLog(out)
+  app = FastAPI()
+  app.include_router(CytonicServiceRouter(Items(), access_log=log))
+  client = TestClient(app)
+  headers = {'Authorization': 'Bearer token'}
+  assert client.post('/items/a', json='value', headers=headers).status_code == 200
+  assert client.post('/items/unknown', json='value', headers=headers).status_code == 404
+  log.close()
+
+  ok, error = map(json.loads, out.getvalue().splitlines())
+  assert ok['endpoint'] == 'set_item' and ok['path'] == '/items/{item_id}' and ok['method'] == 'POST'
+  assert ok['status'] == 200 and ok['error_code'] is None and ok['credentials'] == 'oauth2_bearer'
+  assert ok['bytes_in'] == len('"value"') and ok['bytes_out'] == len('"value"')
+  assert set(ok['phases']) == {'auth', 'decode', 'handler', 'encode'}
+  assert error['status'] == 404 and error['error_code'] == 'NOT_FOUND'
+  assert AccessLog(sample_rate=0).should_log() is False
@@ -0,0 +1,34 @@
+import dataclasses
+import typing as t
+
+import databind.json
+import pytest
+
+from cytonic.runtime import DoubleArray, IntegerArray
+from cytonic.runtime.arrays import packed_arrays
+from cytonic.runtime.compact import CompactEncoding
+from cytonic.runtime.encoding import MsgpackEncoding
+
+
+@dataclasses.dataclass
+class TimeSeries:
+  values: DoubleArray
+  counts: t.Optional[IntegerArray] = None
+
+
+SERIES = TimeSeries(DoubleArray([0.5, 1.0, -2.0]), IntegerArray([1, -1, 2 ** 40]))
+
+
+def test_typed_array_json():
+  assert databind.json.dump(SERIES, TimeSeries) == {'values': [0.5, 1.0, -2.0], 'counts': [1, -1, 2 ** 40]}
+  assert databind.json.load({'values': [1, 2]}, TimeSeries) == TimeSeries(DoubleArray([1.0, 2.0]))
+  with pytest.raises(databind.core.ConversionError):
+    databind.json.load({'values': 'abc'}, TimeSeries)
+
+
+def test_typed_array_packed():
+  with packed_arrays():
+    assert databind.json.dump(IntegerArray([1, -1]), IntegerArray) == b'\x01' + b'\x00' * 7 + b'\xff' * 8
+  assert IntegerArray.frombuffer(IntegerArray([1, -1]).tobuffer()) == IntegerArray([1, -1])
+  for encoding in (MsgpackEncoding(), CompactEncoding()):
+    assert encoding.load(encoding.dump(SERIES, TimeSeries), TimeSeries) == SERIES
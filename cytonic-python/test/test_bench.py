@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import datetime
+import enum
+import typing as t
+
+import databind.core.annotations
+import databind.json
+import httpx
+import pytest
+import yaml
+from fastapi import FastAPI
+
+from cytonic.contrib.fastapi import CytonicServiceRouter
+from cytonic.description import endpoint, service
+from cytonic.model import Project
+from cytonic.tools.bench import LoadGenerator
+from cytonic.tools.synthetic import SyntheticData
+
+SHAPES_YAML = '''
+name: Shapes
+endpoints:
+  get_shape:
+    http: GET /shapes/{shape_id}
+    args:
+      shape_id: string
+      verbose: {type: 'optional[boolean]', kind: query}
+    return: Shape
+  set_drawing:
+    http: POST /drawings/{name}
+    args:
+      name: string
+      drawing: Drawing
+    return: integer
+types:
+  Color:
+    values: [{name: RED}, {name: GREEN}]
+  Circle:
+    fields: {radius: double}
+  Square:
+    fields: {side: double}
+  Shape:
+    union: {circle: Circle, square: Square}
+  Element:
+    fields: {shape: Shape, color: Color, label: 'optional[string]', children: 'list[Element]'}
+  Base:
+    fields: {created_at: datetime}
+  Drawing:
+    extends: Base
+    fields: {elements: 'list[Element]', tags: 'map[string, integer]'}
+'''
+
+
+class Color(enum.Enum):
+  RED = enum.auto()
+  GREEN = enum.auto()
+
+
+@dataclasses.dataclass
+class Circle:
+  radius: float
+
+
+@dataclasses.dataclass
+class Square:
+  side: float
+
+
+Shape = t.Annotated[t.Union[Circle, Square], databind.core.annotations.union({'circle': Circle, 'square': Square})]
+
+
+@dataclasses.dataclass
+class Element:
+  shape: Shape
+  color: Color
+  label: t.Optional[str]
+  children: t.List[Element]
+
+
+@dataclasses.dataclass
+class Base:
+  created_at: datetime.datetime
+
+
+@dataclasses.dataclass
+class Drawing(Base):
+  elements: t.List[Element]
+  tags: t.Dict[str, int]
+
+
+@service('Shapes')
+class ShapesService:
+
+  @endpoint('GET /shapes/{shape_id}')
+  async def get_shape(self, shape_id: str, verbose: t.Optional[bool] = None) -> Shape:
+    return Circle(1.0)
+
+  @endpoint('POST /drawings/{name}')
+  async def set_drawing(self, name: str, drawing: Drawing) -> int:
+    return len(drawing.elements)
+
+
+def _get_project() -> Project:
+  project = Project()
+  project.add('shapes', yaml.safe_load(SHAPES_YAML))
+  return project
+
+
+def test_synthetic_data_matches_types():
+  data = SyntheticData(_get_project(), seed=42, max_depth=3)
+  for _ in range(20):
+    drawing = databind.json.load(data.generate('Drawing'), Drawing)
+    assert isinstance(drawing.created_at, datetime.datetime)
+  shape = data.generate('Shape')
+  assert shape['type'] in ('circle', 'square') and shape['type'] in shape
+  assert data.generate('Color') in ('RED', 'GREEN')
+  assert SyntheticData(_get_project(), seed=1).generate('list[Drawing]') == \
+    SyntheticData(_get_project(), seed=1).generate('list[Drawing]')
+
+
+def test_load_generator_reports_per_endpoint():
+  app = FastAPI()
+  app.include_router(CytonicServiceRouter(ShapesService()))
+  generator = LoadGenerator(
+    _get_project(),
+    'http://bench',
+    mix={'get_shape': 1, 'Shapes.set_drawing': 3},
+    concurrency=4,
+    data=SyntheticData(_get_project(), seed=0),
+    variants=10,
+    transport=httpx.ASGITransport(app=app),  # type: ignore[arg-type]
+  )
+  result = asyncio.run(generator.run(requests=200))
+
+  assert sum(stats.requests for stats in result.endpoints.values()) == 200
+  for stats in result.endpoints.values():
+    assert stats.requests > 0
+    assert stats.errors == 0, stats.status_codes
+    assert 0 < stats.percentile(50) <= stats.percentile(99)
+  assert result.endpoints['Shapes.set_drawing'].requests > result.endpoints['Shapes.get_shape'].requests
+  assert 'Shapes.set_drawing' in result.format_table()
+
+
+def test_load_generator_limits_rate():
+  app = FastAPI()
+  app.include_router(CytonicServiceRouter(ShapesService()))
+  generator = LoadGenerator(
+    _get_project(),
+    'http://bench',
+    mix={'get_shape': 1},
+    rate=200,
+    variants=1,
+    transport=httpx.ASGITransport(app=app),  # type: ignore[arg-type]
+  )
+  result = asyncio.run(generator.run(requests=20))
+  assert result.endpoints['Shapes.get_shape'].requests == 20
+  assert result.duration >= 19 / 200
+
+
+def test_load_generator_rejects_mix_without_weights():
+  with pytest.raises(ValueError):
+    LoadGenerator(_get_project(), 'http://bench', mix={'get_shape': 0, 'set_drawing': 0})
@@ -0,0 +1,33 @@
+from benchmarks._harness import compare, is_lower_better, main
+
+
+def test_is_lower_better():
+  assert is_lower_better('p50_ms')
+  assert is_lower_better('load_s')
+  assert is_lower_better('peak_per_request_kib')
+  assert is_lower_better('size_bytes')
+  assert not is_lower_better('requests_per_sec')
+  assert not is_lower_better('encode_ops_per_sec')
+
+
+def test_compare_flags_regressions_by_direction():
+  baseline = {'a': {'requests_per_sec': 100.0, 'p99_ms': 10.0}, 'b': {'requests_per_sec': 100.0, 'p99_ms': 10.0}}
+  results = {'a': {'requests_per_sec': 120.0, 'p99_ms': 8.0}, 'b': {'requests_per_sec': 60.0, 'p99_ms': 15.0}}
+  report, regressions = compare(results, baseline, 0.1)
+  assert regressions == ['b.requests_per_sec', 'b.p99_ms']
+  assert report.count('REGRESSION') == 2
+
+
+def test_compare_ignores_changes_within_threshold_and_missing_baselines():
+  baseline = {'a': {'requests_per_sec': 100.0}}
+  results = {'a': {'requests_per_sec': 95.0}, 'new': {'requests_per_sec': 1.0}}
+  assert compare(results, baseline, 0.1)[1] == []
+
+
+def test_main_filter_matches_whole_names(capsys):
+  calls = []
+  benchmarks = {name: (lambda name: lambda args: calls.append(name) or {})(name) for name in ('m_10', 'm_100')}
+  main('test', benchmarks, argv=['-k', 'm_10'])
+  assert calls == ['m_10']
+  main('test', benchmarks, argv=['-k', 'm_*'])
+  assert calls == ['m_10', 'm_10', 'm_100']
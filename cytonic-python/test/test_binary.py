@@ -0,0 +1,79 @@
+import asyncio
+import typing as t
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from cytonic.contrib.fastapi import CytonicServiceRouter
+from cytonic.description import endpoint, service
+from cytonic.model import ArgumentConfig, EndpointConfig, HttpPath
+from cytonic.runtime import Binary
+
+
+def test_binary_from_chunks():
+  async def chunks() -> t.AsyncIterator[bytes]:
+    yield b'foo'
+    yield b'bar'
+
+  binary = Binary(chunks())
+  assert binary.data is None and binary.size is None
+  assert asyncio.run(binary.read()) == b'foobar'
+
+
+def test_binary_from_path(tmp_path: Path):
+  path = tmp_path / 'blob'
+  path.write_bytes(b'\x00' * 100)
+  binary = Binary.from_path(path, 'image/png')
+  assert (binary.path, binary.size, binary.media_type) == (str(path), 100, 'image/png')
+  assert asyncio.run(binary.read()) == b'\x00' * 100
+
+
+def test_binary_argument_must_be_body():
+  config = EndpointConfig(HttpPath('GET /blob'), args={'blob': ArgumentConfig('binary')})
+  with pytest.raises(ValueError):
+    config.resolve_arg_kinds()
+  config = EndpointConfig(HttpPath('PUT /blob'), args={'blob': ArgumentConfig('binary')})
+  config.resolve_arg_kinds()
+
+
+def test_router_streams_binary_uploads_and_downloads(tmp_path: Path):
+  blobs: dict[str, tuple[bytes, str]] = {}
+  path = tmp_path / 'blob'
+  path.write_bytes(b'\x01' * 100)
+
+  @service('Blobs')
+  class Blobs:
+    @endpoint('PUT /blobs/{name}')
+    async def put_blob(self, name: str, blob: Binary) -> int:
+      assert blob.data is None
+      blobs[name] = (await blob.read(), blob.media_type)
+      return len(blobs[name][0])
+
+    @endpoint('GET /blobs/{name}')
+    async def get_blob(self, name: str) -> Binary:
+      data, media_type = blobs[name]
+      return Binary(data, media_type)
+
+    @endpoint('GET /file')
+    async def get_file(self) -> Binary:
+      return Binary.from_path(path, 'image/png')
+
+    @endpoint('POST /checksum')
+    async def checksum(self, data: bytes) -> int:
+      return sum(data)
+
+  app = FastAPI()
+  app.include_router(CytonicServiceRouter(Blobs()))
+  client = TestClient(app)
+
+  assert client.put('/blobs/a', content=b'\x00\x01' * 1000, headers={'Content-Type': 'image/png'}).json() == 2000
+  response = client.get('/blobs/a')
+  assert response.headers['Content-Type'] == 'image/png'
+  assert response.content == b'\x00\x01' * 1000
+  response = client.get('/file')
+  assert response.headers['Content-Type'] == 'image/png' and response.headers['Content-Length'] == '100'
+  assert response.content == b'\x01' * 100
+  assert client.post('/checksum', content=b'\x01\x02', headers={'Content-Type': 'application/octet-stream'}).json() == 3
+  assert client.post('/checksum', json='AQI=').json() == 3
@@ -0,0 +1,93 @@
+import asyncio
+import typing as t
+from pathlib import Path
+
+import databind.core
+import databind.json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from nr.util.safearg import Safe
+
+from cytonic.codegen.python import CodeGenerator
+from cytonic.contrib.fastapi import CytonicServiceRouter
+from cytonic.model import ArgumentConfig, EndpointConfig, HttpPath, ModuleConfig, ParamKind, Project
+from cytonic.runtime import NotFoundError, fetch_bulk, fetch_bulk_blocking
+
+
+def test_bulk_endpoint_is_generated():
+  args = {'user_id': ArgumentConfig('string')}
+  single = EndpointConfig(HttpPath('GET /users/{user_id}'), args=args, return_='User', bulk='user_ids')
+  module = ModuleConfig('Users', endpoints={'get_user': single})
+  assert list(module.endpoints) == ['get_user', 'get_user_bulk']
+  companion = module.endpoints['get_user_bulk']
+  assert str(companion.http) == 'POST /users/_bulk'
+  assert companion.args == {'user_ids': ArgumentConfig('list[string]', ParamKind.body)}
+  assert companion.return_ == 'map[string, User]'
+  assert companion.bulk_of == 'get_user'
+
+
+def test_bulk_endpoint_requires_a_single_key_argument():
+  with pytest.raises(ValueError):
+    EndpointConfig(HttpPath('GET /users'), return_='User', bulk='ids')
+  with pytest.raises(ValueError):
+    EndpointConfig(HttpPath('GET /users/{id}'), args={'id': ArgumentConfig('list[string]')}, return_='User', bulk='ids')
+  with pytest.raises(ValueError):
+    EndpointConfig(HttpPath('GET /users/{id}'), args={'id': ArgumentConfig('string')}, return_='User', bulk='id')
+
+
+def test_bulk_true_names_the_argument_after_the_key():
+  endpoint = databind.json.load(
+    {'http': 'GET /users/{user_id}', 'args': {'user_id': 'string'}, 'return': 'User', 'bulk': True},
+    EndpointConfig,
+  )
+  assert endpoint.bulk == 'user_ids'
+  assert endpoint.get_bulk_endpoint('get_user').args == {'user_ids': ArgumentConfig('list[string]', ParamKind.body)}
+  assert databind.json.load({'http': 'GET /users/{id}', 'bulk': False}, EndpointConfig).bulk is None
+
+
+def test_bulk_key_must_be_the_last_path_segment():
+  args = {'user_id': ArgumentConfig('string')}
+  EndpointConfig(HttpPath('GET /users/{user_id:path}'), args=args, return_='User', bulk=True)
+  with pytest.raises(ValueError):
+    EndpointConfig(HttpPath('GET /users/{user_id}/profile'), args=args, return_='Profile', bulk=True)
+
+
+def test_bulk_of_cannot_be_deserialized():
+  with pytest.raises(databind.core.ConversionError):
+    databind.json.load({'http': 'POST /users/_bulk', 'bulk_of': 'get_user'}, EndpointConfig)
+
+
+def test_generated_bulk_endpoint_calls_single_endpoint(tmp_path: Path):
+  args = {'user_id': ArgumentConfig('string')}
+  single = EndpointConfig(HttpPath('GET /users/{user_id}'), args=args, return_='string', bulk='user_ids')
+  module = ModuleConfig('Users', endpoints={'get_user': single})
+  CodeGenerator(tmp_path, Project(), modules={'users': [module]}).write()
+  scope: dict[str, t.Any] = {}
+  exec((tmp_path / 'users.py').read_text(), scope)
+
+  class Users(scope['UsersServiceAsync']):
+    async def get_user(self, user_id: str) -> str:
+      if user_id == 'unknown':
+        raise NotFoundError(Safe('user not found'))
+      return user_id.upper()
+
+  app = FastAPI()
+  app.include_router(CytonicServiceRouter(Users()))
+  response = TestClient(app).post('/users/_bulk', json=['a', 'b', 'unknown', 'a'])
+  assert response.status_code == 200
+  assert response.json() == {'a': 'A', 'b': 'B'}
+
+
+def test_fetch_bulk_limits_concurrency():
+  running = []
+
+  async def _fetch(key: int) -> int:
+    running.append(key)
+    assert len(running) <= 2
+    await asyncio.sleep(0.001)
+    running.remove(key)
+    return key * 2
+
+  assert asyncio.run(fetch_bulk([1, 2, 3, 1], _fetch, concurrency=2)) == {1: 2, 2: 4, 3: 6}
+  assert fetch_bulk_blocking([1, 2], lambda key: key * 2) == {1: 2, 2: 4}
@@ -0,0 +1,67 @@
+import dataclasses
+import datetime
+import typing as t
+
+import pytest
+
+from cytonic.model import TypeConfig, FieldConfig
+from cytonic.runtime.compact import CompactCodecs, FIELD_NUMBER_METADATA_KEY, get_field_numbers
+from cytonic.runtime.projection import Projection
+
+
+@dataclasses.dataclass
+class User:
+  id: str
+  email: str
+
+
+@dataclasses.dataclass
+class TodoList:
+  id: str
+  owner: User
+  created_at: datetime.datetime
+  tags: t.Optional[t.List[str]] = None
+  scores: t.Dict[str, float] = dataclasses.field(default_factory=dict, metadata={FIELD_NUMBER_METADATA_KEY: 6})
+
+
+def test_type_config_field_numbers():
+  config = TypeConfig(fields={'a': FieldConfig('string'), 'b': FieldConfig('string', number=1), 'c': FieldConfig('string')})
+  assert config.field_numbers() == {'a': 2, 'b': 1, 'c': 3}
+  with pytest.raises(ValueError):
+    TypeConfig(fields={'a': FieldConfig('string', number=1), 'b': FieldConfig('string', number=1)}).validate()
+
+
+def test_compact_codec_roundtrip():
+  assert get_field_numbers(TodoList) == {'id': 1, 'owner': 2, 'created_at': 3, 'tags': 4, 'scores': 6}
+
+  codec = CompactCodecs().get(t.List[TodoList])
+  value = [TodoList('0', User('1', 'john@example.org'), datetime.datetime(2022, 1, 1), ['a'], {'x': 1.0})]
+  encoded = codec.encode(value)
+  assert encoded == [['0', ['1', 'john@example.org'], '2022-01-01T00:00:00.0', ['a'], None, {'x': 1.0}]]
+  assert codec.decode(encoded) == value
+
+  # Trailing fields that are missing from the payload fall back to their defaults.
+  assert codec.decode([['0', ['1', 'john@example.org'], '2022-01-01T00:00:00.0']])[0].scores == {}
+  with pytest.raises(ValueError):
+    codec.decode([['0']])
+
+
+def test_compact_codec_decodes_projected_values():
+  codecs = CompactCodecs()
+  value = TodoList('0', User('1', 'john@example.org'), datetime.datetime(2022, 1, 1), ['a'], {'x': 1.0})
+  encoded = codecs.get(TodoList, Projection.parse('id,owner.email')).encode(value)
+  assert encoded == ['0', [None, 'john@example.org'], None, None, None, None]
+  decoded = codecs.get(TodoList).decode(encoded)
+  assert (decoded.id, decoded.owner.email, decoded.created_at, decoded.scores) == ('0', 'john@example.org', None, None)
+
+
+@dataclasses.dataclass
+class Broken:
+  value: 'Undefined'  # type: ignore[name-defined]
+
+
+def test_compact_codec_is_not_cached_if_compilation_fails():
+  codecs = CompactCodecs()
+  for _ in range(2):
+    with pytest.raises(NameError):
+      codecs.get(Broken)
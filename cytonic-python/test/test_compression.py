@@ -0,0 +1,66 @@
+import databind.json
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from cytonic.contrib.fastapi import CytonicServiceRouter
+from cytonic.description import compress, endpoint, service
+from cytonic.model import CompressionConfig
+from cytonic.runtime.compression import GzipCompressor, decompress, negotiate_compression
+
+
+class _Compressor(GzipCompressor):
+
+  def __init__(self, name: str) -> None:
+    super().__init__()
+    self.name = name
+
+
+def test_negotiate_compression():
+  gzip, br = _Compressor('gzip'), _Compressor('br')
+  assert negotiate_compression(None, [br, gzip]) is None
+  assert negotiate_compression('identity', [br, gzip]) is None
+  assert negotiate_compression('gzip, deflate, br', [br, gzip]) is br
+  assert negotiate_compression('gzip, br;q=0.5', [br, gzip]) is gzip
+  assert negotiate_compression('*', [br, gzip]) is br
+  assert negotiate_compression('br;q=0, *', [br, gzip]) is gzip
+
+
+def test_gzip_roundtrip():
+  compressor = GzipCompressor()
+  data = b'{"items": []}' * 100
+  compressed = compressor.compress(data)
+  assert len(compressed) < len(data)
+  assert decompress(compressed, 'gzip', [compressor]) == data
+  assert decompress(data, None, [compressor]) == data
+
+
+def test_compression_config_from_bool():
+  assert databind.json.load(True, CompressionConfig) == CompressionConfig()
+  assert databind.json.load(False, CompressionConfig) == CompressionConfig(enabled=False)
+  assert databind.json.load({'min_size': 0}, CompressionConfig) == CompressionConfig(min_size=0)
+
+
+def test_router_negotiates_content_encoding():
+  @service('Texts')
+  class Texts:
+    @endpoint('GET /texts/{size}')
+    async def get_text(self, size: int) -> str:
+      return 'x' * size
+
+    @endpoint('GET /raw/{size}')
+    @compress(enabled=False)
+    async def get_raw_text(self, size: int) -> str:
+      return 'x' * size
+
+  app = FastAPI()
+  app.include_router(CytonicServiceRouter(Texts(), compression=CompressionConfig(min_size=100)))
+  client = TestClient(app)
+
+  response = client.get('/texts/1000', headers={'Accept-Encoding': 'gzip'})
+  assert response.headers['Content-Encoding'] == 'gzip' and response.headers['Vary'] == 'Accept-Encoding'
+  assert int(response.headers['Content-Length']) < 1000
+  assert response.json() == 'x' * 1000
+  response = client.get('/texts/1000', headers={'Accept-Encoding': 'identity'})
+  assert 'Content-Encoding' not in response.headers and response.headers['Vary'] == 'Accept-Encoding'
+  assert 'Content-Encoding' not in client.get('/texts/10', headers={'Accept-Encoding': 'gzip'}).headers
+  assert 'Content-Encoding' not in client.get('/raw/1000', headers={'Accept-Encoding': 'gzip'}).headers
@@ -0,0 +1,82 @@
+import dataclasses
+import datetime
+import typing as t
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from cytonic.contrib.fastapi import CytonicServiceRouter
+from cytonic.description import endpoint, service
+from cytonic.runtime.encoding import CborEncoding, Encoding, JsonEncoding, MsgpackEncoding, find_encoding, \
+  negotiate_encoding
+
+
+class FakeMsgpackEncoding(Encoding):
+  media_type = 'application/msgpack'
+  media_type_aliases = ('application/x-msgpack',)
+
+  def encode(self, value):
+    raise NotImplementedError
+
+  def decode(self, data):
+    raise NotImplementedError
+
+
+def test_negotiate_encoding():
+  json, msgpack = JsonEncoding(), FakeMsgpackEncoding()
+  encodings = [json, msgpack]
+  assert negotiate_encoding(None, encodings) is json
+  assert negotiate_encoding('*/*', encodings) is json
+  assert negotiate_encoding('application/msgpack', encodings) is msgpack
+  assert negotiate_encoding('application/x-msgpack', encodings) is msgpack
+  assert negotiate_encoding('application/json;q=0.5, application/msgpack', encodings) is msgpack
+  assert negotiate_encoding('application/msgpack;q=0.5, application/json', encodings) is json
+  assert negotiate_encoding('application/cbor', encodings) is json
+
+
+def test_find_encoding():
+  json, msgpack = JsonEncoding(), FakeMsgpackEncoding()
+  encodings = [json, msgpack]
+  assert find_encoding(None, encodings) is json
+  assert find_encoding('application/json; charset=utf-8', encodings) is json
+  assert find_encoding('application/msgpack', encodings) is msgpack
+  assert find_encoding('text/plain', encodings) is None
+
+
+@dataclasses.dataclass
+class Item:
+  name: str
+  created: datetime.datetime
+
+
+@pytest.mark.parametrize('factory', [MsgpackEncoding, CborEncoding])
+def test_router_negotiates_binary_encodings(factory: t.Callable[[], Encoding]):
+  try:
+    encoding = factory()
+  except ImportError as exc:
+    pytest.skip(str(exc))
+
+  @service('Items')
+  class Items:
+    @endpoint('POST /items')
+    async def create_item(self, item: Item) -> Item:
+      return Item(item.name.upper(), item.created)
+
+  app = FastAPI()
+  app.include_router(CytonicServiceRouter(Items()))
+  client = TestClient(app)
+  item = Item('a', datetime.datetime(2022, 1, 1, 12, 0))
+  body = encoding.dump(item, Item)
+
+  response = client.post('/items', content=body, headers={'Content-Type': encoding.media_type})
+  assert response.headers['Content-Type'] == 'application/json'
+  assert response.json() == {'name': 'A', 'created': '2022-01-01T12:00:00.0'}
+
+  headers = {'Content-Type': encoding.media_type, 'Accept': f'application/json;q=0.5, {encoding.media_type}'}
+  response = client.post('/items', content=body, headers=headers)
+  assert response.headers['Content-Type'] == encoding.media_type
+  assert encoding.load(response.content, Item) == Item('A', item.created)
+
+  response = client.post('/items', content=body, headers={'Content-Type': 'text/plain'})
+  assert response.status_code == 400
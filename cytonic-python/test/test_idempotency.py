@@ -0,0 +1,152 @@
+import asyncio
+import dataclasses
+import time
+
+import msgpack
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from nr.util.safearg import Safe
+
+from cytonic.contrib.fastapi import CytonicServiceRouter
+from cytonic.description import authentication, compress, endpoint, idempotent, service
+from cytonic.model import EndpointConfig, HttpPath, IdempotencyConfig, OAuth2Bearer, StreamConfig
+from cytonic.runtime import Credentials, IllegalArgumentError
+from cytonic.runtime.idempotency import MemoryIdempotencyStore, StoredResponse
+
+
+def _response(body: bytes) -> StoredResponse:
+  return StoredResponse(200, body, 'fingerprint')
+
+
+def test_memory_idempotency_store_evicts_least_recently_used():
+  async def _test() -> None:
+    store = MemoryIdempotencyStore(max_size=2, max_bytes=10)
+    await store.put('a', _response(b'a'), 60)
+    await store.put('b', _response(b'b'), 60)
+    assert await store.get('a') is not None
+    await store.put('c', _response(b'c'), 60)
+    assert await store.get('b') is None
+    assert await store.get('a') is not None and await store.get('c') is not None
+    await store.put('d', _response(b'd' * 9), 60)
+    assert await store.get('a') is None and await store.get('d') is not None
+    await store.put('e', _response(b'e' * 11), 60)
+    assert await store.get('e') is None
+
+  asyncio.run(_test())
+
+
+def test_memory_idempotency_store_expires_responses(monkeypatch: pytest.MonkeyPatch):
+  async def _test() -> None:
+    store = MemoryIdempotencyStore()
+    await store.put('a', _response(b'a'), 10)
+    assert await store.get('a') is not None
+    now = time.monotonic()
+    monkeypatch.setattr(time, 'monotonic', lambda: now + 11)
+    assert await store.get('a') is None
+    assert len(store) == 0
+
+  asyncio.run(_test())
+
+
+def test_idempotency_config_validation():
+  EndpointConfig(HttpPath('POST /items'), idempotent=IdempotencyConfig())
+  with pytest.raises(ValueError):
+    EndpointConfig(HttpPath('GET /items'), idempotent=IdempotencyConfig())
+  with pytest.raises(ValueError):
+    EndpointConfig(HttpPath('POST /items'), return_='string', stream=StreamConfig(), idempotent=IdempotencyConfig())
+  with pytest.raises(ValueError):
+    IdempotencyConfig(ttl=0)
+
+
+@dataclasses.dataclass
+class Item:
+  name: str
+  tags: list[str]
+
+
+def _get_client() -> tuple[TestClient, list[str]]:
+  calls = []
+
+  @service('Items')
+  class Items:
+    @endpoint('POST /items')
+    @idempotent()
+    @compress(min_size=0)
+    async def create_item(self, name: str) -> Item:
+      calls.append(name)
+      if not name:
+        raise IllegalArgumentError(Safe('name must not be empty'))
+      return Item(name, ['tag'] * 100)
+
+  app = FastAPI()
+  app.include_router(CytonicServiceRouter(Items()))
+  return TestClient(app), calls
+
+
+def test_idempotent_replay_is_encoded_for_every_request():
+  client, calls = _get_client()
+  headers = {'Idempotency-Key': 'abc', 'Accept-Encoding': 'identity'}
+  first = client.post('/items', json='a', headers={**headers, 'Accept': 'application/json'})
+  assert first.status_code == 200
+  assert 'Idempotent-Replayed' not in first.headers
+
+  replay = client.post('/items', json='a', headers={**headers, 'Accept': 'application/msgpack'})
+  assert replay.headers['Idempotent-Replayed'] == 'true'
+  assert replay.headers['Content-Type'] == 'application/msgpack'
+  assert msgpack.unpackb(replay.content) == first.json()
+
+  replay = client.post('/items', json='a', headers={'Idempotency-Key': 'abc', 'Accept-Encoding': 'gzip'})
+  assert replay.headers['Content-Encoding'] == 'gzip'
+  assert replay.json() == first.json()
+  assert calls == ['a']
+
+
+def test_idempotent_replay_of_errors_and_conflicts():
+  client, calls = _get_client()
+  first = client.post('/items', json='', headers={'Idempotency-Key': 'abc'})
+  assert first.status_code == 400
+  replay = client.post('/items', json='', headers={'Idempotency-Key': 'abc', 'Accept': 'application/msgpack'})
+  assert replay.status_code == 400
+  assert replay.headers['Idempotent-Replayed'] == 'true'
+  assert msgpack.unpackb(replay.content) == first.json()
+
+  response = client.post('/items', json='b', headers={'Idempotency-Key': 'abc'})
+  assert response.status_code == 409
+  assert calls == ['']
+
+
+def test_idempotent_replay_is_scoped_to_authenticated_credentials():
+  calls = []
+
+  @service('Secrets')
+  @authentication(OAuth2Bearer(header_name='X-Token'))
+  class Secrets:
+    @endpoint('POST /secrets')
+    @idempotent()
+    async def create_secret(self, auth: Credentials, name: str) -> Item:
+      calls.append(auth.get_bearer_token())
+      return Item(f'secret-of-{auth.get_bearer_token()}-{name}', [])
+
+  app = FastAPI()
+  app.include_router(CytonicServiceRouter(Secrets(), fields_parameter='fields'))
+  client = TestClient(app)
+  first = client.post('/secrets', json='x', headers={'Idempotency-Key': 'abc', 'X-Token': 'Bearer alice'})
+  assert first.json() == {'name': 'secret-of-alice-x', 'tags': []}
+
+  response = client.post('/secrets', json='x', headers={'Idempotency-Key': 'abc'})
+  assert response.status_code == 403
+  assert 'Idempotent-Replayed' not in response.headers
+
+  response = client.post('/secrets', json='x', headers={'Idempotency-Key': 'abc', 'X-Token': 'Bearer bob'})
+  assert response.json() == {'name': 'secret-of-bob-x', 'tags': []}
+  assert 'Idempotent-Replayed' not in response.headers
+
+  headers = {'Idempotency-Key': 'abc', 'X-Token': 'Bearer alice'}
+  response = client.post('/secrets?fields=unknown', json='x', headers=headers)
+  assert response.status_code == 400
+  headers['Idempotency-Key'] = 'def'
+  responses = [client.post('/secrets?fields=name', json='x', headers=headers) for _ in range(2)]
+  assert [r.json() for r in responses] == [{'name': 'secret-of-alice-x'}] * 2
+  assert responses[1].headers['Idempotent-Replayed'] == 'true'
+  assert calls == ['alice', 'bob', 'alice']
@@ -0,0 +1,124 @@
+import asyncio
+import gc
+import typing as t
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from cytonic.contrib.fastapi import CytonicServiceRouter
+from cytonic.description import endpoint, service, stream
+from cytonic.runtime import DataLoader, scoped
+from cytonic.runtime.loader import loader_scope
+from cytonic.runtime.tracing import SpanData, W3CTracer
+
+
+def test_data_loader_batches_keys():
+  batches: list[list[int]] = []
+
+  async def fetch(keys: list[int]) -> dict[int, str]:
+    batches.append(keys)
+    return {k: str(k) for k in keys if k != 0}
+
+  async def _test() -> None:
+    loader = DataLoader(fetch, max_batch_size=3)
+    assert await asyncio.gather(loader.load(1), loader.load(2), loader.load(1)) == ['1', '2', '1']
+    assert await loader.load_many([2, 3, 4, 5, 6]) == ['2', '3', '4', '5', '6']
+    with pytest.raises(KeyError):
+      await loader.load(0)
+    loader.clear(1)
+    assert await loader.load(1) == '1'
+    assert batches == [[1, 2], [3, 4, 5], [6], [0], [1]]
+
+  asyncio.run(_test())
+
+
+def test_data_loader_with_sequence_result():
+  async def fetch(keys: list[int]) -> list[int]:
+    return [k * 2 for k in keys]
+
+  async def _test() -> None:
+    loader = DataLoader(fetch, cache=False)
+    assert await loader.load_many([1, 2, 3]) == [2, 4, 6]
+
+  asyncio.run(_test())
+
+
+def test_data_loader_propagates_errors():
+  calls = 0
+
+  async def fetch(keys: list[int]) -> list[int]:
+    nonlocal calls
+    calls += 1
+    raise ConnectionError
+
+  async def _test() -> None:
+    loader = DataLoader(fetch)
+    for _ in range(2):
+      with pytest.raises(ConnectionError):
+        await loader.load_many([1, 2])
+    assert calls == 2
+
+  asyncio.run(_test())
+
+
+def test_data_loader_batch_survives_cancelled_request():
+  batches: list[list[str]] = []
+
+  async def fetch(keys: list[str]) -> list[str]:
+    batches.append(keys)
+    await asyncio.sleep(0.01)
+    return [key.upper() for key in keys]
+
+  async def _test() -> None:
+    loader = DataLoader(fetch)
+    first = asyncio.ensure_future(loader.load('a'))
+    others = asyncio.gather(loader.load('a'), loader.load('b'))
+    await asyncio.sleep(0.001)
+    first.cancel()
+    gc.collect()
+    assert await others == ['A', 'B']
+    assert first.cancelled()
+    assert batches == [['a', 'b']]
+
+  asyncio.run(_test())
+
+
+def test_scoped_data_loader():
+  async def fetch(keys: list[int]) -> list[int]:
+    return keys
+
+  loader = scoped(lambda: DataLoader(fetch))
+  assert loader() is not loader()
+  with loader_scope():
+    assert loader() is loader()
+    outer = loader()
+    with loader_scope():
+      assert loader() is not outer
+
+
+def test_router_keeps_the_loader_scope_open_while_streaming():
+  batches: list[list[str]] = []
+  spans: list[SpanData] = []
+
+  async def fetch(keys: list[str]) -> list[str]:
+    batches.append(keys)
+    return [key.upper() for key in keys]
+
+  loader = scoped(lambda: DataLoader(fetch))
+
+  @service('Items')
+  class Items:
+    @endpoint('GET /items')
+    @stream()
+    async def watch_items(self) -> t.AsyncIterator[str]:
+      for key in ['a', 'b', 'a']:
+        yield await loader().load(key)
+      assert not any(span.name == 'watch_items' for span in spans)
+
+  app = FastAPI()
+  app.include_router(CytonicServiceRouter(Items(), tracer=W3CTracer(spans.append)))
+  response = TestClient(app).get('/items')
+  assert [event for event in response.text.split('\n\n') if event] == ['data: "A"', 'data: "B"', 'data: "A"']
+  assert batches == [['a'], ['b']]
+  assert spans[-1].name == 'watch_items'
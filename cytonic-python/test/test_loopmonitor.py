@@ -0,0 +1,48 @@
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from cytonic.contrib.fastapi import CytonicServiceRouter, ReceiveTimeMiddleware
+from cytonic.description import endpoint, service
+from cytonic.runtime.loopmonitor import LoopMonitor
+from cytonic.runtime.metrics import MemoryMetricsSink
+
+
+@service('Blocking')
+class Blocking:
+
+  @endpoint('GET /block')
+  async def block(self) -> None:
+    _hold_the_loop()
+
+  @endpoint('GET /fast')
+  async def fast(self) -> None:
+    pass
+
+
+def _hold_the_loop() -> None:
+  time.sleep(0.3)
+
+
+def test_loop_monitor_attributes_blocks_to_endpoints():
+  metrics = MemoryMetricsSink()
+  monitor = LoopMonitor(metrics, interval=0.01, threshold=0.1)
+  app = FastAPI()
+  app.add_middleware(ReceiveTimeMiddleware)
+  app.include_router(CytonicServiceRouter(Blocking(), metrics=metrics, loop_monitor=monitor))
+
+  with TestClient(app) as client:
+    assert client.get('/fast').status_code == 200
+    assert client.get('/block').status_code == 200
+    monitor.stop()
+
+  blocked, = monitor.get_blocked()
+  assert blocked.endpoint == 'block' and blocked.duration > 0.1
+  assert '_hold_the_loop' in blocked.stack
+  assert metrics.get_counter('cytonic.loop.blocked', endpoint='block') == 1
+
+  duration = metrics.get_summary('cytonic.request.duration', service='Blocking', endpoint='block', status='200')
+  assert duration is not None and duration.count == 1 and duration.min >= 0.3
+  delay = metrics.get_summary('cytonic.request.queue_delay', service='Blocking', endpoint='fast')
+  assert delay is not None and delay.count == 1
@@ -0,0 +1,43 @@
+import tracemalloc
+
+from cytonic.runtime.memory import MemoryTracker
+
+
+def _allocate() -> list[bytes]:
+  return [bytes(1000) for _ in range(100)]
+
+
+def test_memory_tracker_samples_every_nth_request():
+  tracker = MemoryTracker(sample_every=2)
+  requests = [tracker.start_request('a') for _ in range(3)]
+  assert requests[0] is not None and requests[1] is None and requests[2] is None  # Only one request at a time.
+  requests[0].close()
+  assert tracker.start_request('a') is None
+  request = tracker.start_request('a')
+  assert request is not None
+  request.close()
+  assert MemoryTracker().start_request('a') is None
+
+
+def test_memory_tracker_records_phases():
+  tracker = MemoryTracker(sample_every=1)
+  tracing = tracemalloc.is_tracing()
+  request = tracker.start_request('a')
+  assert request is not None
+  with request.phase('handler'):
+    retained = _allocate()
+  with request.phase('encode'):
+    _allocate()
+  request.close()
+  assert tracemalloc.is_tracing() == tracing
+
+  report = tracker.get_report()['a']
+  assert report['handler'].count == 1
+  assert report['handler'].allocated >= 100_000
+  assert report['encode'].allocated < 100_000 <= report['encode'].peak
+  (site, size), *_ = tracker.get_top_sites('a')
+  assert 'test_memory.py' in site and size >= 100_000
+  del retained
+
+  tracker.reset()
+  assert tracker.get_report() == {} and tracker.get_top_sites('a') == []
@@ -0,0 +1,128 @@
+import asyncio
+import dataclasses
+import random
+import typing as t
+
+import databind.json
+import httpx
+import msgpack
+import pytest
+import yaml
+
+from cytonic.model import Project
+from cytonic.tools.bench import LoadGenerator
+from cytonic.tools.mock import LatencyDistribution, MockServer
+from cytonic.tools.synthetic import SyntheticData
+
+USERS_YAML = '''
+name: Users
+endpoints:
+  get_user:
+    http: GET /users/{user_id}
+    args:
+      user_id: string
+    return: User
+  list_users:
+    http: GET /users
+    return: list[User]
+  watch_users:
+    http: GET /users/_watch
+    return: User
+    stream: true
+  delete_user:
+    http: DELETE /users/{user_id}
+    args:
+      user_id: string
+types:
+  User:
+    fields: {id: string, email: string, age: 'optional[integer]'}
+errors:
+  UserNotFound:
+    error_code: NOT_FOUND
+    fields: {user_id: string}
+'''
+
+
+@dataclasses.dataclass
+class User:
+  id: str
+  email: str
+  age: t.Optional[int]
+
+
+def _get_project() -> Project:
+  project = Project()
+  project.add('users', yaml.safe_load(USERS_YAML))
+  return project
+
+
+def _request(app: MockServer, method: str, url: str, **kwargs: t.Any) -> httpx.Response:
+  async def _send() -> httpx.Response:
+    transport = httpx.ASGITransport(app=app)  # type: ignore[arg-type]
+    async with httpx.AsyncClient(transport=transport, base_url='http://mock') as client:
+      return await client.request(method, url, **kwargs)
+  return asyncio.run(_send())
+
+
+def test_mock_server_serves_synthetic_responses():
+  app = MockServer(_get_project(), SyntheticData(_get_project(), seed=0))
+
+  response = _request(app, 'GET', '/users/abc')
+  assert response.status_code == 200
+  assert isinstance(databind.json.load(response.json(), User), User)
+
+  response = _request(app, 'GET', '/users', headers={'Accept': 'application/msgpack'})
+  assert response.headers['Content-Type'] == 'application/msgpack'
+  databind.json.load(msgpack.unpackb(response.content), t.List[User])
+
+  response = _request(app, 'GET', '/users/_watch')
+  assert response.headers['Content-Type'] == 'text/event-stream'
+  assert all(event.startswith('data: ') for event in response.text.split('\n\n') if event)
+
+  assert _request(app, 'DELETE', '/users/abc').json() is None
+  assert _request(app, 'GET', '/unknown').status_code == 404
+  assert _request(app, 'POST', '/users').status_code == 404
+
+
+def test_mock_server_fixtures_and_errors():
+  fixture = {'id': 'fixed', 'email': 'fixed@example.org', 'age': None}
+  app = MockServer(
+    _get_project(),
+    fixtures={'get_user': [fixture]},
+    endpoint_error_rates={'Users.list_users': 1.0},
+  )
+  assert _request(app, 'GET', '/users/abc').json() == fixture
+
+  response = _request(app, 'GET', '/users')
+  assert response.status_code == 404
+  assert response.json()['error_code'] == 'NOT_FOUND'
+  assert set(response.json()['parameters']) == {'user_id'}
+
+  with pytest.raises(ValueError):
+    MockServer(_get_project(), fixtures={'unknown': []})
+
+
+def test_latency_distribution():
+  rand = random.Random(0)
+  assert LatencyDistribution.parse('constant:10').sample(rand) == 0.01
+  assert all(0.005 <= LatencyDistribution.parse('uniform:5:10').sample(rand) <= 0.01 for _ in range(100))
+  assert all(LatencyDistribution.parse('normal:1:10').sample(rand) >= 0 for _ in range(100))
+  with pytest.raises(ValueError):
+    LatencyDistribution.parse('uniform:5')
+  with pytest.raises(ValueError):
+    LatencyDistribution.parse('pareto:1')
+
+
+def test_load_generator_against_mock_server():
+  app = MockServer(_get_project(), latency=LatencyDistribution.parse('constant:1'))
+  generator = LoadGenerator(
+    _get_project(),
+    'http://mock',
+    concurrency=8,
+    variants=5,
+    transport=httpx.ASGITransport(app=app),  # type: ignore[arg-type]
+  )
+  result = asyncio.run(generator.run(requests=100))
+  assert set(result.endpoints) == {'Users.get_user', 'Users.list_users', 'Users.delete_user'}
+  assert all(stats.errors == 0 for stats in result.endpoints.values())
+  assert min(stats.percentile(50) for stats in result.endpoints.values()) >= 0.001
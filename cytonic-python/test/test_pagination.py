@@ -0,0 +1,91 @@
+import asyncio
+import dataclasses
+import typing as t
+
+import databind.json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from cytonic.contrib.fastapi import CytonicServiceRouter
+from cytonic.description import endpoint, service
+from cytonic.description import paginate as paginate_endpoint
+from cytonic.model import EndpointConfig, PaginationConfig
+from cytonic.runtime import IllegalArgumentError, Page
+from cytonic.runtime.compact import CompactEncoding
+from cytonic.runtime.pagination import iter_items, paginate, paginate_sequence
+
+
+@dataclasses.dataclass
+class Item:
+  id: int
+
+
+def test_paginate_config_adds_arguments_and_page_return_type():
+  config = databind.json.load({'http': 'GET /items', 'return': 'list[Item]', 'paginate': True}, EndpointConfig)
+  assert config.paginate == PaginationConfig()
+  assert config.return_ == 'page[Item]'
+  assert config.args is not None
+  assert {k: a.type for k, a in config.args.items()} == {'cursor': 'optional[string]', 'limit': 'optional[integer]'}
+
+  with pytest.raises(ValueError):
+    EndpointConfig('GET /items', return_='Item', paginate=PaginationConfig())
+
+
+def test_page_serialization():
+  page = Page([Item(1), Item(2)], 'abc')
+  assert databind.json.dump(page, Page[Item]) == {'items': [{'id': 1}, {'id': 2}], 'next_cursor': 'abc'}
+  assert databind.json.load({'items': [{'id': 1}]}, Page[Item]) == Page([Item(1)])
+  encoding = CompactEncoding()
+  assert encoding.load(encoding.dump(page, Page[Item]), Page[Item]) == page
+
+
+def test_paginate_sequence():
+  items = list(range(5))
+  first = paginate_sequence(items, None, 2)
+  assert first.items == [0, 1]
+  second = paginate_sequence(items, first.next_cursor, 2)
+  assert second.items == [2, 3]
+  assert paginate_sequence(items, second.next_cursor, 2) == Page([4])
+  with pytest.raises(IllegalArgumentError):
+    paginate_sequence(items, 'garbage', 2)
+
+
+def test_iter_items_with_prefetch():
+  items = [Item(i) for i in range(7)]
+  fetched: list[str | None] = []
+
+  async def fetch(cursor: str | None) -> Page[Item]:
+    fetched.append(cursor)
+    start = int(cursor) if cursor else 0
+    return await paginate(iter(items[start:]), 3, lambda item: str(item.id + 1))
+
+  async def main() -> list[Item]:
+    return [item async for item in iter_items(fetch, prefetch=True)]
+
+  assert asyncio.run(main()) == items
+  assert fetched == [None, '3', '6']
+
+
+def test_router_clamps_limit_and_returns_next_cursor():
+  items = [Item(i) for i in range(5)]
+
+  @service('Items')
+  class Items:
+    @endpoint('GET /items')
+    @paginate_endpoint(default_limit=2, max_limit=3)
+    async def list_items(self, cursor: t.Optional[str] = None, limit: t.Optional[int] = None) -> Page[Item]:
+      assert limit is not None
+      return paginate_sequence(items, cursor, limit)
+
+  app = FastAPI()
+  app.include_router(CytonicServiceRouter(Items()))
+  client = TestClient(app)
+
+  page = client.get('/items').json()
+  assert [item['id'] for item in page['items']] == [0, 1]
+  page = client.get('/items', params={'limit': 100}).json()
+  assert [item['id'] for item in page['items']] == [0, 1, 2]
+  page = client.get('/items', params={'limit': 100, 'cursor': page['next_cursor']}).json()
+  assert page == {'items': [{'id': 3}, {'id': 4}]}
+  assert client.get('/items', params={'limit': 0}).status_code == 400
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from nr.util.safearg import Safe
+
+from cytonic.contrib.fastapi import CytonicServiceRouter
+from cytonic.description import authentication, endpoint, service
+from cytonic.model import OAuth2Bearer
+from cytonic.runtime import Credentials, PrincipalResolver, UnauthorizedError, get_principal
+
+
+def test_principal_resolver_caches_results():
+  calls: list[str] = []
+
+  async def resolve(credentials: Credentials) -> str:
+    calls.append(credentials.get_bearer_token())
+    await asyncio.sleep(0.01)
+    if credentials.get_bearer_token() == 'bad':
+      raise UnauthorizedError(Safe('invalid token'))
+    return 'john'
+
+  async def _test() -> None:
+    resolver = PrincipalResolver(resolve)
+    good = Credentials.of_bearer_token(OAuth2Bearer(), 'good')
+    bad = Credentials.of_bearer_token(OAuth2Bearer(), 'bad')
+    assert await asyncio.gather(*[resolver(good) for _ in range(5)]) == ['john'] * 5
+    assert await resolver(good) == 'john'
+    for _ in range(2):
+      with pytest.raises(UnauthorizedError):
+        await resolver(bad)
+    assert calls == ['good', 'bad']
+    resolver.invalidate(good)
+    assert await resolver(good) == 'john'
+    assert calls == ['good', 'bad', 'good']
+
+  asyncio.run(_test())
+
+
+def test_principal_resolver_does_not_cache_unexpected_errors():
+  calls = 0
+
+  async def resolve(credentials: Credentials) -> str:
+    nonlocal calls
+    calls += 1
+    raise ConnectionError
+
+  async def _test() -> None:
+    resolver = PrincipalResolver(resolve)
+    for _ in range(2):
+      with pytest.raises(ConnectionError):
+        await resolver(Credentials.of_bearer_token(OAuth2Bearer(), 'good'))
+    assert calls == 2
+
+  asyncio.run(_test())
+
+
+def test_router_resolves_principal_for_handlers():
+  calls: list[str] = []
+
+  async def resolve(credentials: Credentials) -> str:
+    calls.append(credentials.get_bearer_token())
+    if credentials.get_bearer_token() == 'bad':
+      raise UnauthorizedError(Safe('invalid token'))
+    return 'john'
+
+  @service('Users')
+  @authentication(OAuth2Bearer())
+  class Users:
+    @endpoint('GET /users/me')
+    async def me(self, auth: Credentials) -> str:
+      return get_principal()
+
+  app = FastAPI()
+  app.include_router(CytonicServiceRouter(Users(), principal_resolver=PrincipalResolver(resolve)))
+  client = TestClient(app)
+  assert [client.get('/users/me', headers={'Authorization': 'Bearer good'}).json() for _ in range(2)] == ['john'] * 2
+  assert client.get('/users/me', headers={'Authorization': 'Bearer bad'}).status_code == 403
+  assert calls == ['good', 'bad']
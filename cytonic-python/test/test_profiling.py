@@ -0,0 +1,69 @@
+import pstats
+import time
+import typing as t
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from cytonic.contrib.fastapi import CytonicServiceRouter
+from cytonic.description import endpoint, service, stream
+from cytonic.runtime.memory import MemoryTracker
+from cytonic.runtime.profiling import CProfileProfiler, StackSamplingProfiler
+
+
+def _busy() -> None:
+  start = time.perf_counter()
+  while time.perf_counter() - start < 0.02:
+    pass
+
+
+def test_profiler_samples_every_nth_request():
+  profiler = CProfileProfiler(sample_every=3)
+  assert [profiler.should_profile('a') for _ in range(4)] == [True, False, False, True]
+  assert profiler.should_profile('b')
+  assert not any(CProfileProfiler().should_profile('a') for _ in range(3))
+
+
+def test_cprofile_profiler(tmp_path: Path):
+  profiler = CProfileProfiler(sample_every=1)
+  for _ in range(2):
+    with profiler.profile('a'):
+      _busy()
+  assert profiler.get_samples() == {'a': 2}
+  assert '_busy' in profiler.format('a')
+  filename, = profiler.dump(tmp_path)
+  assert any(func[2] == '_busy' for func in pstats.Stats(filename).stats)  # type: ignore[attr-defined]
+
+
+def test_stack_sampling_profiler():
+  profiler = StackSamplingProfiler(sample_every=1)
+  with profiler.profile('a'):
+    _busy()
+  assert profiler.get_samples() == {'a': 1}
+  assert any(stack.endswith(')') and '_busy' in stack for stack in profiler.get_stacks('a'))
+  profiler.reset()
+  assert profiler.get_samples() == {} and profiler.format('a') == ''
+
+
+def test_router_stops_sampling_before_streaming():
+  profiler = CProfileProfiler(sample_every=1)
+  tracker = MemoryTracker(sample_every=1)
+  sampled = []
+
+  @service('Items')
+  class Items:
+    @endpoint('GET /items')
+    @stream()
+    async def watch_items(self) -> t.AsyncIterator[str]:
+      yield 'a'
+      memory = tracker.start_request('other')
+      sampled.append((profiler.should_profile('other'), memory is not None))
+      if memory is not None:
+        memory.close()
+
+  app = FastAPI()
+  app.include_router(CytonicServiceRouter(Items(), profiler=profiler, memory_tracker=tracker))
+  assert TestClient(app).get('/items').status_code == 200
+  assert sampled == [(True, True)]
+  assert profiler.get_samples() == {'watch_items': 1}
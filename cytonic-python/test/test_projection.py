@@ -0,0 +1,71 @@
+import dataclasses
+import typing as t
+
+import msgpack
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from cytonic.contrib.fastapi import CytonicServiceRouter
+from cytonic.description import endpoint, service
+from cytonic.runtime.projection import Projection
+
+
+@dataclasses.dataclass
+class User:
+  id: str
+  email: str
+
+
+@dataclasses.dataclass
+class TodoList:
+  id: str
+  name: str
+  owner: User
+  reviewer: t.Optional[User] = None
+
+
+def test_parse_projection():
+  assert str(Projection.parse('id, name,owner.id')) == 'id,name,owner.id'
+  assert str(Projection.parse('owner.id,owner')) == 'owner'
+  assert str(Projection.parse('owner,owner.id')) == 'owner'
+  with pytest.raises(ValueError):
+    Projection.parse('owner..id')
+  with pytest.raises(ValueError):
+    Projection.parse(',')
+
+
+def test_validate_projection():
+  Projection.parse('id,owner.email,reviewer.id').validate(t.List[TodoList])
+  with pytest.raises(ValueError):
+    Projection.parse('id,owner.name').validate(t.List[TodoList])
+  with pytest.raises(ValueError):
+    Projection.parse('id.foo').validate(TodoList)
+  with pytest.raises(ValueError):
+    Projection.parse('id').validate(t.List[str])
+
+
+def test_dump_projection():
+  value = [TodoList('0', 'Groceries', User('1', 'john@example.org'))]
+  assert Projection.parse('id,owner.email,reviewer').dump(value, t.List[TodoList]) == \
+    [{'id': '0', 'owner': {'email': 'john@example.org'}}]
+
+
+def test_router_applies_fields_parameter():
+  @service('TodoLists')
+  class TodoLists:
+    @endpoint('GET /lists')
+    async def get_lists(self) -> t.List[TodoList]:
+      return [TodoList('0', 'Groceries', User('1', 'john@example.org'))]
+
+  app = FastAPI()
+  app.include_router(CytonicServiceRouter(TodoLists(), fields_parameter='fields'))
+  client = TestClient(app)
+  assert client.get('/lists', params={'fields': 'id,owner.email'}).json() == \
+    [{'id': '0', 'owner': {'email': 'john@example.org'}}]
+  headers = {'Accept': 'application/msgpack'}
+  response = client.get('/lists', params={'fields': 'name'}, headers=headers)
+  assert msgpack.unpackb(response.content) == [{'name': 'Groceries'}]
+  response = client.get('/lists', params={'fields': 'owner.name'})
+  assert response.status_code == 400
+  assert response.json()['parameters']['details'] == "unknown field 'owner.name'"
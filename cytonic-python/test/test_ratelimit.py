@@ -0,0 +1,124 @@
+import asyncio
+import os
+import stat
+import sys
+import tempfile
+import time
+import typing as t
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from cytonic.contrib.fastapi import CytonicServiceRouter
+from cytonic.description import authentication, endpoint, rate_limit, service
+from cytonic.model import BasicAuth, NoAuth, OAuth2Bearer, RateLimitConfig, RateLimitKey
+from cytonic.runtime import Credentials
+from cytonic.runtime.ratelimit import MemoryRateLimiter, SharedMemoryRateLimiter, get_private_lock_dir, \
+  get_rate_limit_key, take_token
+
+
+def test_take_token():
+  config = RateLimitConfig(rate=2, burst=3)
+  assert take_token(3, 0, 0, config) == (2, 0)
+  assert take_token(0, 0, 0, config) == (0, 0.5)
+  assert take_token(0, 0, 1, config) == (1, 0)
+  assert take_token(1, 0, 100, config) == (2, 0)
+
+
+def test_rate_limit_config_capacity():
+  assert RateLimitConfig(rate=0.1).capacity == 1
+  assert RateLimitConfig(rate=2.5).capacity == 3
+  assert RateLimitConfig(rate=2.5, burst=10).capacity == 10
+  with pytest.raises(ValueError):
+    RateLimitConfig(rate=0)
+
+
+def test_get_rate_limit_key():
+  config = RateLimitConfig(rate=1)
+  token = Credentials.of_bearer_token(OAuth2Bearer(), 'secret')
+  assert get_rate_limit_key(config, token, '127.0.0.1').startswith('token:')
+  assert 'secret' not in get_rate_limit_key(config, token, '127.0.0.1')
+  assert get_rate_limit_key(config, Credentials.of_basic_auth(BasicAuth(), 'john', 'pw'), None) == 'user:john'
+  assert get_rate_limit_key(config, Credentials.empty(NoAuth()), '127.0.0.1') == 'ip:127.0.0.1'
+  assert get_rate_limit_key(RateLimitConfig(rate=1, key=RateLimitKey.ip), token, '127.0.0.1') == 'ip:127.0.0.1'
+
+
+def test_memory_rate_limiter(monkeypatch: pytest.MonkeyPatch):
+  async def _test() -> None:
+    now = 1000.0
+    monkeypatch.setattr(time, 'monotonic', lambda: now)
+    limiter = MemoryRateLimiter(max_keys=1)
+    config = RateLimitConfig(rate=1, burst=2)
+    assert [await limiter.acquire('a', config) for _ in range(3)] == [0, 0, 1]
+    assert await limiter.acquire('b', config) == 0
+    assert await limiter.acquire('a', config) == 0  # evicted
+    now += 1
+    assert await limiter.acquire('a', config) == 0
+
+  asyncio.run(_test())
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='requires fcntl')
+def test_shared_memory_rate_limiter(tmp_path: Path):
+  import fcntl
+
+  async def _test() -> None:
+    name = f'cytonic-test-{os.getpid()}'
+    first = SharedMemoryRateLimiter(name, slots=16, lock_dir=str(tmp_path))
+    second = SharedMemoryRateLimiter(name, slots=16, lock_dir=str(tmp_path))
+    try:
+      lock_path = tmp_path / f'{name}.lock'
+      assert stat.S_IMODE(lock_path.stat().st_mode) == 0o600
+      config = RateLimitConfig(rate=1, burst=2)
+      assert await first.acquire('a', config) == 0
+      assert await second.acquire('a', config) == 0
+      assert await first.acquire('a', config) > 0
+
+      # The lock is polled, so the event loop keeps running while another process holds it.
+      with open(lock_path, 'rb') as fp:
+        fcntl.flock(fp, fcntl.LOCK_EX)
+        task = asyncio.create_task(first.acquire('b', config))
+        await asyncio.sleep(0.01)
+        assert not task.done()
+        fcntl.flock(fp, fcntl.LOCK_UN)
+      assert await task == 0
+    finally:
+      first.close()
+      second.close()
+      first.unlink()
+
+  asyncio.run(_test())
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='requires os.getuid()')
+def test_private_lock_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+  monkeypatch.setattr(tempfile, 'tempdir', str(tmp_path))
+  path = get_private_lock_dir()
+  assert stat.S_IMODE(os.stat(path).st_mode) == 0o700
+  assert get_private_lock_dir() == path
+  os.chmod(path, 0o777)
+  with pytest.raises(PermissionError):
+    get_private_lock_dir()
+
+
+def test_router_rejects_requests_over_the_rate_limit():
+  @service('Items')
+  @authentication(OAuth2Bearer())
+  class Items:
+    @endpoint('GET /items')
+    @rate_limit(0.5, burst=2)
+    async def list_items(self, auth: Credentials) -> t.List[str]:
+      return []
+
+  app = FastAPI()
+  app.include_router(CytonicServiceRouter(Items()))
+  client = TestClient(app)
+  first, second = {'Authorization': 'Bearer first'}, {'Authorization': 'Bearer second'}
+  assert [client.get('/items', headers=first).status_code for _ in range(2)] == [200, 200]
+  response = client.get('/items', headers=first)
+  assert response.status_code == 429
+  assert response.json()['error_code'] == 'TOO_MANY_REQUESTS'
+  assert response.headers['Retry-After'] == '2'
+  assert client.get('/items', headers=second).status_code == 200
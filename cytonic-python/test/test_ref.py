@@ -0,0 +1,74 @@
+import dataclasses
+import typing as t
+
+import databind.json
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from cytonic.contrib.fastapi import CytonicServiceRouter
+from cytonic.description import endpoint, service
+from cytonic.runtime import Ref
+from cytonic.runtime.ref import get_ref_targets, ref_context
+
+
+@dataclasses.dataclass
+class User:
+  id: str
+  email: str
+
+
+@dataclasses.dataclass
+class TodoList:
+  id: str
+  owner: Ref[User]
+
+
+LISTS = [TodoList('0', Ref.of(User('1', 'john@example.org'))), TodoList('1', Ref.of(User('1', 'john@example.org')))]
+
+
+def test_ref_serializes_as_id():
+  assert get_ref_targets(t.List[TodoList]) == {'User'}
+  assert databind.json.dump(LISTS, t.List[TodoList]) == [{'id': '0', 'owner': '1'}, {'id': '1', 'owner': '1'}]
+  assert databind.json.load([{'id': '0', 'owner': '1'}], t.List[TodoList]) == [TodoList('0', Ref('1'))]
+
+
+def test_ref_expanded_inline():
+  with ref_context(expand=['User']):
+    data = databind.json.dump(LISTS, t.List[TodoList])
+  assert data[0] == {'id': '0', 'owner': {'id': '1', 'email': 'john@example.org'}}
+  assert databind.json.load(data, t.List[TodoList]) == LISTS
+
+
+def test_ref_expanded_into_table():
+  with ref_context(expand=['User'], table={}) as context:
+    data = databind.json.dump(LISTS, t.List[TodoList])
+  assert data == [{'id': '0', 'owner': '1'}, {'id': '1', 'owner': '1'}]
+  assert context.table == {'User': {'1': {'id': '1', 'email': 'john@example.org'}}}
+
+  with ref_context(table=context.table):
+    lists = databind.json.load(data, t.List[TodoList])
+  assert lists == LISTS
+  assert lists[0].owner.get() is lists[1].owner.get()
+
+
+def test_router_expands_references():
+  @service('TodoLists')
+  class TodoLists:
+    @endpoint('GET /lists')
+    async def get_lists(self) -> t.List[TodoList]:
+      return LISTS
+
+  app = FastAPI()
+  app.include_router(CytonicServiceRouter(TodoLists(), expand_parameter='expand'))
+  client = TestClient(app)
+  assert client.get('/lists').json() == [{'id': '0', 'owner': '1'}, {'id': '1', 'owner': '1'}]
+  assert client.get('/lists', params={'expand': 'User'}).json()[0] == \
+    {'id': '0', 'owner': {'id': '1', 'email': 'john@example.org'}}
+
+  response = client.get('/lists', params={'expand': 'User'}, headers={'Cytonic-Ref-Table': '1'})
+  assert response.headers['Cytonic-Ref-Table'] == '1'
+  assert response.json() == {
+    'value': [{'id': '0', 'owner': '1'}, {'id': '1', 'owner': '1'}],
+    'refs': {'User': {'1': {'id': '1', 'email': 'john@example.org'}}},
+  }
+  assert client.get('/lists', params={'expand': 'TodoList'}).status_code == 400
@@ -0,0 +1,135 @@
+import asyncio
+import dataclasses
+import json
+import typing as t
+
+import databind.json
+import msgpack
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from nr.util.safearg import Safe
+
+from cytonic.contrib.fastapi import CytonicServiceRouter
+from cytonic.description import endpoint, service, stream
+from cytonic.model import EndpointConfig, StreamConfig
+from cytonic.runtime import NotFoundError
+from cytonic.runtime.streaming import HEARTBEAT, JsonArraySplitter, NdjsonSplitter, aiter_values, get_stream_item_type, \
+  with_heartbeat
+
+
+def test_stream_config():
+  config = databind.json.load({'http': 'GET /events', 'return': 'string', 'stream': True}, EndpointConfig)
+  assert config.stream == StreamConfig()
+  with pytest.raises(ValueError):
+    EndpointConfig('GET /events', stream=StreamConfig())
+
+
+def test_get_stream_item_type():
+  assert get_stream_item_type(t.AsyncIterator[int]) is int
+  assert get_stream_item_type(t.Iterator[str]) is str
+  with pytest.raises(TypeError):
+    get_stream_item_type(t.List[int])
+
+
+def test_with_heartbeat():
+  requested = []
+
+  async def values() -> t.AsyncIterator[int]:
+    for i in range(3):
+      requested.append(i)
+      if i == 1:
+        await asyncio.sleep(0.05)
+      yield i
+
+  async def main() -> list[t.Any]:
+    result = []
+    async for value in with_heartbeat(aiter_values(values()), 0.02):
+      result.append(value)
+      if value is not HEARTBEAT:
+        # Values are only requested after the previous one was consumed.
+        assert requested[-1] == value
+    return result
+
+  result = asyncio.run(main())
+  assert [x for x in result if x is not HEARTBEAT] == [0, 1, 2]
+  assert HEARTBEAT in result
+
+
+def test_json_array_splitter():
+  data = b' [{"a": "x,]\\" y", "b": [1, 2]}, 2, "s\\\\", [[]], null] '
+  for chunk_size in (1, 3, len(data)):
+    splitter = JsonArraySplitter(100)
+    elements = []
+    for i in range(0, len(data), chunk_size):
+      elements += splitter.feed(data[i:i + chunk_size])
+    elements += splitter.close()
+    assert [json.loads(x) for x in elements] == json.loads(data)
+
+  for bad in (b'[1,,2]', b'[1,]', b'{}', b'[1] x', b'[1', b'[123456]'):
+    with pytest.raises(ValueError):
+      splitter = JsonArraySplitter(5)
+      splitter.feed(bad)
+      splitter.close()
+
+
+def test_ndjson_splitter():
+  splitter = NdjsonSplitter(10)
+  assert splitter.feed(b'{"a":1}\n\n{"b"') == [b'{"a":1}']
+  assert splitter.feed(b':2}\n3') == [b'{"b":2}']
+  assert splitter.close() == [b'3']
+  with pytest.raises(ValueError):
+    splitter.feed(b'{"too": "long"}\n')
+
+
+@dataclasses.dataclass
+class Point:
+  x: int
+  y: int
+
+
+def test_router_decodes_stream_body():
+  @service('Points')
+  class Points:
+    @endpoint('POST /points')
+    async def add_points(self, points: t.AsyncIterator[Point]) -> int:
+      return sum([point.x * point.y async for point in points])
+
+  app = FastAPI()
+  app.include_router(CytonicServiceRouter(Points(), max_stream_element_size=32))
+  client = TestClient(app)
+  points = [{'x': 1, 'y': 2}, {'x': 3, 'y': 4}]
+
+  response = client.post('/points', content=json.dumps(points), headers={'Content-Type': 'application/json'})
+  assert response.json() == 14
+  ndjson = ''.join(json.dumps(point) + '\n' for point in points)
+  response = client.post('/points', content=ndjson, headers={'Content-Type': 'application/x-ndjson'})
+  assert response.json() == 14
+  response = client.post('/points', content=msgpack.packb(points), headers={'Content-Type': 'application/msgpack'})
+  assert response.json() == 14
+
+  response = client.post('/points', json=[{'x': 1, 'y': 2, 'z': 'x' * 32}])
+  assert response.status_code == 400
+
+
+def test_router_sends_heartbeats_and_errors_as_events():
+  @service('Events')
+  class Events:
+    @endpoint('GET /events')
+    @stream(heartbeat=0.01)
+    async def watch_events(self) -> t.AsyncIterator[str]:
+      yield 'a'
+      await asyncio.sleep(0.05)
+      yield 'b'
+      raise NotFoundError(Safe('no more events'))
+
+  app = FastAPI()
+  app.include_router(CytonicServiceRouter(Events()))
+  response = TestClient(app).get('/events')
+  assert response.headers['Content-Type'].startswith('text/event-stream')
+  events = [event for event in response.text.split('\n\n') if event]
+  assert events[0] == 'data: "a"'
+  assert ': heartbeat' in events[1:-2]
+  assert events[-2] == 'data: "b"'
+  event, _, data = events[-1].partition('\n')
+  assert event == 'event: error' and json.loads(data[len('data: '):])['error_code'] == 'NOT_FOUND'
@@ -0,0 +1,67 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from nr.util.safearg import Safe
+
+from cytonic.contrib.fastapi import CytonicServiceRouter
+from cytonic.description import endpoint, service
+from cytonic.runtime import NotFoundError
+from cytonic.runtime.tracing import NoopTracer, SpanData, W3CTracer
+
+TRACE_ID = '4bf92f3577b34da6a3ce929d0e0e4736'
+PARENT_ID = '00f067aa0ba902b7'
+
+
+def test_w3c_tracer_nests_spans_and_propagates_the_trace():
+  spans: list[SpanData] = []
+  tracer = W3CTracer(spans.append)
+  with tracer.span('request', headers={'traceparent': f'00-{TRACE_ID}-{PARENT_ID}-01'}) as root:
+    with tracer.span('child', {'a': 1}):
+      headers: dict[str, str] = {}
+      tracer.inject(headers)
+  child, _ = spans
+  assert [s.name for s in spans] == ['child', 'request']
+  assert (root.trace_id, root.parent_id) == (TRACE_ID, PARENT_ID)  # type: ignore[attr-defined]
+  assert (child.trace_id, child.parent_id) == (TRACE_ID, root.span_id)  # type: ignore[attr-defined]
+  assert child.attributes == {'a': 1} and child.duration is not None
+  assert headers == {'traceparent': f'00-{TRACE_ID}-{child.span_id}-01'}
+
+  with tracer.span('request', headers={'traceparent': 'invalid'}):
+    pass
+  assert spans[-1].parent_id is None and spans[-1].trace_id != TRACE_ID
+
+
+def test_noop_tracer():
+  tracer = NoopTracer()
+  with tracer.span('a') as span:
+    span.set_attribute('a', 1)
+    assert not span.is_recording()
+  headers: dict[str, str] = {}
+  tracer.inject(headers)
+  assert headers == {}
+
+
+def test_router_traces_dispatch_phases():
+  @service('Items')
+  class Items:
+    @endpoint('POST /items/{item_id}')
+    async def set_item(self, item_id: str, value: str) -> str:
+      if item_id == 'unknown':
+        raise NotFoundError(Safe('item not found'))
+      return value
+
+  spans: list[SpanData] = []
+  app = FastAPI()
+  app.include_router(CytonicServiceRouter(Items(), tracer=W3CTracer(spans.append)))
+  client = TestClient(app)
+
+  assert client.post('/items/a', json='x', headers={'traceparent': f'00-{TRACE_ID}-{PARENT_ID}-01'}).json() == 'x'
+  *children, root = spans
+  assert [s.name for s in children] == ['auth', 'decode', 'handler', 'encode']
+  assert all(s.parent_id == root.span_id and s.trace_id == TRACE_ID for s in children)
+  assert root.name == 'set_item' and root.parent_id == PARENT_ID
+  assert root.attributes['http.route'] == '/items/{item_id}' and root.attributes['http.status_code'] == 200
+
+  spans.clear()
+  assert client.post('/items/unknown', json='x').status_code == 404
+  assert [s.name for s in spans] == ['auth', 'decode', 'handler', 'error', 'set_item']
+  assert 'NotFoundError' in spans[3].exceptions[0] and spans[2].exceptions
@@ -1,43 +1,200 @@
 
 import axios, { Axios, AxiosRequestConfig, AxiosResponse, Method } from "axios";
 import { Credentials } from "./auth";
+import { Encoding, JsonEncoding, findEncoding } from "./encoding";
 import { deserializeError, ServiceException } from "./errors";
 import { Service, Endpoint, ParamKind, Authentication } from "./endpoint";
-import { Locator } from "./types";
+import { BytesType, Locator, RefTable } from "./types";
 
 
 export interface ClientConfig {
   baseURL: string;
   timeout?: number;
   userAgent?: string;
+
+  /**
+   * The encoding for request bodies and the preferred encoding for responses. The server falls back to JSON if
+   * it does not support the encoding. Defaults to JSON.
+   */
+  encoding?: Encoding;
+
+  /**
+   * Names of the types to expand references to in responses, passed in the `expand` query parameter. Requires
+   * that the server router is configured with `expand_parameter='expand'`.
+   */
+  expand?: string[];
+
+  /**
+   * Ask the server to send expanded references in a side table, such that objects that are referenced many
+   * times are only transferred once.
+   */
+  refTable?: boolean;
+
+  /**
+   * Adds the headers that propagate the current trace to the headers of every request, such that the spans of
+   * the server continue the trace of the caller. For example with OpenTelemetry:
+   * `headers => propagation.inject(context.active(), headers)`.
+   */
+  propagateTrace?: (headers: {[_: string]: string}) => void;
 }
 
 
 export class CytonicClient {
 
   private axios: Axios;
+  private encoding: Encoding;
 
-  public constructor(private service: Service, config: ClientConfig) {
+  public constructor(private service: Service, private config: ClientConfig) {
+    this.encoding = config.encoding || new JsonEncoding();
     this.axios = axios.create({
       baseURL: config.baseURL,
       timeout: config.timeout,
       httpAgent: config.userAgent,
       httpsAgent: config.userAgent,
+      // Payloads are encoded and decoded by the configured Encoding instead of by Axios.
+      responseType: 'arraybuffer',
+      transformRequest: [(data) => data],
+      transformResponse: [(data) => data],
     });
   }
 
   public async request(endpointName: string, args: {[_: string]: any}): Promise<any> {
+    const endpoint = this.getEndpoint(endpointName);
+    const request = this.buildRequest(endpointName, endpoint, args);
+    request.headers!['Accept'] = this.encoding.binary ? `${this.encoding.mediaType}, application/json;q=0.5` : this.encoding.mediaType;
+
+    try {
+      const response = await this.axios.request(request);
+      if (endpoint.return instanceof BytesType) {
+        return new Uint8Array(response.data);
+      }
+      let data = this.decodeResponse(response);
+      let refs: RefTable | undefined = undefined;
+      if (response.headers['cytonic-ref-table']) {
+        refs = data.refs;
+        data = data.value;
+      }
+      return endpoint.return ? endpoint.return.extract(new Locator([endpointName, 'response'], refs), data) : null;
+    }
+    catch (exc) {
+      const errorResponse = (exc as any).response;
+      if (errorResponse !== undefined) {
+        throwServiceException(this.decodeResponse(errorResponse));
+      }
+      throw exc;
+    }
+  }
+
+  /**
+   * Requests a streaming endpoint, which is served as Server-Sent Events, and returns an iterator over the
+   * values sent by the server. Requires the Fetch API with streaming response bodies. Values are read from the
+   * connection only as fast as the iterator is consumed. Breaking out of the iteration closes the connection.
+   */
+  public stream(endpointName: string, args: {[_: string]: any}): AsyncIterableIterator<any> {
+    const endpoint = this.getEndpoint(endpointName);
+    const request = this.buildRequest(endpointName, endpoint, args);
+    request.headers!['Accept'] = 'text/event-stream';
+    const params = new URLSearchParams();
+    Object.entries(request.params).forEach(([key, value]) => {
+      if (value !== undefined && value !== null) {
+        params.append(key, '' + value);
+      }
+    });
+    const query = params.toString();
+    const url = this.config.baseURL.replace(/\/$/, '') + request.url + (query ? '?' + query : '');
+    const controller = new AbortController();
+    const reader = fetch(url, {
+      method: request.method,
+      headers: request.headers as {[_: string]: string},
+      body: request.data,
+      signal: controller.signal,
+    }).then(async response => {
+      if (!response.ok) {
+        // The server falls back to JSON for errors because the request only accepts an event stream.
+        const text = await response.text();
+        throwServiceException(text ? JSON.parse(text) : undefined);
+        throw new Error(`unexpected status code ${response.status} for ${endpointName}`);
+      }
+      return response.body!.getReader();
+    });
+
+    const decoder = new TextDecoder();
+    const events = new ServerSentEvents();
+    let done = false;
+    const readEvent = (): Promise<IteratorResult<any>> => {
+      const event = events.next();
+      if (event !== undefined) {
+        if (event.type === 'error') {
+          done = true;
+          controller.abort();
+          throwServiceException(JSON.parse(event.data));
+        }
+        let data = JSON.parse(event.data);
+        let refs: RefTable | undefined = undefined;
+        if (this.config.refTable && this.config.expand && this.config.expand.length > 0) {
+          refs = data.refs;
+          data = data.value;
+        }
+        return Promise.resolve({ done: false, value: endpoint.return!.extract(new Locator([endpointName, 'response'], refs), data) });
+      }
+      if (done) {
+        return Promise.resolve({ done: true, value: undefined });
+      }
+      return reader.then(r => r.read()).then(chunk => {
+        if (chunk.done) {
+          done = true;
+          events.feed('\n\n');
+        }
+        else {
+          events.feed(decoder.decode(chunk.value, { stream: true }));
+        }
+        return readEvent();
+      });
+    };
+
+    const iterator: AsyncIterableIterator<any> = {
+      next(): Promise<IteratorResult<any>> {
+        // Turns errors thrown by readEvent() synchronously into a rejected promise.
+        return new Promise(resolve => resolve(readEvent()));
+      },
+      return(): Promise<IteratorResult<any>> {
+        done = true;
+        controller.abort();
+        return Promise.resolve({ done: true, value: undefined });
+      },
+      [Symbol.asyncIterator]() {
+        return iterator;
+      },
+    };
+    return iterator;
+  }
+
+  private getEndpoint(endpointName: string): Endpoint {
     const endpoint = this.service.endpoints[endpointName];
     if (endpoint === undefined) {
       throw new Error(`no such endpoint ${endpointName}`);
     }
+    return endpoint;
+  }
 
+  private buildRequest(endpointName: string, endpoint: Endpoint, args: {[_: string]: any}): AxiosRequestConfig<any> {
     const request: AxiosRequestConfig<any> = {
       method: endpoint.method as Method,
       headers: {},
       params: {},
     };
 
+    if (this.config.expand && this.config.expand.length > 0) {
+      request.params.expand = this.config.expand.join(',');
+      if (this.config.refTable) {
+        request.headers!['Cytonic-Ref-Table'] = '1';
+      }
+    }
+
+    if (this.config.propagateTrace) {
+      this.config.propagateTrace(request.headers as {[_: string]: string});
+    }
+
     if (this.service.auth || endpoint.auth) {
       this.handleAuthArg(request, endpoint.auth, args.auth as Credentials);
     }
@@ -45,12 +202,19 @@ export class CytonicClient {
 
     const pathArgs: {[_: string]: any} = {};
     Object.entries(endpoint.args || {}).forEach(([argName, arg]) => {
+      if (arg.kind === ParamKind.body && arg.type instanceof BytesType) {
+        // Binary bodies are sent as they are.
+        request.data = args[argName];
+        request.headers!['Content-Type'] = 'application/octet-stream';
+        return;
+      }
       const serializedValue = arg.type.compose(new Locator([endpointName, argName]), args[argName]);
       switch (arg.kind) {
         case ParamKind.auth:
           throw new Error('auth args are not usually defined in the endpoint args list ...');
         case ParamKind.body:
-          request.data = serializedValue;
+          request.data = this.encoding.encode(serializedValue);
+          request.headers!['Content-Type'] = this.encoding.mediaType;
           break;
         case ParamKind.cookie:
           throw new Error('cookie arguments are not currently supported');
@@ -70,22 +234,11 @@ export class CytonicClient {
 
     // Render the path.
     request.url = renderPath(endpoint.path, pathArgs);
+    return request;
+  }
 
-    try {
-      const response = await this.axios.request(request);
-      return endpoint.return ? endpoint.return.extract(new Locator([endpointName, 'response']), response.data) : null;
-    }
-    catch (exc) {
-      const errorResponseData = (exc as any).response.data;
-      if (errorResponseData !== undefined && 'error_code' in errorResponseData) {
-        throw deserializeError(
-          errorResponseData['error_code'],
-          errorResponseData['error_name'],
-          errorResponseData['parameters'] || {}
-        );
-      }
-      throw exc;
-    }
+  private decodeResponse(response: AxiosResponse): any {
+    return findEncoding(response.headers['content-type'], [this.encoding]).decode(response.data);
   }
 
   private handleAuthArg(request: AxiosRequestConfig<any>, endpointAuth: Authentication | undefined, cred: Credentials): void {
@@ -111,6 +264,61 @@ export class CytonicClient {
 }
 
 
+/**
+ * Throws the `ServiceException` described by an error payload, if it is one.
+ */
+function throwServiceException(data: any): void {
+  if (data instanceof Object && 'error_code' in data) {
+    throw deserializeError(data['error_code'], data['error_name'], data['parameters'] || {});
+  }
+}
+
+
+/**
+ * An incremental parser for the `text/event-stream` format.
+ */
+export class ServerSentEvents {
+
+  private buffer = '';
+  private type = 'message';
+  private data: string[] = [];
+  private events: {type: string, data: string}[] = [];
+
+  public feed(text: string): void {
+    this.buffer += text;
+    const lines = this.buffer.split(/\r\n|\r|\n/);
+    this.buffer = lines.pop()!;
+    lines.forEach(line => {
+      if (line === '') {
+        if (this.data.length > 0) {
+          this.events.push({ type: this.type, data: this.data.join('\n') });
+        }
+        this.type = 'message';
+        this.data = [];
+        return;
+      }
+      if (line.startsWith(':')) {
+        return;  // Comments are used as heartbeats.
+      }
+      const index = line.indexOf(':');
+      const field = index < 0 ? line : line.substring(0, index);
+      const value = index < 0 ? '' : line.substring(index + 1).replace(/^ /, '');
+      if (field === 'event') {
+        this.type = value;
+      }
+      else if (field === 'data') {
+        this.data.push(value);
+      }
+    });
+  }
+
+  public next(): {type: string, data: string} | undefined {
+    return this.events.shift();
+  }
+
+}
+
+
 export function renderPath(template: string, args: {[_: string]: any}): string {
   Object.entries(args).forEach(([argName, arg]) => {
     if (arg instanceof Object) {
@@ -125,7 +333,7 @@ export function renderPath(template: string, args: {[_: string]: any}): string {
 export function createAsyncClient<T>(service: Service, config: ClientConfig): T {
   const client = new CytonicClient(service, config);
   const createEndpointFunction = (endpointName: string, endpoint: Endpoint) => {
-    function handler(): Promise<any> {
+    function handler(): Promise<any> | AsyncIterableIterator<any> {
       let expectedArgCount = endpoint.args === undefined ? 0 : Object.entries(endpoint.args).length;
       if (service.auth || endpoint.auth) expectedArgCount++;
       if (arguments.length !== expectedArgCount) {
@@ -140,7 +348,7 @@ export function createAsyncClient<T>(service: Service, config: ClientConfig): T
       (endpoint.args_ordering || []).forEach(argName => {
         args[argName] = callArgs[idx++];
       });
-      return client.request(endpointName, args);
+      return endpoint.stream ? client.stream(endpointName, args) : client.request(endpointName, args);
     };
     return handler;
   };
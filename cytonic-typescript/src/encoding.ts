@@ -0,0 +1,72 @@
+/**
+ * A wire encoding for request and response payloads. Encodings only convert the plain structures produced by
+ * the type descriptors to bytes and back, so the type-driven rules are the same for every encoding.
+ */
+export interface Encoding {
+  mediaType: string;
+  binary: boolean;
+  encode(value: any): any;
+  decode(data: any): any;
+}
+
+
+export class JsonEncoding implements Encoding {
+
+  public mediaType = 'application/json';
+  public binary = false;
+
+  public encode(value: any): any {
+    return JSON.stringify(value);
+  }
+
+  public decode(data: any): any {
+    if (typeof data !== 'string') {
+      data = new TextDecoder('utf-8').decode(data);
+    }
+    return data === '' ? null : JSON.parse(data);
+  }
+}
+
+
+/**
+ * Functions of a MessagePack or CBOR implementation, e.g. the `encode` and `decode` functions exported by the
+ * `@msgpack/msgpack` or `cbor-x` packages. These are passed in to avoid a hard dependency on either package.
+ */
+export interface Codec {
+  encode(value: any): Uint8Array;
+  decode(data: Uint8Array): any;
+}
+
+
+export class BinaryEncoding implements Encoding {
+
+  public binary = true;
+
+  public constructor(public mediaType: string, private codec: Codec) {}
+
+  public encode(value: any): any {
+    return this.codec.encode(value);
+  }
+
+  public decode(data: any): any {
+    return this.codec.decode(new Uint8Array(data));
+  }
+
+  public static msgpack(codec: Codec): BinaryEncoding {
+    return new BinaryEncoding('application/msgpack', codec);
+  }
+
+  public static cbor(codec: Codec): BinaryEncoding {
+    return new BinaryEncoding('application/cbor', codec);
+  }
+}
+
+
+/**
+ * Returns the encoding from *encodings* that matches the media type of a `Content-Type` header, falling back to
+ * JSON for responses of servers that do not support the requested encoding.
+ */
+export function findEncoding(contentType: string | undefined, encodings: Encoding[]): Encoding {
+  const mediaType = (contentType || '').split(';')[0].trim().toLowerCase();
+  return encodings.find(e => e.mediaType === mediaType) || new JsonEncoding();
+}
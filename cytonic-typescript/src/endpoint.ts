@@ -42,6 +42,7 @@ export interface Endpoint {
   args?: {[_: string]: Argument},
   args_ordering?: string[],
   return?: TypeDescriptor,
+  stream?: boolean,
 }
 
 
@@ -25,6 +25,11 @@ export class IllegalArgumentError extends ServiceException {
   error_name = 'Default:IllegalArgument';
 }
 
+export class TooManyRequestsError extends ServiceException {
+  error_code = 'TOO_MANY_REQUESTS';
+  error_name = 'Default:TooManyRequests';
+}
+
 export type Parameters = {[key: string]: any};
 export type ErrorFactory = (params: Parameters) => ServiceException;
 export type ErrorMapping = {[code: string]: ErrorFactory};
@@ -34,6 +39,7 @@ export const ERROR_MAPPING: ErrorMapping = {
   'NOT_FOUND': (p) => new NotFoundError(p),
   'CONFLICT': (p) => new ConflictError(p),
   'ILLEGAL_ARGUMENT': (p) => new IllegalArgumentError(p),
+  'TOO_MANY_REQUESTS': (p) => new TooManyRequestsError(p),
 }
 
 export function deserializeError(errorCode: string, errorName: string, parameters: Parameters): ServiceException {
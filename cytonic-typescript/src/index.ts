@@ -1,9 +1,12 @@
 
 export { BasicAuth, BearerToken, Credentials } from "./auth";
-export { ConflictError, IllegalArgumentError, NotFoundError, ServiceException, UnauthorizedError } from "./errors";
+export { ConflictError, IllegalArgumentError, NotFoundError, ServiceException, TooManyRequestsError, UnauthorizedError } from "./errors";
 export { ParamKind, Endpoint, Service } from "./endpoint";
-export { StringType, IntegerType, DoubleType, DecimalType, BooleanType, DatetimeType, ListType, SetType, MapType, OptionalType, StructField, StructType } from "./types"
-export { ClientConfig, createAsyncClient } from "./client";
+export { StringType, IntegerType, DoubleType, DecimalType, BooleanType, BytesType, BinaryType, DatetimeType, DoubleArrayType, IntegerArrayType, ListType, StreamType, SetType, MapType, OptionalType, Page, PageType, Ref, RefTable, RefType, StructField, StructType } from "./types"
+export { ClientConfig, ServerSentEvents, createAsyncClient } from "./client";
+export { BinaryEncoding, Codec, Encoding, JsonEncoding } from "./encoding";
+export { BatchFunction, DataLoader, DataLoaderOptions } from "./loader";
+export { PageFetcher, PaginationOptions, iterateItems, iteratePages } from "./pagination";
 export { Decimal } from "decimal.js";
 export { Moment } from "moment";
 
@@ -0,0 +1,134 @@
+/**
+ * Fetches the values for a list of unique keys at once, usually a closure around a bulk endpoint of a client, e.g.
+ * `ids => client.get_users(auth, ids)`. Returns either the values in the same order as the keys, or a `Map` of the
+ * keys to their values.
+ */
+export type BatchFunction<K, V> = (keys: K[]) => Promise<V[] | Map<K, V>>;
+
+
+export interface DataLoaderOptions {
+  /**
+   * The maximum number of keys to pass to the batch function at once.
+   */
+  maxBatchSize?: number;
+
+  /**
+   * Cache the values by key, such that every key is fetched only once. Enabled by default.
+   */
+  cache?: boolean;
+}
+
+
+interface PendingLoad<K, V> {
+  key: K;
+  resolve: (value: V) => void;
+  reject: (error: any) => void;
+}
+
+
+/**
+ * Coalesces the keys that are loaded in the same tick into one call to the batch function, to avoid making one
+ * request per object when resolving related objects.
+ */
+export class DataLoader<K, V> {
+  private cache = new Map<K, Promise<V>>();
+  private queue: PendingLoad<K, V>[] = [];
+
+  public constructor(private batchFn: BatchFunction<K, V>, private options: DataLoaderOptions = {}) { }
+
+  /**
+   * Loads the value for a key. Rejects with an `Error` if the batch function did not return a value for the key.
+   */
+  public load(key: K): Promise<V> {
+    const cached = this.cache.get(key);
+    if (cached !== undefined) {
+      return cached;
+    }
+    const promise = new Promise<V>((resolve, reject) => {
+      if (this.queue.length === 0) {
+        Promise.resolve().then(() => this.dispatch());
+      }
+      this.queue.push({ key, resolve, reject });
+    });
+    if (this.options.cache !== false) {
+      this.cache.set(key, promise);
+    }
+    return promise;
+  }
+
+  /**
+   * Loads the values for multiple keys in one batch.
+   */
+  public loadMany(keys: K[]): Promise<V[]> {
+    return Promise.all(keys.map(key => this.load(key)));
+  }
+
+  /**
+   * Removes a key from the cache, e.g. after the value was modified.
+   */
+  public clear(key: K): void {
+    this.cache.delete(key);
+  }
+
+  /**
+   * Empties the cache.
+   */
+  public clearAll(): void {
+    this.cache.clear();
+  }
+
+  private dispatch(): void {
+    const queue = this.queue;
+    this.queue = [];
+    const batchSize = this.options.maxBatchSize || queue.length;
+    for (let offset = 0; offset < queue.length; offset += batchSize) {
+      this.loadBatch(queue.slice(offset, offset + batchSize));
+    }
+  }
+
+  private loadBatch(batch: PendingLoad<K, V>[]): void {
+    const keys: K[] = [];
+    batch.forEach(load => {
+      if (keys.indexOf(load.key) < 0) {
+        keys.push(load.key);
+      }
+    });
+
+    const fail = (error: any) => batch.forEach(load => {
+      this.cache.delete(load.key);
+      load.reject(error);
+    });
+
+    let result: Promise<V[] | Map<K, V>>;
+    try {
+      result = this.batchFn(keys);
+    }
+    catch (error) {
+      fail(error);
+      return;
+    }
+
+    result.then(values => {
+      let map: Map<K, V>;
+      if (values instanceof Map) {
+        map = values;
+      }
+      else if (values.length !== keys.length) {
+        throw new Error(`batch function returned ${values.length} values for ${keys.length} keys`);
+      }
+      else {
+        map = new Map<K, V>();
+        keys.forEach((key, index) => map.set(key, values[index]));
+      }
+      batch.forEach(load => {
+        if (map.has(load.key)) {
+          load.resolve(map.get(load.key)!);
+        }
+        else {
+          this.cache.delete(load.key);
+          load.reject(new Error(`batch function returned no value for key ${load.key}`));
+        }
+      });
+    }).catch(fail);
+  }
+}
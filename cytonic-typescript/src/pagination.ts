@@ -0,0 +1,99 @@
+import { Page } from "./types";
+
+
+/**
+ * Fetches the page that starts at the given cursor, or the first page if the cursor is undefined. This is usually
+ * a closure around a paginated endpoint of a client, e.g. `cursor => client.get_items(auth, listId, cursor)`.
+ */
+export type PageFetcher<T> = (cursor?: string) => Promise<Page<T>>;
+
+
+export interface PaginationOptions {
+  /**
+   * Request the next page while the current one is being processed.
+   */
+  prefetch?: boolean;
+}
+
+
+/**
+ * Iterates over all pages of a paginated endpoint.
+ */
+export function iteratePages<T>(fetch: PageFetcher<T>, options?: PaginationOptions): AsyncIterableIterator<Page<T>> {
+  const prefetch = !!(options && options.prefetch);
+  let cursor: string | undefined = undefined;
+  let prefetched: Promise<Page<T>> | undefined = undefined;
+  let done = false;
+
+  const iterator: AsyncIterableIterator<Page<T>> = {
+    next(): Promise<IteratorResult<Page<T>>> {
+      if (done) {
+        return Promise.resolve({ done: true, value: undefined });
+      }
+      const current = prefetched || fetch(cursor);
+      prefetched = undefined;
+      return current.then(page => {
+        if (page.next_cursor === undefined || page.next_cursor === null) {
+          done = true;
+        }
+        else {
+          cursor = page.next_cursor;
+          if (prefetch) {
+            prefetched = fetch(cursor);
+            // Errors are reported by the call to next() that consumes the prefetched page.
+            prefetched.catch(() => undefined);
+          }
+        }
+        return { done: false, value: page };
+      }, error => {
+        done = true;
+        throw error;
+      });
+    },
+    return(): Promise<IteratorResult<Page<T>>> {
+      done = true;
+      prefetched = undefined;
+      return Promise.resolve({ done: true, value: undefined });
+    },
+    [Symbol.asyncIterator]() {
+      return iterator;
+    },
+  };
+
+  return iterator;
+}
+
+
+/**
+ * Iterates over the items of all pages of a paginated endpoint. See `iteratePages()`.
+ */
+export function iterateItems<T>(fetch: PageFetcher<T>, options?: PaginationOptions): AsyncIterableIterator<T> {
+  const pages = iteratePages(fetch, options);
+  let items: T[] = [];
+  let index = 0;
+
+  const iterator: AsyncIterableIterator<T> = {
+    next(): Promise<IteratorResult<T>> {
+      if (index < items.length) {
+        return Promise.resolve({ done: false, value: items[index++] });
+      }
+      return pages.next().then(result => {
+        if (result.done) {
+          return { done: true, value: undefined };
+        }
+        items = result.value.items;
+        index = 0;
+        return iterator.next();
+      });
+    },
+    return(): Promise<IteratorResult<T>> {
+      items = [];
+      return pages.return!().then(() => ({ done: true, value: undefined }));
+    },
+    [Symbol.asyncIterator]() {
+      return iterator;
+    },
+  };
+
+  return iterator;
+}
@@ -2,11 +2,17 @@ import { Decimal as _Decimal } from "decimal.js";
 import moment from "moment";
 
 
+/**
+ * Objects that were expanded into the side table of a response, keyed by type name and ID.
+ */
+export type RefTable = {[typeName: string]: {[id: string]: any}};
+
+
 export class Locator {
-  public constructor(public path: (string | number)[]) {}
+  public constructor(public path: (string | number)[], public refs?: RefTable) {}
 
   public push(value: string | number): Locator {
-    return new Locator([...this.path, value]);
+    return new Locator([...this.path, value], this.refs);
   }
 
   public error(message: string): Error {
@@ -157,6 +163,132 @@ export class DatetimeType implements TypeDescriptor {
 }
 
 
+/**
+ * Binary data, represented as a base64 encoded string inside JSON payloads. If it is the body argument or return
+ * type of an endpoint, it is transferred as the raw request or response body instead.
+ */
+export class BytesType implements TypeDescriptor {
+
+  public name = 'bytes';
+
+  public extract(locator: Locator, value: any): Uint8Array {
+    if (value instanceof Uint8Array) {
+      return value;
+    }
+    if (value instanceof ArrayBuffer) {
+      return new Uint8Array(value);
+    }
+    if (typeof value !== 'string') {
+      throw locator.error(`expected type "string" for ${this.name}, got "${typeof value}"`);
+    }
+    const decoded = atob(value);
+    const result = new Uint8Array(decoded.length);
+    for (let i = 0; i < decoded.length; i++) {
+      result[i] = decoded.charCodeAt(i);
+    }
+    return result;
+  }
+
+  public compose(locator: Locator, value: any): string {
+    if (!(value instanceof Uint8Array)) {
+      throw locator.error(`expected a Uint8Array for ${this.name}, got "${typeof value}"`);
+    }
+    let decoded = '';
+    for (let i = 0; i < value.length; i++) {
+      decoded += String.fromCharCode(value[i]);
+    }
+    return btoa(decoded);
+  }
+
+  public toString(): string {
+    return this.name;
+  }
+}
+
+
+/**
+ * Binary data that can only be the body argument or the return type of an endpoint, see `BytesType`.
+ */
+export class BinaryType extends BytesType {
+
+  public name = 'binary';
+
+}
+
+
+/**
+ * Describes `array[double]`, represented as a `Float64Array`. The array is sent as a list of numbers in JSON and
+ * received either as a list or as a buffer of packed little-endian values from binary encodings.
+ */
+export class DoubleArrayType implements TypeDescriptor {
+
+  public name = 'array[double]';
+
+  public extract(locator: Locator, value: any): Float64Array {
+    if (value instanceof Float64Array) {
+      return value;
+    }
+    if (value instanceof Uint8Array) {
+      if (value.byteLength % 8 !== 0) {
+        throw locator.error(`expected a multiple of 8 bytes for ${this.name}, got ${value.byteLength}`);
+      }
+      const view = new DataView(value.buffer, value.byteOffset, value.byteLength);
+      const result = new Float64Array(value.byteLength / 8);
+      for (let i = 0; i < result.length; i++) {
+        result[i] = view.getFloat64(i * 8, true);
+      }
+      return result;
+    }
+    if (!Array.isArray(value)) {
+      throw locator.error(`expected type "array" for ${this.name}, got "${typeof value}"`);
+    }
+    return Float64Array.from(value);
+  }
+
+  public compose(locator: Locator, value: any): number[] {
+    if (!(value instanceof Float64Array) && !Array.isArray(value)) {
+      throw locator.error(`expected a Float64Array for ${this.name}, got "${typeof value}"`);
+    }
+    return Array.from(value as ArrayLike<number>);
+  }
+
+  public toString(): string {
+    return this.name;
+  }
+}
+
+
+/**
+ * Describes `array[integer]`, represented as a `Float64Array` because the 64-bit integers are converted to
+ * numbers. Packed values outside of the range of safe integers (`Number.MAX_SAFE_INTEGER`) are rejected because
+ * they cannot be represented exactly.
+ */
+export class IntegerArrayType extends DoubleArrayType {
+
+  public name = 'array[integer]';
+
+  public extract(locator: Locator, value: any): Float64Array {
+    if (!(value instanceof Uint8Array)) {
+      return super.extract(locator, value);
+    }
+    if (value.byteLength % 8 !== 0) {
+      throw locator.error(`expected a multiple of 8 bytes for ${this.name}, got ${value.byteLength}`);
+    }
+    const view = new DataView(value.buffer, value.byteOffset, value.byteLength);
+    const result = new Float64Array(value.byteLength / 8);
+    for (let i = 0; i < result.length; i++) {
+      const item = view.getInt32(i * 8 + 4, true) * 0x100000000 + view.getUint32(i * 8, true);
+      if (item > Number.MAX_SAFE_INTEGER || item < -Number.MAX_SAFE_INTEGER) {
+        throw locator.push(i).error(`${this.name} item is outside of the range of safe integers`);
+      }
+      result[i] = item;
+    }
+    return result;
+  }
+
+}
+
+
 export class ListType implements TypeDescriptor {
 
   public name = 'list';
@@ -183,6 +315,36 @@ export class ListType implements TypeDescriptor {
 }
 
 
+/**
+ * Describes a `stream[T]` body argument. The client sends the items of any iterable as an array, which the server
+ * parses incrementally.
+ */
+export class StreamType implements TypeDescriptor {
+
+  public name = 'stream';
+
+  public constructor(public itemType: TypeDescriptor) {}
+
+  public extract(locator: Locator, value: any) {
+    if (!Array.isArray(value)) {
+      throw locator.error(`expected type "array" for stream, got "${typeof value}"`);
+    }
+    return value.map((v, i) => this.itemType.extract(locator.push(i), v));
+  }
+
+  public compose(locator: Locator, value: any) {
+    if (value === null || value === undefined || typeof value[Symbol.iterator] !== 'function') {
+      throw locator.error(`expected an iterable for stream, got "${typeof value}"`);
+    }
+    return Array.from(value as Iterable<any>).map((v, i) => this.itemType.compose(locator.push(i), v));
+  }
+
+  public toString(): string {
+    return `${this.name}<${this.itemType.toString()}>`;
+  }
+}
+
+
 export class SetType implements TypeDescriptor {
 
   public name = 'set';
@@ -305,3 +467,84 @@ export class StructType<T> implements TypeDescriptor {
   }
 
 }
+
+
+/**
+ * A reference to a struct, identified by its `id` field. The referenced object is available as `value` if it was
+ * expanded by the server.
+ */
+export interface Ref<T> {
+  id: any;
+  value?: T;
+}
+
+
+export class RefType<T> implements TypeDescriptor {
+
+  public name = 'ref';
+
+  public constructor(public targetType: StructType<T>) {}
+
+  public extract(locator: Locator, value: any): Ref<T> {
+    if (value instanceof Object) {
+      const target = this.targetType.extract(locator, value);
+      return { id: (target as any).id, value: target };
+    }
+    const expanded = locator.refs && (locator.refs[this.targetType.name] || {})[String(value)];
+    if (expanded !== undefined) {
+      return { id: value, value: this.targetType.extract(locator, expanded) };
+    }
+    return { id: value };
+  }
+
+  public compose(locator: Locator, value: Ref<T>): any {
+    return value.id;
+  }
+
+  public toString(): string {
+    return `${this.name}<${this.targetType.name}>`;
+  }
+}
+
+
+/**
+ * A page of items returned by a paginated endpoint. Pass the `next_cursor` to the endpoint to fetch the next page,
+ * or use `iteratePages()` and `iterateItems()`.
+ */
+export interface Page<T> {
+  items: T[];
+  next_cursor?: string;
+}
+
+
+export class PageType<T> implements TypeDescriptor {
+
+  public name = 'page';
+  private listType: ListType;
+  private cursorType = new OptionalType(new StringType());
+
+  public constructor(public itemType: TypeDescriptor) {
+    this.listType = new ListType(itemType);
+  }
+
+  public extract(locator: Locator, value: any): Page<T> {
+    if (!(value instanceof Object)) {
+      throw locator.error(`expected type "object", got "${typeof value}"`);
+    }
+    return {
+      items: this.listType.extract(locator.push('items'), value.items),
+      next_cursor: this.cursorType.extract(locator.push('next_cursor'), value.next_cursor),
+    };
+  }
+
+  public compose(locator: Locator, value: Page<T>): any {
+    return {
+      items: this.listType.compose(locator.push('items'), value.items),
+      next_cursor: this.cursorType.compose(locator.push('next_cursor'), value.next_cursor),
+    };
+  }
+
+  public toString(): string {
+    return `${this.name}<${this.itemType.toString()}>`;
+  }
+}
@@ -4,10 +4,11 @@
 
 import abc
 import dataclasses
+import typing
 
 from cytonic.description import authentication, endpoint, service
 from cytonic.model import OAuth2Bearer
-from cytonic.runtime import Credentials, NotFoundError
+from cytonic.runtime import Credentials, NotFoundError, fetch_bulk, fetch_bulk_blocking
 
 
 @dataclasses.dataclass
@@ -39,6 +40,11 @@ class UsersServiceBlocking(abc.ABC):
   def get_user(self, auth: Credentials, user_id: str) -> User:
     pass
 
+  @endpoint("POST /users/id/_bulk")
+  def get_user_bulk(self, auth: Credentials, user_ids: typing.List[str]) -> typing.Dict[str, User]:
+    " Fetches multiple items with `get_user` at once. Keys for which there is no item are omitted. "
+    return fetch_bulk_blocking(user_ids, lambda key: self.get_user(auth, key))
+
 
 @service('Users')
 @authentication(OAuth2Bearer())
@@ -54,3 +60,8 @@ class UsersServiceAsync(abc.ABC):
   @abc.abstractmethod
   async def get_user(self, auth: Credentials, user_id: str) -> User:
     pass
+
+  @endpoint("POST /users/id/_bulk")
+  async def get_user_bulk(self, auth: Credentials, user_ids: typing.List[str]) -> typing.Dict[str, User]:
+    " Fetches multiple items with `get_user` at once. Keys for which there is no item are omitted. "
+    return await fetch_bulk(user_ids, lambda key: self.get_user(auth, key))
@@ -2,12 +2,13 @@
 from fastapi import FastAPI
 
 from cytonic.contrib.fastapi import CytonicServiceRouter
+from cytonic.runtime import PrincipalResolver
 
 from .impl import TodoListServiceAsyncImpl, UsersServiceAsyncImpl
 
 users = UsersServiceAsyncImpl()
-todolist = TodoListServiceAsyncImpl(users)
+todolist = TodoListServiceAsyncImpl()
 
 app = FastAPI()
 app.include_router(CytonicServiceRouter(users))
-app.include_router(CytonicServiceRouter(todolist))
+app.include_router(CytonicServiceRouter(todolist, principal_resolver=PrincipalResolver(users.me)))
@@ -1,7 +1,7 @@
 
 import datetime
 
-from cytonic.runtime import Credentials, UnauthorizedError
+from cytonic.runtime import Credentials, UnauthorizedError, get_principal
 from nr.util.safearg import Safe
 
 from .api import TodoItem, TodoList, TodoListNotFoundError, TodoListServiceAsync, UserNotFoundError, User, UsersServiceAsync
@@ -26,27 +26,28 @@ _items: dict[str, list[TodoItem]] = {
 }
 
 
-class TodoListServiceAsyncImpl(TodoListServiceAsync):
+def _get_own_list(list_id: str) -> TodoList:
+  """ Returns the list with the *list_id* if it is owned by the user that sent the current request. """
+
+  user: User = get_principal()
+  todolist = _lists.get(list_id)
+  if todolist is None or todolist.owner.id != user.id:
+    raise TodoListNotFoundError(list_id)
+  return todolist
 
-  def __init__(self, users: UsersServiceAsync) -> None:
-    self._users = users
+
+class TodoListServiceAsyncImpl(TodoListServiceAsync):
+  """ Expects the router to resolve the principal of each request with #UsersServiceAsync.me(). """
 
   async def get_lists(self, auth: Credentials) -> list[TodoList]:
-    await self._users.me(auth)
-    return list(_lists.values())
+    user: User = get_principal()
+    return [todolist for todolist in _lists.values() if todolist.owner.id == user.id]
 
   async def get_items(self, auth: Credentials, list_id: str) -> list[TodoItem]:
-    await self._users.me(auth)
-    if list_id in _lists:
-      return _items[list_id]
-    raise TodoListNotFoundError(list_id)
+    return _items[_get_own_list(list_id).id]
 
   async def set_items(self, auth: Credentials, list_id: str, items: list[TodoItem]) -> None:
-    await self._users.me(auth)
-    if list_id in _lists:
-      _items[list_id] = items
-      return
-    raise TodoListNotFoundError(list_id)
+    _items[_get_own_list(list_id).id] = items
 
 
 class UsersServiceAsyncImpl(UsersServiceAsync):
@@ -1,4 +1,4 @@
-import { ClientConfig, Credentials, ParamKind, Service, ServiceException, StringType, StructType, createAsyncClient } from "@cytonic/runtime";
+import { ClientConfig, Credentials, ListType, MapType, ParamKind, Service, ServiceException, StringType, StructType, createAsyncClient } from "@cytonic/runtime";
 
 export interface User {
   id: string;
@@ -23,6 +23,7 @@ export interface UserNotFoundError extends ServiceException {
 export interface UsersServiceAsync {
   me(auth: Credentials): Promise<User>;
   get_user(auth: Credentials, user_id: string): Promise<User>;
+  get_user_bulk(auth: Credentials, user_ids: string[]): Promise<Map<string, User>>;
 }
 
 export namespace UsersServiceAsync {
@@ -37,6 +38,7 @@ export namespace UsersServiceAsync {
 export interface UsersServiceBlocking {
   me(auth: Credentials): User;
   get_user(auth: Credentials, user_id: string): User;
+  get_user_bulk(auth: Credentials, user_ids: string[]): Map<string, User>;
 }
 
 const UsersService_TYPE: Service = {
@@ -59,5 +61,17 @@ const UsersService_TYPE: Service = {
       },
       args_ordering: ['user_id'],
     },
+    get_user_bulk: {
+      method: 'POST',
+      path: '/users/id/_bulk',
+      return: new MapType(new StringType(), User_TYPE),
+      args: {
+        user_ids: {
+          kind: ParamKind.body,
+          type: new ListType(new StringType()),
+        },
+      },
+      args_ordering: ['user_ids'],
+    },
   },
 };